@@ -1,92 +1,148 @@
 # ai_agent.py
-import google.generativeai as genai
-from config import API_KEY, MODEL_NAME
+from config import STREAM_GENERATION, SPECULATIVE_GENERATION, SPECULATION_MIN_SCORE
 import re
-import json
 import os
 import subprocess
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage
+from model_client import get_client
+from context_window import estimate_tokens
+from json_stream import ProjectStreamParser, extract_first_object
+from router import route_prompt, router_report, generation_likelihood, FILENAME_PATTERN
+from workspace_index import get_workspace_index
+from tracing import span, traced, current_span
+from sessions import sessions, DEFAULT_SESSION
+from speculation import speculator
 
 # tools
+from file_utils import create_project_from_stream, write_project
 from tools.file_editor import modify_file
+from tools.edit_pipeline import run_edits, format_results
 from tools.git_manager import git_commit_and_push
 from tools.command_runner import run_command
+from tools.job_manager import handle_job_action
 
-# === Gemini setup ===
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel(MODEL_NAME)
+# === Memory (one conversation per session, see sessions.py) ===
+def remember(role, content, session_id=DEFAULT_SESSION):
+    """Record a message in the session's conversation and prompt context window."""
+    sessions.get(session_id).remember(role, content)
 
-# === Memory persistence ===
-MEMORY_DIR = "memory"
-MEMORY_FILE = os.path.join(MEMORY_DIR, "agent_memory.json")
-os.makedirs(MEMORY_DIR, exist_ok=True)
+def load_memory(session_id=DEFAULT_SESSION):
+    """Messages of a session, loading its journal on first use."""
+    return sessions.get(session_id).load()
 
-# Initialize LangChain memory (runtime)
-memory = ConversationBufferMemory(return_messages=True)
-
-def load_memory():
-    """Load persisted memory from disk into the runtime langchain memory."""
-    if not os.path.exists(MEMORY_FILE):
-        return
-    try:
-        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-            messages = json.load(f)  # list of {"role": "user"/"ai", "content": "..."}
-        for m in messages:
-            if m.get("role") == "user":
-                memory.chat_memory.add_message(HumanMessage(content=m.get("content", "")))
-            else:
-                memory.chat_memory.add_message(AIMessage(content=m.get("content", "")))
-        print(f"✅ Loaded {len(messages)} messages from memory.")
-    except Exception as e:
-        print("⚠️ Failed to load memory:", e)
-
-def save_memory():
-    """Persist current memory messages to disk as a simple JSON list."""
-    try:
-        msgs = []
-        for m in memory.chat_memory.messages:
-            role = "user" if isinstance(m, HumanMessage) else "ai"
-            msgs.append({"role": role, "content": m.content})
-        with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(msgs, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print("⚠️ Failed to save memory:", e)
-
-# Load memory at import time
-load_memory()
+@traced("memory.save")
+def save_memory(session_id=DEFAULT_SESSION):
+    """Write the session's new messages to its journal now (normally done in the background)."""
+    sessions.get(session_id).flush()
 
 # === Helper: JSON extractor ===
 def extract_json(text):
-    match = re.search(r'\{[\s\S]*\}', text)
-    if match:
-        try:
-            return json.loads(match.group())
-        except json.JSONDecodeError:
-            cleaned = match.group().replace("```json", "").replace("```", "")
-            try:
-                return json.loads(cleaned)
-            except Exception:
-                return None
-    return None
+    """Return the first balanced JSON object in `text` that parses, or None."""
+    return extract_first_object(text)
 
 # === Helper: find files in generated_projects ===
 def find_in_generated_projects(filename, base="generated_projects"):
     """
-    Search for filename recursively inside `base`. Return first match full path or None.
+    Resolve a filename or partial path inside `base` using the workspace index.
+    Returns the best match (exact path suffix first, then most recently modified) or None.
+    Near misses are never returned: editing "api.py" when "app.py" was asked for is worse
+    than not finding it (see did_you_mean).
     """
-    if not os.path.isdir(base):
-        return None
-    # Normalize filename
-    filename = os.path.basename(filename)
-    for root, dirs, files in os.walk(base):
-        if filename in files:
-            return os.path.join(root, filename)
-    return None
+    index = get_workspace_index(base)
+    match = index.best(filename, fuzzy=False)
+    if match:
+        print(f"🔎 Index hit rate: {index.hit_rate():.0%} ({index.stats['lookups']} lookups)")
+    return match
+
+def did_you_mean(file_path_arg, mod_prompt, base="generated_projects"):
+    """' Did you mean: ...?' for files with a similar name to the one asked for, or ''."""
+    name = file_path_arg
+    if not name and mod_prompt:
+        m = FILENAME_PATTERN.search(mod_prompt)
+        name = m.group(1) if m else ""
+    name = name.split()[-1] if name.split() else ""
+    suggestions = get_workspace_index(base).suggest(name) if name else []
+    if not suggestions:
+        return ""
+    return " Did you mean: " + ", ".join(f"'{p}'" for p in suggestions[:3]) + "?"
+
+# === Helper: resolve the file an edit refers to ===
+def resolve_file_target(file_path_arg, mod_prompt):
+    """
+    Turn the (possibly partial) path from the tool args, or a filename mentioned
+    in the modification prompt, into an existing file path. Returns None if nothing matches.
+    """
+    target_path = None
+
+    # If exact path provided and exists, use it
+    if file_path_arg and os.path.exists(file_path_arg):
+        target_path = file_path_arg
+        print(f"ℹ️ Using exact path provided: {target_path}")
+    else:
+        # If user provided something that looks like a path but doesn't exist,
+        # try to intelligently resolve
+        if file_path_arg:
+            # A partial path (project_1/app.py) is matched as a path suffix first; only if that
+            # finds nothing, any file with the same name (app.py) or an incomplete path
+            # (generated_projects app.py)
+            guessed = find_in_generated_projects(file_path_arg)
+            basename = os.path.basename(file_path_arg)
+            if not guessed and basename != file_path_arg:
+                guessed = find_in_generated_projects(basename)
+            if guessed:
+                target_path = guessed
+                print(f"ℹ️ Auto-resolved '{file_path_arg}' -> '{guessed}'")
+            else:
+                # If they passed something like "generated_projects app.py" we try extract last token as filename
+                tokens = file_path_arg.split()
+                if len(tokens) > 1:
+                    possible = tokens[-1]
+                    guessed2 = find_in_generated_projects(possible)
+                    if guessed2:
+                        target_path = guessed2
+                        print(f"ℹ️ Auto-resolved '{file_path_arg}' -> '{guessed2}'")
+        # If still no file path, try extract a filename from the modification prompt itself
+        if not target_path and not file_path_arg and mod_prompt:
+            m = FILENAME_PATTERN.search(mod_prompt)
+            if m:
+                filename_from_prompt = m.group(1)
+                guessed3 = find_in_generated_projects(filename_from_prompt)
+                if guessed3:
+                    target_path = guessed3
+                    print(f"ℹ️ Auto-resolved filename from prompt -> '{guessed3}'")
+
+        # As a last fallback, if user asked to edit "app.py" without path, search for app.py
+        if not target_path and not file_path_arg:
+            # attempt to find a common file name (e.g., app.py)
+            m2 = re.search(r'\b(app\.py|main\.py|index\.html|templates/index.html)\b', mod_prompt)
+            if m2:
+                guessed4 = find_in_generated_projects(m2.group(0))
+                if guessed4:
+                    target_path = guessed4
+                    print(f"ℹ️ Auto-resolved common filename from prompt -> '{guessed4}'")
+
+    return target_path
+
+def edit_many_files(edits, default_prompt=""):
+    """Resolve every target of a multi-file edit and apply them with the concurrent pipeline."""
+    resolved, missing = [], []
+    for e in edits:
+        path_arg = str(e.get("file_path", "")).strip()
+        edit_prompt = str(e.get("modification_prompt", "")).strip() or default_prompt
+        path = resolve_file_target(path_arg, edit_prompt)
+        if path:
+            resolved.append({"file_path": path, "modification_prompt": edit_prompt})
+        else:
+            missing.append((path_arg or edit_prompt) + did_you_mean(path_arg, edit_prompt))
+    if missing:
+        msg = "❌ File(s) not found: " + ", ".join(missing)
+    else:
+        msg = format_results(run_edits(resolved))
+    print(msg)
+    return msg
 
 # === Core: Project generator ===
-def generate_project_structure(prompt):
-    instruction = f"""
+def _project_instruction(prompt):
+    return f"""
 You are an expert AI code generator.
 Generate ONLY valid JSON (no markdown, no text outside JSON).
 
@@ -102,20 +158,68 @@ Example format:
 
 Task: {prompt}
 """
+
+@traced("generate")
+def generate_project_structure(prompt):
+    instruction = _project_instruction(prompt)
     try:
-        response = model.generate_content(instruction)
+        text = get_client().generate(instruction, validate=extract_json)
     except Exception as e:
         print("❌ Gemini request failed:", e)
         return None
 
-    data = extract_json(response.text)
+    with span("parse.json", bytes=len(text)):
+        data = extract_json(text)
     if not data:
-        print("❌ Could not parse JSON. Here’s what Gemini sent:\n", response.text)
+        print("❌ Could not parse JSON. Here’s what Gemini sent:\n", text)
     else:
         print("✅ Gemini responded and parsed successfully.")
     return data
 
+def stream_project_structure(prompt):
+    """
+    Streamed variant of generate_project_structure. Yields parser events
+    ("file", path, code), ("main_file", name) and ("done",) while Gemini's
+    reply is still arriving, so files can be written as soon as they complete.
+    """
+    instruction = _project_instruction(prompt)
+    parser = ProjectStreamParser()
+    try:
+        for text in get_client().stream(instruction, validate=extract_json):
+            yield from parser.feed(text)
+    except Exception as e:
+        print("❌ Gemini streaming request failed:", e)
+        return
+    if not parser.files:
+        print("❌ Could not parse any files from Gemini's streamed response.")
+
+def _speculative_generation(prompt, cancelled):
+    """
+    Generate a project for `prompt` while the tool is still being chosen.
+    Stops reading the model's stream as soon as `cancelled` is set.
+    """
+    chunks = []
+    with span("speculate.generate") as spec_span:
+        stream = get_client().stream(_project_instruction(prompt), validate=extract_json)
+        try:
+            for text in stream:
+                if cancelled.is_set():
+                    spec_span.set(cancelled=True)
+                    return None
+                chunks.append(text)
+        finally:
+            stream.close()
+    return extract_json("".join(chunks))
+
+def _project_events(data):
+    """stream_project_structure-style events for an already generated project."""
+    for path, code in data.get("files", {}).items():
+        yield ("file", path, code)
+    if data.get("main_file"):
+        yield ("main_file", data["main_file"])
+
 # === Tool Selector ===
+@traced("choose_tool")
 def choose_tool(user_prompt, conversation_context):
     instruction = f"""
 You are an intelligent AI agent controller with MEMORY.
@@ -125,6 +229,7 @@ You have access to the following tools:
 2. command_runner – to execute shell or terminal commands.
 3. git_manager – to commit and push code.
 4. project_generator – to create or generate new projects from scratch.
+5. job_manager – to start long-running commands or apps in the background and check their status, logs, or cancel them.
 
 Here is the previous conversation for context:
 {conversation_context}
@@ -134,50 +239,81 @@ Decide which ONE tool should be used for this user request:
 
 Respond in pure JSON only:
 {{
-    "tool": "file_editor" | "command_runner" | "git_manager" | "project_generator",
+    "tool": "file_editor" | "command_runner" | "git_manager" | "project_generator" | "job_manager",
     "args": {{
         "file_path": "optional, if editing a file",
         "modification_prompt": "optional, if editing a file",
+        "edits": [{{"file_path": "...", "modification_prompt": "..."}}, "optional, if editing several files"],
         "cmd": "optional, if running command",
-        "message": "optional, if doing git commit"
+        "message": "optional, if doing git commit",
+        "action": "optional, for job_manager: start | status | logs | cancel | list",
+        "job_id": "optional, for job_manager status/logs/cancel"
     }}
 }}
 """
     try:
-        response = model.generate_content(instruction)
+        text = get_client().generate(instruction, validate=extract_json)
     except Exception as e:
         print("❌ Gemini tool-choice request failed:", e)
         return None
 
-    data = extract_json(response.text)
+    data = extract_json(text)
     if not data:
-        print("⚠️ Could not parse tool choice:\n", response.text)
+        print("⚠️ Could not parse tool choice:\n", text)
     return data
 
 # === Master Controller ===
-def handle_user_prompt(prompt):
+@traced("agent.request")
+def handle_user_prompt(prompt, on_progress=None, on_output=None, session_id=DEFAULT_SESSION):
     """
     Main function: interprets prompt, picks tool, executes it with memory.
     Returns the result string of the executed tool.
+    `on_progress` receives project-generation progress events (see file_utils);
+    `on_output(stream, line)` receives command output as it is produced.
+    `session_id` selects the conversation (one per user); memory is shared
+    only within a session.
     """
-    # Add user message to memory
-    memory.chat_memory.add_message(HumanMessage(content=prompt))
+    with sessions.use(session_id) as session:
+        return _handle_turn(session, prompt, on_progress, on_output)
 
-    # Prepare conversation context for LLM
-    history = "\n".join(
-        [f"User: {m.content}" if isinstance(m, HumanMessage) else f"AI: {m.content}" for m in memory.chat_memory.messages]
-    )
-
-    # Let Gemini choose tool intelligently
-    tool_data = choose_tool(prompt, history)
+def _handle_turn(session, prompt, on_progress, on_output):
+    # Add user message to memory
+    session.remember("user", prompt)
+
+    # Clear-cut prompts are routed locally; otherwise let Gemini choose tool intelligently
+    speculation = None
+    with span("route") as route_span:
+        tool_data = route_prompt(prompt)
+        route_span.set(routed=bool(tool_data))
+    if tool_data:
+        print(f"⚡ Fast-path routed (confidence {tool_data['confidence']:.2f}), skipped LLM tool selection.")
+        print(router_report())
+    else:
+        # Likely a generation request: start generating alongside tool selection
+        if SPECULATIVE_GENERATION and generation_likelihood(prompt) >= SPECULATION_MIN_SCORE:
+            speculation = speculator.launch(_speculative_generation, prompt)
+        # Conversation context for the LLM: recent window + summary, plus the earlier
+        # messages most relevant to this prompt
+        with span("retrieve") as retrieve_span:
+            history = session.history(prompt)
+            retrieve_span.set(messages=len(session.index), history_tokens=estimate_tokens(history))
+        tool_data = choose_tool(prompt, history)
     if not tool_data or "tool" not in tool_data:
         print("❌ No valid tool detected. Defaulting to project generation.")
         tool_data = {"tool": "project_generator", "args": {}}
 
     tool = tool_data["tool"]
     args = tool_data.get("args", {})
+    if speculation is not None:
+        if tool != "project_generator":
+            speculator.discard(speculation)
+            speculation = None
+            print(speculator.report())
+        current_span().set(speculation="hit" if speculation else "miss")
 
     print(f"\n🧠 Selected Tool: {tool}\n")
+    current_span().set(tool=tool, routed=tool_data.get("confidence") is not None,
+                       prompt_chars=len(prompt), context_tokens=session.context.tokens, session=session.id)
 
     # Execute tool and capture result message
     result = None
@@ -186,86 +322,56 @@ def handle_user_prompt(prompt):
             # Get provided args
             file_path_arg = str(args.get("file_path", "")).strip()
             mod_prompt = str(args.get("modification_prompt", "")).strip()
+            edits = [e for e in args.get("edits") or [] if isinstance(e, dict)]
 
-            target_path = None
-            result = None
-
-            # If exact path provided and exists, use it
-            if file_path_arg and os.path.exists(file_path_arg):
-                target_path = file_path_arg
-                print(f"ℹ️ Using exact path provided: {target_path}")
-            else:
-                # If user provided something that looks like a path but doesn't exist,
-                # try to intelligently resolve
-                if file_path_arg:
-                    # If they gave a filename only (app.py) or an incomplete path (generated_projects app.py)
-                    basename = os.path.basename(file_path_arg)
-                    guessed = find_in_generated_projects(basename)
-                    if guessed:
-                        target_path = guessed
-                        print(f"ℹ️ Auto-resolved '{file_path_arg}' -> '{guessed}'")
-                    else:
-                        # If they passed something like "generated_projects app.py" we try extract last token as filename
-                        tokens = file_path_arg.split()
-                        if len(tokens) > 1:
-                            possible = tokens[-1]
-                            guessed2 = find_in_generated_projects(possible)
-                            if guessed2:
-                                target_path = guessed2
-                                print(f"ℹ️ Auto-resolved '{file_path_arg}' -> '{guessed2}'")
-                # If still no file path, try extract a filename from the modification prompt itself
-                if not target_path and not file_path_arg and mod_prompt:
-                    m = re.search(r'([A-Za-z0-9_\-]+\.(py|html|css|js|json|md))', mod_prompt)
-                    if m:
-                        filename_from_prompt = m.group(1)
-                        guessed3 = find_in_generated_projects(filename_from_prompt)
-                        if guessed3:
-                            target_path = guessed3
-                            print(f"ℹ️ Auto-resolved filename from prompt -> '{guessed3}'")
-
-                # As a last fallback, if user asked to edit "app.py" without path, search for app.py
-                if not target_path and not file_path_arg:
-                    # attempt to find a common file name (e.g., app.py)
-                    m2 = re.search(r'\b(app\.py|main\.py|index\.html|templates/index.html)\b', mod_prompt)
-                    if m2:
-                        guessed4 = find_in_generated_projects(m2.group(0))
-                        if guessed4:
-                            target_path = guessed4
-                            print(f"ℹ️ Auto-resolved common filename from prompt -> '{guessed4}'")
-
-            if not target_path:
-                # Nothing found; produce helpful message
-                msg = "❌ File not found. Provide a full path like 'generated_projects/project_1/app.py' or run 'list generated_projects' first."
-                print(msg)
-                result = msg
+            if len(edits) > 1:
+                # Multi-file edit: all files are edited concurrently as one unit
+                result = edit_many_files(edits, mod_prompt)
             else:
-                # Call tool to modify file
-                result = modify_file(target_path, mod_prompt)
+                if edits:
+                    file_path_arg = file_path_arg or str(edits[0].get("file_path", "")).strip()
+                    mod_prompt = mod_prompt or str(edits[0].get("modification_prompt", "")).strip()
+
+                target_path = resolve_file_target(file_path_arg, mod_prompt)
+
+                if not target_path:
+                    # Nothing found; produce helpful message
+                    msg = ("❌ File not found." + did_you_mean(file_path_arg, mod_prompt) +
+                           " Provide a full path like 'generated_projects/project_1/app.py' or run 'list generated_projects' first.")
+                    print(msg)
+                    result = msg
+                else:
+                    # Call tool to modify file
+                    result = modify_file(target_path, mod_prompt)
 
         elif tool == "command_runner":
             cmd = args.get("cmd", "")
-            result = run_command(cmd)
+            result = run_command(cmd, on_output=on_output)
+        elif tool == "job_manager":
+            result = handle_job_action(args)
         elif tool == "git_manager":
             base = "generated_projects"
             projects = sorted([d for d in os.listdir(base)], reverse=True)
             folder_path = os.path.join(base, projects[0]) if projects else None
 
-            result = git_commit_and_push(folder_path)
+            message = str(args.get("message", "")).strip() or "Auto commit by AI Agent"
+            result = git_commit_and_push(folder_path, message)
 
         elif tool == "project_generator":
-            data = generate_project_structure(prompt)
+            data = speculator.take(speculation) if speculation else None
             if data:
-                # use file_utils.create_project_from_json if desired; simple write here
-                base_folder = "generated_projects"
-                os.makedirs(base_folder, exist_ok=True)
-                project_count = len([n for n in os.listdir(base_folder) if os.path.isdir(os.path.join(base_folder, n))])
-                project_folder = os.path.join(base_folder, f"project_{project_count + 1}")
-                os.makedirs(project_folder, exist_ok=True)
-                for path, code in data.get("files", {}).items():
-                    full_path = os.path.join(project_folder, path)
-                    os.makedirs(os.path.dirname(full_path) or ".", exist_ok=True)
-                    with open(full_path, "w", encoding="utf-8") as f:
-                        f.write(code)
+                # Generated speculatively while the tool was being chosen
+                project_folder, data = create_project_from_stream(_project_events(data), on_progress=on_progress)
+                print(speculator.report())
+            elif STREAM_GENERATION:
+                project_folder, data = create_project_from_stream(stream_project_structure(prompt),
+                                                                   on_progress=on_progress)
+            else:
+                data = generate_project_structure(prompt)
+                project_folder = None
+                if data:
+                    project_folder, data["files"] = write_project(data.get("files", {}))
+            if data and project_folder:
                 result = f"✅ Project created at: {project_folder}. Main file: {data.get('main_file','')}"
             else:
                 result = "❌ Project generation failed."
@@ -274,8 +380,9 @@ def handle_user_prompt(prompt):
     except Exception as e:
         result = f"❌ Error while executing tool: {e}"
 
-    # Store AI response and the tool result in memory and persist
-    memory.chat_memory.add_message(AIMessage(content=f"Used tool: {tool}\nResult: {str(result)}"))
-    save_memory()
+    current_span().set(ok=not str(result).startswith("❌"))
+
+    # Store AI response and the tool result in memory (journaled by the session flusher)
+    session.remember("ai", f"Used tool: {tool}\nResult: {str(result)}")
 
     return result
\ No newline at end of file
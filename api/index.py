@@ -1,7 +1,21 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, url_for
 import os
+import sys
+
+# Vercel runs this file from api/; the pipeline modules live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generation_queue import GenerationQueue, QueueFull
+from packager import iter_zip
 
 app = Flask(__name__)
+# Swap in GenerationQueue(generate_fn=...) to run the API against a fake model
+app.config["GENERATION_QUEUE"] = GenerationQueue()
+
+
+def _queue():
+    return app.config["GENERATION_QUEUE"]
+
 
 @app.route('/', methods=['GET'])
 def home():
@@ -9,16 +23,42 @@ def home():
 
 @app.route('/generate', methods=['POST'])
 def generate():
-    data = request.get_json()
-    prompt = data.get("prompt", "")
+    data = request.get_json(silent=True) or {}
+    prompt = str(data.get("prompt", "")).strip()
     if not prompt:
         return jsonify({"error": "No prompt provided"}), 400
-    
-    # Dummy AI response for now
+
+    try:
+        job_id = _queue().submit(prompt)
+    except QueueFull:
+        response = jsonify({"error": "Too many generations in progress, try again later"})
+        response.headers["Retry-After"] = "10"
+        return response, 429
+
     return jsonify({
-        "prompt": prompt,
-        "response": f"Generated project for: {prompt}"
-    })
+        "job_id": job_id,
+        "status_url": url_for("job_status", job_id=job_id),
+        "download_url": url_for("job_download", job_id=job_id),
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = _queue().status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/download', methods=['GET'])
+def job_download(job_id):
+    job = _queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["state"] != "done":
+        return jsonify({"error": f"Job is {job['state']}", "state": job["state"]}), 409
+
+    # Streamed chunk by chunk; the archive is never built in full for the response
+    return Response(iter_zip(job["files"]), mimetype="application/zip",
+                    headers={"Content-Disposition": f'attachment; filename="project-{job_id[:8]}.zip"'})
 
 # For local testing
 if __name__ == "__main__":
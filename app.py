@@ -1,6 +1,9 @@
+import uuid
+
 import streamlit as st
 from project_builder import build_and_run
 from ai_agent import handle_user_prompt
+from tracing import span, breakdown
 
 st.set_page_config(page_title="AI Code Agent", page_icon="🤖", layout="wide")
 
@@ -9,6 +12,10 @@ st.subheader("Generate, modify, upload to GitHub")
 
 st.markdown("---")
 
+# One agent conversation per browser session
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 mode = st.radio("Choose Mode:", ["Generate Project", "Agent Mode"])
 
 prompt = st.text_area("🧠 Enter your prompt:", height=150,
@@ -28,11 +35,49 @@ auto_run = False
 if mode == "Generate Project":
     auto_run = col1.checkbox("Run main file (local VS Code only)?")
 
+def show_progress(placeholder):
+    """Streamlit progress callback for streamed project generation."""
+    written = []
+
+    def on_progress(event):
+        if event["event"] == "file":
+            written.append(f"📄 {event['path']} ({event['bytes']} bytes)")
+            placeholder.markdown("\n".join(f"- {line}" for line in written))
+        elif event["event"] == "done":
+            placeholder.markdown("\n".join(f"- {line}" for line in written)
+                                 + f"\n\n✅ {event['files_written']} file(s) written to {event['project_folder']}")
+
+    return on_progress
+
+
+def show_output(placeholder, max_lines=40):
+    """Streamlit callback that shows the latest command output lines live."""
+    lines = []
+
+    def on_output(stream, line):
+        lines.append(("[stderr] " if stream == "stderr" else "") + line.rstrip("\n"))
+        del lines[:-max_lines]
+        placeholder.code("\n".join(lines))
+
+    return on_output
+
+
+def show_timings(trace_id):
+    """Per-stage timing breakdown of one request."""
+    rows = breakdown(trace_id)
+    if rows:
+        with st.expander(f"⏱️ Timing breakdown ({rows[0]['ms'] / 1000:.1f}s)"):
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
 if col2.button("🚀 Execute"):
-    with st.spinner("Processing..."):
+    progress = show_progress(st.empty())
+    output = show_output(st.empty())
+    with st.spinner("Processing..."), span("ui.execute", mode=mode) as request_span:
         if mode == "Generate Project":
             zip_bytes = build_and_run(prompt, auto_run, github_enabled,
-                                      github_username, github_reponame, github_pat)
+                                      github_username, github_reponame, github_pat,
+                                      on_progress=progress)
             if zip_bytes:
                 st.download_button(
                     "⬇️ Download Generated Project",
@@ -41,5 +86,7 @@ if col2.button("🚀 Execute"):
                     mime="application/zip"
                 )
         else:
-            result = handle_user_prompt(prompt)
-            st.success(result)
+            result = handle_user_prompt(prompt, on_progress=progress, on_output=output,
+                                        session_id=st.session_state.session_id)
+            st.success(str(result))
+    show_timings(request_span.trace_id)
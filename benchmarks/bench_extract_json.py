@@ -0,0 +1,97 @@
+# benchmarks/bench_extract_json.py
+"""
+Micro-benchmark: JSON extraction from large model outputs.
+
+Compares the old greedy-regex extract_json with the single-pass
+JsonObjectScanner (json_stream.extract_first_object) on
+
+  * realistic project replies (prose + ```json fence + multi-MB files map)
+  * a pathological reply with many unmatched "{" and no closing "}",
+    where the regex's backtracking makes it quadratic.
+
+Run from the repo root:  python benchmarks/bench_extract_json.py
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_stream import JsonObjectScanner, extract_first_object  # noqa: E402
+
+
+def legacy_extract_json(text):
+    """The original ai_agent.extract_json, kept here for comparison."""
+    match = re.search(r'\{[\s\S]*\}', text)
+    if match:
+        try:
+            return json.loads(match.group())
+        except json.JSONDecodeError:
+            cleaned = match.group().replace("```json", "").replace("```", "")
+            try:
+                return json.loads(cleaned)
+            except Exception:
+                return None
+    return None
+
+
+def project_reply(size_bytes):
+    """A model reply with a files map of roughly `size_bytes`."""
+    snippet = "def handler(request):\n    return {'status': 'ok', 'items': [1, 2, 3]}\n\n"
+    files, total, i = {}, 0, 0
+    while total < size_bytes:
+        body = snippet * 200
+        files[f"pkg/module_{i}.py"] = body
+        total += len(body)
+        i += 1
+    payload = json.dumps({"files": files, "main_file": "pkg/module_0.py"}, indent=2)
+    return "Here is your project:\n```json\n" + payload + "\n```\nLet me know if you need changes."
+
+
+def pathological_reply(size_bytes):
+    """Lots of '{' with no matching '}' -- worst case for the greedy regex."""
+    return "{ " * (size_bytes // 2)
+
+
+def best_of(fn, text, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def chunked(text, chunk_size=4096):
+    scanner = JsonObjectScanner()
+    objects = []
+    for i in range(0, len(text), chunk_size):
+        objects.extend(scanner.feed(text[i:i + chunk_size]))
+    return objects
+
+
+def main():
+    print(f"{'workload':<22}{'size':>10}{'legacy (s)':>14}{'scanner (s)':>14}{'chunked (s)':>14}{'MB/s':>10}")
+    for mb in (1, 2, 4, 8):
+        text = project_reply(mb * 1024 * 1024)
+        assert extract_first_object(text) == legacy_extract_json(text)
+        legacy = best_of(legacy_extract_json, text)
+        scanner = best_of(extract_first_object, text)
+        streamed = best_of(chunked, text)
+        print(f"{'project reply':<22}{len(text) / 1e6:>9.1f}M{legacy:>14.4f}{scanner:>14.4f}"
+              f"{streamed:>14.4f}{len(text) / 1e6 / scanner:>10.1f}")
+
+    # Quadratic for the regex: keep sizes small enough to finish
+    for kb in (8, 16, 32, 64):
+        text = pathological_reply(kb * 1024)
+        legacy = best_of(legacy_extract_json, text, repeat=1)
+        scanner = best_of(extract_first_object, text)
+        streamed = best_of(chunked, text)
+        print(f"{'unclosed braces':<22}{len(text) / 1e3:>9.0f}K{legacy:>14.4f}{scanner:>14.4f}"
+              f"{streamed:>14.4f}{len(text) / 1e6 / max(scanner, 1e-9):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
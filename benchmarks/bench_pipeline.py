@@ -0,0 +1,387 @@
+# benchmarks/bench_pipeline.py
+"""
+End-to-end benchmarks for the agent pipeline, run against the offline fake
+model (model_client.FakeBackend) inside a scratch working directory.
+
+Workloads (scaled with --messages / --projects / --response-mb):
+
+  * extract_json on a multi-MB model reply
+  * memory journal: loading the tail of, and appending to, a 10k-message history
+  * context window render over the whole history
+  * file lookup across 1,000 generated projects (cold index build + warm lookups)
+  * create_project_from_json as the number of projects grows
+  * project ZIP packaging (cold build, one file changed, cache hit)
+  * handle_user_prompt / save_memory end to end (needs the agent's dependencies)
+
+For each benchmark the report has latency percentiles, tracemalloc peak / net
+allocations and, on Linux, I/O counters from /proc/self/io. Results are saved
+as JSON so runs can be compared between commits:
+
+  python benchmarks/bench_pipeline.py --output before.json
+  python benchmarks/bench_pipeline.py --output after.json --compare before.json
+
+--compare exits with status 1 if any p50 regressed by more than --threshold.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Offline, uncached model before any repo module reads config
+os.environ["MODEL_BACKEND"] = "fake"
+os.environ.setdefault("LLM_CACHE_BYPASS", "1")
+os.environ.setdefault("ROUTER_ENABLED", "1")
+
+
+# === Measurement ===
+def read_proc_io():
+    """Process I/O counters (Linux only), else None."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {k: int(v) for k, v in (line.split(": ") for line in f.read().splitlines())}
+    except (OSError, ValueError):
+        return None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def measure(fn, iterations, setup=None):
+    """
+    Time `fn` `iterations` times (calling `setup()` untimed before each), then
+    run it once more under tracemalloc for allocation figures.
+    """
+    io_before = read_proc_io()
+    times = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    io_after = read_proc_io()
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times.sort()
+    result = {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(times) * 1000,
+        "p50_ms": percentile(times, 50) * 1000,
+        "p90_ms": percentile(times, 90) * 1000,
+        "p99_ms": percentile(times, 99) * 1000,
+        "max_ms": times[-1] * 1000,
+        "alloc_peak_kb": (peak - before) / 1024,
+        "alloc_net_kb": (current - before) / 1024,
+    }
+    if io_before and io_after:
+        for counter in ("rchar", "wchar", "syscr", "syscw", "read_bytes", "write_bytes"):
+            if counter in io_before:
+                result[f"io_{counter}"] = (io_after[counter] - io_before[counter]) / iterations
+    return result
+
+
+# === Synthetic workloads ===
+def model_reply(size_bytes):
+    """A project reply of roughly `size_bytes`, wrapped in prose and a code fence."""
+    snippet = "def handler(request):\n    return {'status': 'ok', 'items': [1, 2, 3]}\n\n"
+    files, total, i = {}, 0, 0
+    while total < size_bytes:
+        body = snippet * 200
+        files[f"pkg/module_{i}.py"] = body
+        total += len(body)
+        i += 1
+    payload = json.dumps({"files": files, "main_file": "pkg/module_0.py"}, indent=2)
+    return "Here is your project:\n```json\n" + payload + "\n```\n"
+
+
+def project_files(n_files=6, file_bytes=4096):
+    line = "print('generated line of application code')\n"
+    body = line * max(1, file_bytes // len(line))
+    files = {f"src/module_{i}.py": f"# module {i}\n" + body for i in range(n_files - 2)}
+    files["templates/index.html"] = "<html><body>" + "<p>content</p>" * (file_bytes // 14) + "</body></html>"
+    files["static/logo.png"] = os.urandom(file_bytes)
+    return files
+
+
+def make_projects(base, count):
+    for i in range(1, count + 1):
+        folder = os.path.join(base, f"project_{i}")
+        os.makedirs(os.path.join(folder, "templates"), exist_ok=True)
+        for name in ("app.py", "README.md", f"service_{i}.py", "templates/index.html"):
+            with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+                f.write(f"# {name} of project {i}\n")
+
+
+def history(count):
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": f"request {i}: create a flask app with a login page"})
+        else:
+            messages.append({"role": "ai", "content": f"Used tool: project_generator\nResult: generated_projects/project_{i}"})
+    return messages
+
+
+# === Benchmarks ===
+def bench_extract_json(args):
+    from json_stream import extract_first_object
+    text = model_reply(int(args.response_mb * 1024 * 1024))
+    return measure(lambda: extract_first_object(text), args.iterations)
+
+
+def bench_memory_load(args):
+    from memory_store import MemoryStore
+    store = MemoryStore(os.path.join("bench_memory", "load.jsonl"), keep=1000, compact_after=10 ** 9)
+    store.append(history(args.messages))
+    return measure(lambda: store.load_tail(), args.iterations)
+
+
+def bench_memory_append(args):
+    from memory_store import MemoryStore
+    store = MemoryStore(os.path.join("bench_memory", "append.jsonl"), keep=1000, compact_after=10 ** 9)
+    store.append(history(args.messages))
+    turn = history(2)
+    return measure(lambda: store.append(turn), args.iterations)
+
+
+def bench_context_render(args):
+    from context_window import ContextWindow
+    messages = history(args.messages)
+
+    def run():
+        window = ContextWindow()
+        for m in messages:
+            window.add(m["role"], m["content"])
+        window.render()
+    return measure(run, max(1, args.iterations // 4))
+
+
+def bench_lookup_cold(args):
+    from workspace_index import WorkspaceIndex
+    make_projects("bench_projects", args.projects)
+    return measure(lambda: WorkspaceIndex("bench_projects").best(f"service_{args.projects // 2}.py"),
+                   max(1, args.iterations // 4))
+
+
+def bench_lookup_warm(args):
+    from workspace_index import WorkspaceIndex
+    if not os.path.isdir("bench_projects"):
+        make_projects("bench_projects", args.projects)
+    index = WorkspaceIndex("bench_projects", refresh_interval=3600)
+    index.refresh(force=True)
+    names = ["app.py", f"project_{args.projects}/app.py", f"service_{args.projects // 3}.py", "servce_1.py"]
+    state = {"i": 0}
+
+    def run():
+        index.best(names[state["i"] % len(names)])
+        state["i"] += 1
+    return measure(run, args.iterations * 4)
+
+
+def bench_create_project(args):
+    from file_utils import create_project_from_json
+    data = {"files": {k: v for k, v in project_files().items() if isinstance(v, str)}, "main_file": "src/module_0.py"}
+    make_projects("bench_create", args.projects)  # the folder count is part of the cost
+    return measure(lambda: create_project_from_json(data, base_folder="bench_create"), args.iterations)
+
+
+def bench_zip_cold(args):
+    from packager import build_zip, archive_cache, entry_cache
+
+    def clear():
+        archive_cache.clear()
+        entry_cache.clear()
+    files = project_files(n_files=40, file_bytes=32 * 1024)
+    return measure(lambda: build_zip(files), args.iterations, setup=clear)
+
+
+def bench_zip_one_changed(args):
+    from packager import build_zip
+    files = project_files(n_files=40, file_bytes=32 * 1024)
+    build_zip(files)
+    state = {"i": 0}
+
+    def change_one():
+        state["i"] += 1
+        files["src/module_0.py"] = f"# revision {state['i']}\n" + files["src/module_0.py"]
+    return measure(lambda: build_zip(files), args.iterations, setup=change_one)
+
+
+def bench_zip_cached(args):
+    from packager import build_zip
+    files = project_files(n_files=40, file_bytes=32 * 1024)
+    build_zip(files)
+    return measure(lambda: build_zip(files), args.iterations * 4)
+
+
+def _agent():
+    import ai_agent  # imported lazily so the other benchmarks don't pay for the agent's imports
+    return ai_agent
+
+
+def bench_save_memory(args):
+    agent = _agent()
+    for m in history(args.messages):
+        agent.remember(m["role"], m["content"])
+    agent.save_memory()
+
+    def run():
+        agent.remember("user", "one more request")
+        agent.remember("ai", "Used tool: command_runner\nResult: ok")
+        agent.save_memory()
+    return measure(run, args.iterations)
+
+
+def bench_agent_generate(args):
+    agent = _agent()
+    state = {"i": 0}
+
+    def run():
+        state["i"] += 1
+        agent.handle_user_prompt(f"create a new flask todo app number {state['i']}", on_progress=lambda e: None)
+    return measure(run, max(1, args.iterations // 2))
+
+
+def bench_agent_edit(args):
+    agent = _agent()
+    agent.handle_user_prompt("create a new flask app to edit", on_progress=lambda e: None)
+    target = agent.find_in_generated_projects("app.py")
+    return measure(lambda: agent.handle_user_prompt(f"fix the greeting in {target}"), max(1, args.iterations // 2))
+
+
+BENCHMARKS = {
+    "extract_json": bench_extract_json,
+    "memory_load_tail": bench_memory_load,
+    "memory_append": bench_memory_append,
+    "context_render": bench_context_render,
+    "lookup_cold": bench_lookup_cold,
+    "lookup_warm": bench_lookup_warm,
+    "create_project_from_json": bench_create_project,
+    "zip_cold": bench_zip_cold,
+    "zip_cached": bench_zip_cached,
+    "zip_one_changed": bench_zip_one_changed,
+    "save_memory": bench_save_memory,
+    "agent_generate": bench_agent_generate,
+    "agent_edit": bench_agent_edit,
+}
+
+
+# === Reporting ===
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_table(results):
+    print(f"\n{'benchmark':<26}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'peak KB':>11}{'wchar/it':>12}")
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"{name:<26}  skipped: {r['skipped']}")
+            continue
+        print(f"{name:<26}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['alloc_peak_kb']:>11.0f}{r.get('io_wchar', 0):>12.0f}")
+
+
+def compare(results, baseline_path, threshold):
+    """Print p50 changes against a saved run; return the names that regressed."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    regressions = []
+    for name, r in results.items():
+        old = baseline["results"].get(name)
+        if "skipped" in r or not old or "skipped" in old:
+            continue
+        change = (r["p50_ms"] - old["p50_ms"]) / old["p50_ms"] if old["p50_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  ❌ REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<26}{old['p50_ms']:>10.2f} → {r['p50_ms']:>10.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000, help="history size for memory benchmarks")
+    parser.add_argument("--projects", type=int, default=1000, help="generated projects for lookup benchmarks")
+    parser.add_argument("--response-mb", type=float, default=5.0, help="model reply size for extract_json")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p50 slowdown counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    os.chdir(workdir)  # the agent writes memory/ and generated_projects/ relative to cwd
+    results = {}
+    try:
+        for name, bench in BENCHMARKS.items():
+            if args.only and name not in args.only:
+                continue
+            print(f"▶ {name}...", flush=True)
+            quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            try:
+                with quiet:
+                    results[name] = bench(args)
+            except ImportError as e:
+                results[name] = {"skipped": f"missing dependency ({e.name})"}
+    finally:
+        # Write out the agent's sessions now: the atexit flush would recreate the deleted workdir
+        if "sessions" in sys.modules:
+            sys.modules["sessions"].sessions.close()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {"messages": args.messages, "projects": args.projects,
+                       "response_mb": args.response_mb, "iterations": args.iterations},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_startup.py
+"""
+Startup benchmark: how long the entry-point modules take to import, and how
+long a fresh process takes from start to the answer of its first prompt.
+
+Each sample is a new interpreter (python -X importtime), so nothing is warm
+except the OS page cache. The first prompt runs against the offline fake
+model in a scratch directory.
+
+  python benchmarks/bench_startup.py                      # table
+  python benchmarks/bench_startup.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["ai_agent", "project_builder", "tools.file_editor", "tools.git_manager"]
+
+FIRST_PROMPT = (
+    "import ai_agent; "
+    "ai_agent.handle_user_prompt('create a new flask todo app', on_progress=lambda e: None)"
+)
+
+
+def _env():
+    env = dict(os.environ, MODEL_BACKEND="fake", LLM_CACHE_BYPASS="1", TRACE_ENABLED="false",
+               PYTHONDONTWRITEBYTECODE="1")
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit():
+            modules[parts[2]] = (int(parts[0]), int(parts[1]))
+    return modules
+
+
+def sample(code, workdir):
+    """Run `code` in a fresh interpreter; return (wall seconds, importtime table)."""
+    script = f"import time; _t = time.perf_counter(); {code}; print('WALL', time.perf_counter() - _t)"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=workdir, env=_env(),
+                          capture_output=True, text=True, timeout=300)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed")
+    wall = next(float(line.split()[1]) for line in proc.stdout.splitlines() if line.startswith("WALL"))
+    return wall, parse_importtime(proc.stderr)
+
+
+def bench(name, code, repeat, workdir):
+    walls, tables = [], []
+    for _ in range(repeat):
+        wall, table = sample(code, workdir)
+        walls.append(wall)
+        tables.append(table)
+    # Heaviest third-party / repo imports (cumulative), from the median run
+    median_table = tables[walls.index(sorted(walls)[len(walls) // 2])]
+    top_level = {m: c for m, (_, c) in median_table.items() if "." not in m}
+    heaviest = sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[:8]
+    return {
+        "median_ms": statistics.median(walls) * 1000,
+        "min_ms": min(walls) * 1000,
+        "max_ms": max(walls) * 1000,
+        "modules_imported": len(median_table),
+        "heaviest_ms": {m: round(us / 1000, 1) for m, us in heaviest},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as workdir:
+        for module in MODULES:
+            print(f"▶ import {module}...", flush=True)
+            try:
+                results[f"import {module}"] = bench(module, f"import {module}", args.repeat, workdir)
+            except RuntimeError as e:
+                results[f"import {module}"] = {"skipped": str(e)}
+        print("▶ first prompt...", flush=True)
+        try:
+            results["first prompt"] = bench("first prompt", FIRST_PROMPT, args.repeat, workdir)
+        except RuntimeError as e:
+            results["first prompt"] = {"skipped": str(e)}
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"\n{'startup':<30}{'median ms':>11}{'min ms':>9}{'modules':>9}{'baseline':>10}")
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"{name:<30}  skipped: {r['skipped']}")
+            continue
+        old = baseline.get(name, {}).get("median_ms")
+        before = f"{old:>10.0f}" if old else f"{'-':>10}"
+        print(f"{name:<30}{r['median_ms']:>11.0f}{r['min_ms']:>9.0f}{r['modules_imported']:>9}{before}")
+        print(f"{'':<4}heaviest: " + ", ".join(f"{m} {ms:.0f}ms" for m, ms in r["heaviest_ms"].items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
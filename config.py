@@ -6,4 +6,113 @@ from dotenv import load_dotenv
 # Load .env file
 load_dotenv()
 API_KEY = os.getenv("API_KEY") 
-MODEL_NAME = os.getenv("MODEL_NAME")
\ No newline at end of file
+MODEL_NAME = os.getenv("MODEL_NAME")
+
+# Conversation context sent to the tool selector (tokens are approximated as ~4 chars each)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "400"))
+
+# Agent memory journal: messages loaded at startup / journal lines before it is rolled into an archive segment
+MEMORY_LOAD_LIMIT = int(os.getenv("MEMORY_LOAD_LIMIT", "1000"))
+MEMORY_COMPACT_AFTER = int(os.getenv("MEMORY_COMPACT_AFTER", "5000"))
+
+# LLM response cache (in-memory LRU + on-disk tier); set LLM_CACHE_BYPASS=1 to disable
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join("cache", "llm"))
+LLM_CACHE_ENTRIES = int(os.getenv("LLM_CACHE_ENTRIES", "256"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0").lower() in ("1", "true", "yes")
+
+# Rule-based fast-path router (skips the LLM tool-selection call for clear prompts)
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1").lower() in ("1", "true", "yes")
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8"))
+
+# Stream project generation: write each file as soon as the model finishes it
+STREAM_GENERATION = os.getenv("STREAM_GENERATION", "1").lower() in ("1", "true", "yes")
+
+# Persistent filename index over generated_projects/
+WORKSPACE_INDEX_FILE = os.getenv("WORKSPACE_INDEX_FILE", os.path.join("memory", "workspace_index.json"))
+
+# File edits: "diff" (search/replace hunks applied locally) or "full" (regenerate the whole file)
+EDIT_MODE = os.getenv("EDIT_MODE", "diff").lower()
+# Files larger than this (chars) are edited through a focused view of their relevant chunks
+EDIT_CONTEXT_CHARS = int(os.getenv("EDIT_CONTEXT_CHARS", "12000"))
+# Multi-file edits: concurrent Gemini calls
+EDIT_CONCURRENCY = int(os.getenv("EDIT_CONCURRENCY", "4"))
+
+# Command runner limits: wall-clock seconds, total output bytes, lines kept from head/tail
+COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", "300"))
+COMMAND_MAX_OUTPUT_BYTES = int(os.getenv("COMMAND_MAX_OUTPUT_BYTES", str(10 * 1024 * 1024)))
+COMMAND_HEAD_LINES = int(os.getenv("COMMAND_HEAD_LINES", "20"))
+COMMAND_TAIL_LINES = int(os.getenv("COMMAND_TAIL_LINES", "50"))
+# Longest output line kept (chars); the rest of a longer line is dropped (but counted)
+COMMAND_MAX_LINE_CHARS = int(os.getenv("COMMAND_MAX_LINE_CHARS", "4096"))
+
+# Background jobs: concurrent processes, per-job rlimits (0 = unlimited), log lines kept,
+# finished jobs kept (older ones are forgotten)
+JOB_MAX_CONCURRENT = int(os.getenv("JOB_MAX_CONCURRENT", "4"))
+JOB_CPU_SECONDS = int(os.getenv("JOB_CPU_SECONDS", "0"))
+JOB_MEMORY_MB = int(os.getenv("JOB_MEMORY_MB", "0"))
+JOB_LOG_LINES = int(os.getenv("JOB_LOG_LINES", "500"))
+JOB_KEEP_FINISHED = int(os.getenv("JOB_KEEP_FINISHED", "50"))
+
+# Project ZIP packaging: deflate level (0 = store only) and archive cache limits
+ZIP_COMPRESSLEVEL = int(os.getenv("ZIP_COMPRESSLEVEL", "6"))
+ZIP_CACHE_ENTRIES = int(os.getenv("ZIP_CACHE_ENTRIES", "16"))
+ZIP_CACHE_MAX_BYTES = int(os.getenv("ZIP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Compressed ZIP entries reused for unchanged files (by content hash), total size limit
+ZIP_ENTRY_CACHE_MAX_BYTES = int(os.getenv("ZIP_ENTRY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# GitHub uploads: API base URL (point at a local stub for testing), parallel blob uploads, request timeout
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_UPLOAD_CONCURRENCY = int(os.getenv("GITHUB_UPLOAD_CONCURRENCY", "8"))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))
+
+# HTTP API generation queue: worker threads, extra queued jobs before 429, finished jobs kept
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+GENERATION_QUEUE_SIZE = int(os.getenv("GENERATION_QUEUE_SIZE", "8"))
+GENERATION_KEEP_JOBS = int(os.getenv("GENERATION_KEEP_JOBS", "100"))
+
+# Model client: backend ("gemini" or the offline "fake"), request timeout (s), concurrent
+# calls, retries on rate-limit/transient errors, replay/record files (JSONL) and fake latency
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini").lower()
+MODEL_TIMEOUT = float(os.getenv("MODEL_TIMEOUT", "120"))
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "4"))
+MODEL_MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", os.getenv("EDIT_MAX_RETRIES", "4")))
+MODEL_REPLAY_FILE = os.getenv("MODEL_REPLAY_FILE", "")
+MODEL_RECORD_FILE = os.getenv("MODEL_RECORD_FILE", "")
+MODEL_FAKE_LATENCY = float(os.getenv("MODEL_FAKE_LATENCY", "0"))
+MODEL_FAKE_TOKENS_PER_SEC = float(os.getenv("MODEL_FAKE_TOKENS_PER_SEC", "0"))
+
+# Tracing: per-stage spans written to a JSONL file (rotated past the size limit), traces kept
+# in memory for the UI, and an optional OpenTelemetry collector (OTLP/HTTP JSON) endpoint
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", "memory/traces.jsonl")
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "50"))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+
+# Agent sessions: conversations kept in memory (LRU), idle time before a session is flushed and
+# evicted (s), write-behind flush interval (s; 0 = write each turn through) and journal folder
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "64"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "900"))
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "2"))
+SESSIONS_DIR = os.getenv("SESSIONS_DIR", os.path.join("memory", "sessions"))
+
+# Conversation retrieval: earlier messages (outside the recent window) most relevant to the
+# prompt are shown to tool selection; how many, and how much of each message (chars)
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_SNIPPET_CHARS = int(os.getenv("RETRIEVAL_SNIPPET_CHARS", "300"))
+# The retrieval index covers a session's whole journal and is saved next to it; messages
+# indexed between saves (the rest is caught up from the journal on the next load)
+RETRIEVAL_INDEX_SAVE_EVERY = int(os.getenv("RETRIEVAL_INDEX_SAVE_EVERY", "500"))
+
+# Project materialisation: threads writing a generated project's files in parallel
+PROJECT_WRITE_WORKERS = int(os.getenv("PROJECT_WRITE_WORKERS", "8"))
+
+# Speculative generation: when tool selection has to ask the LLM but the prompt looks like a
+# generation request (router.generation_likelihood >= SPECULATION_MIN_SCORE), start generating
+# the project at the same time and keep it only if project_generator is chosen
+SPECULATIVE_GENERATION = os.getenv("SPECULATIVE_GENERATION", "false").lower() in ("1", "true", "yes")
+SPECULATION_MIN_SCORE = float(os.getenv("SPECULATION_MIN_SCORE", "0.5"))
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "2"))
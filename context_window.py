@@ -0,0 +1,89 @@
+# context_window.py
+from collections import deque
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return max(1, len(text) // 4)
+
+
+def render_message(role, content):
+    """Format one message the way the tool selector expects to read it."""
+    return f"User: {content}" if role == "user" else f"AI: {content}"
+
+
+class ContextWindow:
+    """
+    Rolling, token-budgeted view of the conversation.
+
+    Recent messages are kept verbatim while they fit in `token_budget`.
+    Older messages are folded into a short running summary (one clipped line
+    per message, itself capped at `summary_tokens`). The rendered history is
+    cached, so a turn that evicts nothing only appends the new line.
+    """
+
+    def __init__(self, token_budget=2000, summary_tokens=400, summary_line_chars=120):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summary_line_chars = summary_line_chars
+
+        self._recent = deque()   # (line, tokens)
+        self._recent_tokens = 0
+        self._summary = deque()  # (line, tokens)
+        self._summary_tokens = 0
+        self._rendered = ""
+        self._dirty = False
+
+    def add(self, role, content):
+        """Append a message, evicting the oldest ones into the summary if over budget."""
+        line = render_message(role, content)
+        tokens = estimate_tokens(line)
+        self._recent.append((line, tokens))
+        self._recent_tokens += tokens
+
+        evicted = False
+        # Always keep the newest message, even if it alone exceeds the budget
+        while self._recent_tokens > self.token_budget and len(self._recent) > 1:
+            old_line, old_tokens = self._recent.popleft()
+            self._recent_tokens -= old_tokens
+            self._fold(old_line)
+            evicted = True
+
+        if evicted or self._dirty:
+            self._dirty = True
+        elif self._rendered:
+            self._rendered += "\n" + line
+        else:
+            self._rendered = line
+
+    def _fold(self, line):
+        """Fold an evicted message into the running summary."""
+        line = " ".join(line.split())
+        if len(line) > self.summary_line_chars:
+            line = line[: self.summary_line_chars - 1] + "…"
+        tokens = estimate_tokens(line)
+        self._summary.append((line, tokens))
+        self._summary_tokens += tokens
+        while self._summary_tokens > self.summary_tokens and len(self._summary) > 1:
+            _, old_tokens = self._summary.popleft()
+            self._summary_tokens -= old_tokens
+
+    def render(self):
+        """Return the history string (summary + recent messages)."""
+        if self._dirty:
+            parts = []
+            if self._summary:
+                parts.append("Summary of earlier conversation:")
+                parts.extend(f"- {line}" for line, _ in self._summary)
+                parts.append("Recent conversation:")
+            parts.extend(line for line, _ in self._recent)
+            self._rendered = "\n".join(parts)
+            self._dirty = False
+        return self._rendered
+
+    @property
+    def tokens(self):
+        return self._recent_tokens + self._summary_tokens
+
+    def __len__(self):
+        return len(self._recent)
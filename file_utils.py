@@ -1,14 +1,183 @@
 # file_utils.py
 import os
+import re
 import json
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from config import PROJECT_WRITE_WORKERS
+from manifest import Manifest, describe
+from tools.patcher import atomic_write, UMASK
+from tracing import traced, current_span
+
+
+PROJECT_NAME = re.compile(r"^project_(\d+)$")
+
+# Next free project number per base folder: one scan on first use, then a counter
+_next_ids = {}
+_ids_lock = threading.Lock()
+
+
+def allocate_project_id(base_folder):
+    """Reserve the next project_N number in `base_folder` (never reuses a number)."""
+    key = os.path.abspath(base_folder)
+    with _ids_lock:
+        if key not in _next_ids:
+            os.makedirs(key, exist_ok=True)
+            numbers = [int(m.group(1)) for m in map(PROJECT_NAME.match, os.listdir(key)) if m]
+            _next_ids[key] = max(numbers, default=0) + 1
+        project_id = _next_ids[key]
+        _next_ids[key] += 1
+        return project_id
+
+
+def safe_relative_path(path):
+    """Normalise a generated file path, rejecting absolute paths and anything escaping the project."""
+    if not isinstance(path, str) or not path.strip() or "\0" in path:
+        raise ValueError(f"Invalid file path: {path!r}")
+    normalized = os.path.normpath(path.replace("\\", "/"))
+    if os.path.isabs(normalized) or os.path.splitdrive(normalized)[0] or normalized.split(os.sep)[0] == "..":
+        raise ValueError(f"Unsafe file path: {path!r}")
+    if normalized == ".":
+        raise ValueError(f"Invalid file path: {path!r}")
+    return normalized
+
+
+def _atomic_write(root, path, content):
+    """Write `content` to root/path through a temp file and rename."""
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    atomic_write(full_path, content)
+    return full_path
+
+
+def _write_and_describe(root, path, content):
+    full_path = _atomic_write(root, path, content)
+    return path.replace(os.sep, "/"), describe(content, os.stat(full_path))
+
+
+class ProjectWriter:
+    """
+    Materialises one generated project.
+
+    Files are written in parallel (temp file + rename each) into a hidden
+    staging folder next to the projects, and `publish()` moves the finished
+    project into place as generated_projects/project_N with a single
+    directory rename, so nobody ever sees a half-written project. The
+    project's manifest (see manifest.py) is written along with it. Paths
+    that are absolute or escape the project are rejected. Used as a
+    context manager, an exception discards the staged files.
+    """
+
+    def __init__(self, base_folder="generated_projects", max_workers=PROJECT_WRITE_WORKERS):
+        self.base_folder = base_folder
+        self.project_id = allocate_project_id(base_folder)
+        self.staging = tempfile.mkdtemp(prefix=f".project_{self.project_id}-", dir=base_folder)
+        os.chmod(self.staging, 0o777 & ~UMASK)  # mkdtemp makes it 0700
+        self.files = {}
+        self.rejected = []
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="project-write")
+        self._futures = []
+        self._unreported = []  # (path, future) of writes not yet returned by written()
+
+    @property
+    def project_folder(self):
+        """Where the project will be published; final only once publish() returns."""
+        return os.path.join(self.base_folder, f"project_{self.project_id}")
+
+    def add(self, path, content):
+        """Queue a file for writing. Returns False (and skips it) if the path is unsafe."""
+        try:
+            rel_path = safe_relative_path(path)
+        except ValueError as e:
+            print(f"⚠️ Skipping file: {e}")
+            self.rejected.append(path)
+            return False
+        self.files[path] = content
+        future = self._pool.submit(_write_and_describe, self.staging, rel_path, content)
+        self._futures.append(future)
+        self._unreported.append((path, future))
+        return True
+
+    def written(self, wait=False):
+        """
+        Paths whose writes have finished since the last call, in the order they
+        were added (with `wait`, every remaining one). Failed writes are left
+        for publish() to raise.
+        """
+        done = []
+        while self._unreported:
+            path, future = self._unreported[0]
+            if not (wait or future.done()):
+                break
+            self._unreported.pop(0)
+            if future.exception() is None:  # waits for it
+                done.append(path)
+        return done
+
+    def publish(self):
+        """Wait for every write, then move the project into place. Returns its folder."""
+        manifest = Manifest(self.staging)
+        try:
+            for future in self._futures:
+                manifest.files.update([future.result()])
+        finally:
+            self._pool.shutdown()
+        manifest.save()
+        while True:
+            try:
+                # Another process may have taken this number meanwhile: move on to the next one
+                if not os.path.exists(self.project_folder):
+                    os.rename(self.staging, self.project_folder)
+                    return self.project_folder
+            except OSError:
+                if not os.path.exists(self.project_folder):
+                    raise
+            self.project_id = allocate_project_id(self.base_folder)
+
+    def abort(self):
+        self._pool.shutdown(cancel_futures=True)
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+
+def write_project(files, base_folder="generated_projects"):
+    """
+    Create a new project folder from {path: content}. Returns (project_folder,
+    files written), the latter without any rejected paths.
+    """
+    with ProjectWriter(base_folder) as writer:
+        for path, content in files.items():
+            writer.add(path, content)
+        return writer.publish(), writer.files
+
+
+def print_progress(event):
+    """Default progress reporter for the CLI."""
+    kind = event.get("event")
+    if kind == "start":
+        print("\n📁 Writing project files (the folder appears once all are written)...")
+    elif kind == "file":
+        print(f"  📄 {event['path']} ({event['bytes']} bytes) — {event['files_written']} file(s) so far")
+    elif kind == "done":
+        print(f"✅ {event['files_written']} file(s) written to {event['project_folder']}. "
+              f"Main file: {event.get('main_file') or '-'}")
+
+
+@traced("project.write")
 def create_project_from_json(json_or_dict, base_folder="generated_projects"):
     """
     Takes JSON (string) or a Python dict describing files and creates them
     in the workspace. Returns the path to the main file (if present).
     """
-    os.makedirs(base_folder, exist_ok=True)
-
     if isinstance(json_or_dict, str):
         try:
             data = json.loads(json_or_dict)
@@ -21,16 +190,67 @@ def create_project_from_json(json_or_dict, base_folder="generated_projects"):
         print("❌ Unsupported data type for project creation.")
         return None
 
-    project_count = len([n for n in os.listdir(base_folder) if os.path.isdir(os.path.join(base_folder, n))])
-    project_folder = os.path.join(base_folder, f"project_{project_count + 1}")
-    os.makedirs(project_folder, exist_ok=True)
-
-    for path, content in data.get("files", {}).items():
-        full_path = os.path.join(project_folder, path)
-        os.makedirs(os.path.dirname(full_path) or ".", exist_ok=True)
-        with open(full_path, "w", encoding="utf-8") as f:
-            f.write(content)
+    project_folder, _ = write_project(data.get("files", {}), base_folder)
+    current_span().set(files=len(data.get("files", {})))
 
     main_file = data.get("main_file")
     print(f"\n✅ Project created in: {project_folder}")
     return os.path.join(project_folder, main_file) if main_file else None
+
+
+@traced("project.write_stream")
+def create_project_from_stream(events, base_folder="generated_projects", on_progress=None):
+    """
+    Write files as they arrive from a streamed generation (see
+    ai_agent.stream_project_structure); the project appears in `base_folder`
+    once the stream is complete. `on_progress` receives dict events:
+    {"event": "start" | "file" | "done", ...}; defaults to printing them.
+    A "file" event is sent once that file is on disk; the project folder is
+    only known (and reported) in "done", as publishing may renumber it.
+
+    Returns (project_folder, data) where data mirrors the JSON shape
+    ({"files": {...}, "main_file": ...}), or (None, None) if nothing arrived.
+    """
+    on_progress = on_progress or print_progress
+    writer = None
+    main_file = None
+    reported = 0
+
+    def report(paths):
+        nonlocal reported
+        for path in paths:
+            reported += 1
+            on_progress({"event": "file", "path": path, "bytes": len(writer.files[path].encode("utf-8")),
+                         "files_written": reported})
+
+    try:
+        for event in events:
+            if event[0] == "file":
+                _, path, content = event
+                if writer is None:
+                    writer = ProjectWriter(base_folder)
+                    on_progress({"event": "start"})
+                writer.add(path, content)
+                report(writer.written())
+            elif event[0] == "main_file":
+                main_file = event[1]
+        if writer is None or not writer.files:
+            print("❌ No files were generated.")
+            if writer:
+                writer.abort()
+            return None, None
+        report(writer.written(wait=True))
+        project_folder = writer.publish()
+    except BaseException:
+        if writer:
+            writer.abort()
+        raise
+
+    files = writer.files
+    current_span().set(files=len(files), bytes=sum(len(c.encode("utf-8")) for c in files.values()))
+    on_progress({"event": "done", "files_written": len(files), "main_file": main_file,
+                 "project_folder": project_folder})
+    data = {"files": files}
+    if main_file:
+        data["main_file"] = main_file
+    return project_folder, data
@@ -0,0 +1,104 @@
+# generation_queue.py
+"""
+Background project generation for the HTTP API.
+
+Jobs run on a bounded worker pool; once `workers + max_pending` jobs are in
+flight `submit` raises QueueFull so the API can answer 429 instead of piling
+up work. The generate function is injectable, so the API can be exercised
+with a fake model.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import GENERATION_WORKERS, GENERATION_QUEUE_SIZE, GENERATION_KEEP_JOBS
+
+
+class QueueFull(Exception):
+    """Too many generations in flight; retry later."""
+
+
+def run_pipeline(prompt, on_progress):
+    """The real pipeline: stream Gemini's project JSON straight to disk."""
+    from ai_agent import stream_project_structure  # pulls in the whole agent; load on first job
+    from file_utils import create_project_from_stream
+    return create_project_from_stream(stream_project_structure(prompt), on_progress=on_progress)
+
+
+class GenerationQueue:
+    def __init__(self, generate_fn=run_pipeline, workers=GENERATION_WORKERS,
+                 max_pending=GENERATION_QUEUE_SIZE, keep_jobs=GENERATION_KEEP_JOBS):
+        """`generate_fn(prompt, on_progress)` returns (project_folder, data) like create_project_from_stream."""
+        self.generate_fn = generate_fn
+        self.capacity = workers + max_pending
+        self.keep_jobs = keep_jobs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="generate")
+        self._jobs = OrderedDict()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def submit(self, prompt):
+        """Queue a generation and return its job id; raises QueueFull when at capacity."""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise QueueFull(f"{self._in_flight} generations in flight")
+            self._in_flight += 1
+            job = {
+                "id": uuid.uuid4().hex,
+                "prompt": prompt,
+                "state": "queued",
+                "files_written": 0,
+                "current_file": None,
+                "main_file": None,
+                "project_folder": None,
+                "error": None,
+                "created_at": time.time(),
+                "finished_at": None,
+                "files": None,
+            }
+            self._jobs[job["id"]] = job
+            self._evict_finished()
+        self._pool.submit(self._run, job)
+        return job["id"]
+
+    def _evict_finished(self):
+        finished = [jid for jid, j in self._jobs.items() if j["state"] in ("done", "failed")]
+        for jid in finished[:max(0, len(self._jobs) - self.keep_jobs)]:
+            del self._jobs[jid]
+
+    def _run(self, job):
+        def on_progress(event):
+            if event["event"] == "file":
+                job["files_written"] = event["files_written"]
+                job["current_file"] = event["path"]
+
+        job["state"] = "running"
+        try:
+            project_folder, data = self.generate_fn(job["prompt"], on_progress)
+            if not data:
+                raise ValueError("the model returned no files")
+            job.update(files=data.get("files", {}), main_file=data.get("main_file"),
+                       project_folder=project_folder, current_file=None, state="done")
+        except Exception as e:
+            job.update(error=f"{type(e).__name__}: {e}", state="failed")
+        finally:
+            job["finished_at"] = time.time()
+            with self._lock:
+                self._in_flight -= 1
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Public view of a job (without file contents), or None."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        view = {k: v for k, v in job.items() if k != "files"}
+        view["file_count"] = len(job["files"]) if job["files"] is not None else job["files_written"]
+        return view
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
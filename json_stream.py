@@ -0,0 +1,208 @@
+# json_stream.py
+"""
+Incremental parsing of (possibly chunked) model output.
+
+JsonObjectScanner finds balanced top-level JSON objects in free-form text in
+a single pass. ProjectStreamParser understands the project-generator response
+shape ({"files": {"path": "code", ...}, "main_file": "..."}) and reports each
+file as soon as its string value is complete, without waiting for the whole reply.
+"""
+import json
+import re
+
+# Everything up to the next quote or backslash inside a JSON string
+_STRING_RUN = re.compile(r'[^"\\]+')
+# Inside an object: a whole (terminated) string, or a brace, or a lone quote
+# that opens a string continuing into the next chunk. The unrolled-loop form
+# cannot backtrack more than once per character.
+_OBJECT_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}"]', re.DOTALL)
+# Rest of a string that started in an earlier chunk, up to its closing quote
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+def _decode_string(raw):
+    """Decode the body of a JSON string (without the surrounding quotes)."""
+    try:
+        return json.loads('"' + raw + '"')
+    except json.JSONDecodeError:
+        # Models sometimes emit raw control characters inside strings
+        return json.loads('"' + raw + '"', strict=False)
+
+
+class JsonObjectScanner:
+    """
+    Single-pass, string-aware scanner for balanced {...} objects.
+
+    `feed()` accepts text in arbitrary chunks and returns the complete
+    top-level objects (as strings) that closed in that chunk. Text outside
+    objects, such as prose or ```json fences, is skipped without being copied,
+    and every character is consumed by at most one regex step, so scanning is linear.
+    """
+
+    def __init__(self):
+        self._parts = []        # pieces of the object currently being read
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        objects = []
+        i, n = 0, len(text)
+        start = 0 if self._depth else None
+        while i < n:
+            if self._depth == 0:
+                i = text.find("{", i)
+                if i < 0:
+                    break
+                start, self._depth = i, 1
+                i += 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _STRING_TAIL.match(text, i) if text.find('"', i) >= 0 else None
+                if m:
+                    self._in_string = False
+                    i = m.end()
+                else:
+                    # String continues into the next chunk; note a trailing backslash
+                    rest = text[i:]
+                    self._escape = (len(rest) - len(rest.rstrip("\\"))) % 2 == 1
+                    i = n
+            else:
+                m = _OBJECT_TOKEN.search(text, i)
+                if not m:
+                    i = n
+                    continue
+                token, i = m.group(), m.end()
+                if token == '"':
+                    self._in_string = True
+                elif token == "{":
+                    self._depth += 1
+                elif token == "}":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._parts.append(text[start:i])
+                        objects.append("".join(self._parts))
+                        self._parts, start = [], None
+        if self._depth and start is not None:
+            self._parts.append(text[start:])
+        return objects
+
+
+def loads_object(candidate):
+    """Parse one scanned object, retrying without stray code fences; None if invalid."""
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    if "```" in candidate:
+        try:
+            return json.loads(candidate.replace("```json", "").replace("```", ""))
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def extract_first_object(text):
+    """Return the first balanced JSON object in `text` that parses, or None."""
+    if not text:
+        return None
+    for candidate in JsonObjectScanner().feed(text):
+        data = loads_object(candidate)
+        if data is not None:
+            return data
+    return None
+
+
+class ProjectStreamParser:
+    """
+    Feed text chunks with `feed()`; it returns a list of events:
+
+        ("file", path, content)   when one entry of "files" is complete
+        ("main_file", name)       when "main_file" is read
+        ("done",)                 when the top-level object closes
+
+    Text before the first "{" (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self._stack = []        # [[kind, current_key, expect_key], ...] for open containers
+        self._in_string = False
+        self._escape = False
+        self._raw = []          # pieces of the string being read
+        self.done = False
+        self.files = {}
+        self.main_file = None
+
+    def feed(self, text):
+        events = []
+        i, n = 0, len(text)
+        while i < n and not self.done:
+            if self._in_string:
+                if self._escape:
+                    self._raw.append(text[i])
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _STRING_RUN.match(text, i)
+                if m:
+                    self._raw.append(m.group())
+                    i = m.end()
+                    continue
+                c = text[i]
+                i += 1
+                if c == "\\":
+                    self._raw.append(c)
+                    self._escape = True
+                else:  # closing quote
+                    self._in_string = False
+                    self._on_string(_decode_string("".join(self._raw)), events)
+                    self._raw = []
+                continue
+
+            c = text[i]
+            i += 1
+            if not self._stack:
+                if c == "{":
+                    self._stack.append(["obj", None, True])
+                continue
+            top = self._stack[-1]
+            if c == '"':
+                self._in_string = True
+            elif c == "{":
+                self._stack.append(["obj", None, True])
+            elif c == "[":
+                self._stack.append(["arr", None, False])
+            elif c in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    self.done = True
+                    events.append(("done",))
+            elif c == ":":
+                top[2] = False
+            elif c == ",":
+                if top[0] == "obj":
+                    top[1], top[2] = None, True
+        return events
+
+    def _on_string(self, value, events):
+        top = self._stack[-1]
+        if top[0] == "obj" and top[2]:
+            top[1] = value  # object key
+            return
+        depth = len(self._stack)
+        if depth == 2 and top[0] == "obj" and self._stack[0][1] == "files" and top[1] is not None:
+            self.files[top[1]] = value
+            events.append(("file", top[1], value))
+        elif depth == 1 and top[1] == "main_file":
+            self.main_file = value
+            events.append(("main_file", value))
+
+    def result(self):
+        """The project data parsed so far, in the same shape as extract_json's output."""
+        data = {"files": dict(self.files)}
+        if self.main_file is not None:
+            data["main_file"] = self.main_file
+        return data
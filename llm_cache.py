@@ -0,0 +1,155 @@
+# llm_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import (LLM_CACHE_DIR, LLM_CACHE_ENTRIES, LLM_CACHE_TTL,
+                    LLM_CACHE_MAX_BYTES, LLM_CACHE_BYPASS)
+
+
+class ResponseCache:
+    """
+    Two-tier, content-addressed cache for LLM responses.
+
+    Keys are a SHA-256 of (model name, prompt, file content). The first tier is
+    an in-memory LRU of `max_entries` responses; the second is one JSON file
+    per key under `directory`, expired after `ttl` seconds and trimmed
+    (oldest first) once the tier exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory, max_entries=256, ttl=7 * 24 * 3600,
+                 max_bytes=50 * 1024 * 1024, bypass=False):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # lazily measured
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+    @staticmethod
+    def make_key(model_name, prompt, content=""):
+        h = hashlib.sha256()
+        for part in (model_name or "", prompt or "", content or ""):
+            data = part.encode("utf-8")
+            h.update(len(data).to_bytes(8, "big"))
+            h.update(data)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    # === Lookup ===
+    def get(self, key):
+        if self.bypass:
+            return None
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return text
+
+        text = self._read_disk(key)
+        with self._lock:
+            if text is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            self._remember(key, text)
+        return text
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("text")
+        except (OSError, ValueError):
+            return None
+
+    # === Store ===
+    def put(self, key, text):
+        if self.bypass or text is None:
+            return
+        with self._lock:
+            self._remember(key, text)
+            self.stats["writes"] += 1
+        try:
+            self._write_disk(key, text)
+        except OSError as e:
+            print("⚠️ Failed to write LLM cache entry:", e)
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _write_disk(self, key, text):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({"created": time.time(), "text": text}, ensure_ascii=False)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+            else:
+                self._disk_bytes += os.path.getsize(path)
+            if self._disk_bytes > self.max_bytes:
+                self._evict_disk()
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _evict_disk(self):
+        """Drop expired entries, then the oldest ones until back under 90% of the limit."""
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        for path, size, mtime in entries:
+            if total <= self.max_bytes * 0.9 and now - mtime <= self.ttl:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for path, _, _ in list(self._disk_entries()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._disk_bytes = 0
+
+
+response_cache = ResponseCache(LLM_CACHE_DIR, max_entries=LLM_CACHE_ENTRIES, ttl=LLM_CACHE_TTL,
+                               max_bytes=LLM_CACHE_MAX_BYTES, bypass=LLM_CACHE_BYPASS)
+
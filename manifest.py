@@ -0,0 +1,146 @@
+# manifest.py
+"""
+Content manifest of a generated project.
+
+Every project folder written by the agent carries `.manifest.json`:
+
+    {"version": 1, "files": {"app.py": {"sha256": ..., "blob": ..., "size": ..., "mtime_ns": ...}}}
+
+`blob` is the git blob id of the content, so the GitHub uploader can tell
+which files a remote tree already has. Writers (file_utils.ProjectWriter,
+modify_file, the edit pipeline) keep it current through `write_if_changed`,
+which also skips rewriting a file whose content is unchanged. An entry only
+counts as current while the file's size and mtime still match, so edits made
+outside the agent are noticed.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from tools.patcher import atomic_write
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def _as_bytes(content):
+    return content.encode("utf-8") if isinstance(content, str) else bytes(content)
+
+
+def git_blob_sha(data):
+    """The id git (and the GitHub API) gives a blob with these bytes."""
+    data = _as_bytes(data)
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def describe(data, stat=None):
+    """Manifest entry for `data`, optionally with the written file's size and mtime."""
+    data = _as_bytes(data)
+    entry = {"sha256": hashlib.sha256(data).hexdigest(), "blob": git_blob_sha(data), "size": len(data)}
+    if stat is not None:
+        entry["mtime_ns"] = stat.st_mtime_ns
+    return entry
+
+
+class Manifest:
+    def __init__(self, folder, files=None):
+        self.folder = folder
+        self.files = dict(files or {})  # relative path ("/" separated) -> entry
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.folder, MANIFEST_NAME)
+
+    @classmethod
+    def load(cls, folder):
+        """The folder's manifest; empty if it has none (or it is unreadable)."""
+        try:
+            with open(os.path.join(folder, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                files = json.load(f).get("files", {})
+        except (OSError, ValueError, AttributeError):
+            files = {}
+        return cls(folder, files)
+
+    def _key(self, file_path):
+        return os.path.relpath(os.path.abspath(file_path), os.path.abspath(self.folder)).replace(os.sep, "/")
+
+    def current(self, file_path):
+        """The entry for a file, or None if it is missing or the file changed on disk since."""
+        entry = self.files.get(self._key(file_path))
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if stat.st_size != entry.get("size") or stat.st_mtime_ns != entry.get("mtime_ns"):
+            return None
+        return entry
+
+    def record(self, file_path, entry):
+        with self._lock:
+            self.files[self._key(file_path)] = entry
+
+    def save(self):
+        # Written under the lock too, so an older snapshot can never replace a newer one
+        with self._lock:
+            text = json.dumps({"version": 1, "files": self.files}, indent=1, sort_keys=True)
+            atomic_write(self.path, text)
+
+
+def project_root(file_path):
+    """The nearest folder above `file_path` that has a manifest, or None."""
+    folder = os.path.dirname(os.path.abspath(file_path))
+    while True:
+        if os.path.exists(os.path.join(folder, MANIFEST_NAME)):
+            return folder
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+
+# One manifest (and lock) per project folder, shared by every writer in this process
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(folder):
+    key = os.path.abspath(folder)
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = Manifest.load(key)
+        return _manifests[key]
+
+
+def write_if_changed(file_path, text):
+    """
+    Atomically write `text` to `file_path` unless the file already holds exactly
+    that, and record it in the project's manifest. Returns True if it wrote.
+    """
+    root = project_root(file_path)
+    manifest = get_manifest(root) if root else None
+    new_entry = describe(text)
+
+    entry = manifest.current(file_path) if manifest else None
+    if entry is not None:
+        unchanged = entry["sha256"] == new_entry["sha256"]
+    else:
+        # No up-to-date entry: compare with what is on disk
+        try:
+            with open(file_path, "rb") as f:
+                unchanged = f.read() == _as_bytes(text)
+        except OSError:
+            unchanged = False
+    if unchanged:
+        if manifest and entry is None:
+            manifest.record(file_path, describe(text, os.stat(file_path)))
+            manifest.save()
+        return False
+
+    atomic_write(file_path, text)
+    if manifest:
+        manifest.record(file_path, describe(text, os.stat(file_path)))
+        manifest.save()
+    return True
@@ -0,0 +1,209 @@
+# memory_store.py
+import json
+import os
+import re
+import threading
+
+
+class MemoryStore:
+    """
+    Append-only JSONL journal of conversation messages.
+
+    Each message is one line ({"role": ..., "content": ...}), so a turn only
+    appends its new messages instead of rewriting the whole history. Loading
+    reads just the tail of the file, and a torn last line (crash mid-write) is
+    skipped. When the journal grows past `compact_after` lines it is rolled:
+    renamed to the next read-only segment (agent_memory.000001.jsonl, ...) and
+    a new journal is started. Nothing is ever dropped; `keep` only limits how
+    many messages `load_tail` returns, and `iter_messages` replays them all.
+    """
+
+    def __init__(self, path, legacy_path=None, keep=1000, compact_after=5000):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.keep = keep
+        self.compact_after = compact_after
+        self._lines = None  # lazily counted
+        self._lock = threading.Lock()
+
+    # === Segments ===
+    def _segment_path(self, number):
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{number:06d}{ext}"
+
+    def _segments(self):
+        """[(number, path)] of the rolled segments, oldest first."""
+        folder = os.path.dirname(self.path) or "."
+        root, ext = os.path.splitext(os.path.basename(self.path))
+        pattern = re.compile(re.escape(root) + r"\.(\d{6,})" + re.escape(ext) + "$")
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return []
+        found = []
+        for name in names:
+            m = pattern.match(name)
+            if m:
+                found.append((int(m.group(1)), os.path.join(folder, name)))
+        return sorted(found)
+
+    def files(self):
+        """Every journal file, oldest first: the segments, then the live journal."""
+        paths = [path for _, path in self._segments()]
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        return paths
+
+    # === Loading ===
+    def load_tail(self, limit=None):
+        """Return up to `limit` (default `keep`) most recent messages, reading back across segments."""
+        limit = self.keep if limit is None else limit
+        self._migrate_legacy()
+        if limit <= 0:
+            return []
+
+        messages = []
+        for path in reversed(self.files()):
+            if len(messages) >= limit:
+                break
+            messages = self._parse(self._tail_lines(path, limit - len(messages) + 8)) + messages
+        return messages[-limit:]
+
+    def position(self):
+        """Where the stored history ends now: (last segment number, live journal size)."""
+        segments = self._segments()
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        return [segments[-1][0] if segments else 0, size]
+
+    def iter_messages(self, since=None):
+        """
+        Every stored message, oldest first, streamed from the segments and the live
+        journal. With `since` (an earlier `position()`), only the messages stored
+        after it; raises ValueError if the journal no longer extends that position.
+        """
+        self._migrate_legacy()
+        segment, offset = since or (0, 0)
+        paths = [path for number, path in self._segments() if number > segment] + [self.path]
+        for path in paths:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue  # no live journal yet
+            with f:
+                if offset:
+                    if os.fstat(f.fileno()).st_size < offset:
+                        raise ValueError(f"{path} is shorter than the given position")
+                    f.seek(offset)
+                    offset = 0
+                yield from self._parse(line.decode("utf-8", errors="replace") for line in f)
+        if offset:
+            raise ValueError(f"{self.path} is shorter than the given position")
+
+    @staticmethod
+    def _parse(lines):
+        messages = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                m = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write from a crash
+            if isinstance(m, dict):
+                messages.append(m)
+        return messages
+
+    def _tail_lines(self, path, limit, block_size=64 * 1024):
+        """Read the last `limit` lines of a journal file without scanning the whole file."""
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            # One extra line so a partial first line can be dropped
+            while pos > 0 and data.count(b"\n") <= limit:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.split(b"\n")
+        if pos > 0:
+            lines = lines[1:]
+        return [l.decode("utf-8", errors="replace") for l in lines if l.strip()][-limit:]
+
+    def _migrate_legacy(self):
+        """One-time import of the old single-JSON-list memory file."""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        if os.path.exists(self.path) or self._segments():
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                messages = json.load(f)
+        except Exception as e:
+            print("⚠️ Failed to migrate legacy memory:", e)
+            return
+        self._rewrite(messages)
+        print(f"✅ Migrated {len(messages)} messages to {self.path}.")
+
+    # === Writing ===
+    def append(self, messages):
+        """Append messages to the journal and fsync, compacting when it gets large."""
+        if not messages:
+            return
+        payload = "".join(json.dumps(m, ensure_ascii=False) + "\n" for m in messages)
+        with self._lock:
+            self._migrate_legacy()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self._lines is None:
+                self._lines = self._count_lines()
+            with open(self.path, "a", encoding="utf-8") as f:
+                if f.tell() > 0 and not self._ends_with_newline():
+                    f.write("\n")  # isolate a torn line left by a crash
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self._lines += len(messages)
+            if self._lines > self.compact_after:
+                self.compact()
+
+    def compact(self):
+        """
+        Roll the journal: rename it (atomically) to the next segment and start an
+        empty one. Earlier messages stay readable through load_tail/iter_messages.
+        """
+        if not os.path.exists(self.path):
+            return
+        segments = self._segments()
+        number = segments[-1][0] + 1 if segments else 1
+        os.replace(self.path, self._segment_path(number))
+        open(self.path, "w", encoding="utf-8").close()
+        self._lines = 0
+
+    def _rewrite(self, messages):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for m in messages:
+                f.write(json.dumps(m, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._lines = len(messages)
+
+    def _count_lines(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1024 * 1024), b""))
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
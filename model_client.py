@@ -0,0 +1,318 @@
+# model_client.py
+"""
+Shared model-client layer.
+
+Every LLM call in the agent goes through one `ModelClient`, which wraps a
+backend with the response cache, a concurrency limit, per-request timeouts
+and retry/backoff on rate limits and transient errors.
+
+Backends:
+- GeminiBackend: the real model, configured lazily on first use and shared
+  (one GenerativeModel, so its transport is reused across calls).
+- FakeBackend: deterministic local responses, either replayed from a JSONL
+  recording or synthesised from the prompt, with configurable latency. Used
+  for offline runs and reproducible benchmarks (MODEL_BACKEND=fake).
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from config import (API_KEY, MODEL_NAME, MODEL_BACKEND, MODEL_TIMEOUT, MODEL_MAX_CONCURRENCY,
+                    MODEL_MAX_RETRIES, MODEL_REPLAY_FILE, MODEL_RECORD_FILE,
+                    MODEL_FAKE_LATENCY, MODEL_FAKE_TOKENS_PER_SEC)
+from context_window import estimate_tokens
+from llm_cache import ResponseCache, response_cache
+from tracing import span, start_span
+
+# Errors worth retrying: Gemini quota / rate limits and transient server trouble
+RETRYABLE_MARKERS = ("429", "resourceexhausted", "resource exhausted", "rate limit", "quota",
+                     "503", "serviceunavailable", "service unavailable", "deadlineexceeded", "timed out")
+
+
+def is_retryable(exc):
+    text = f"{type(exc).__name__} {exc}".lower()
+    return any(marker in text for marker in RETRYABLE_MARKERS)
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=30.0):
+    """Exponential backoff with jitter for the given (0-based) retry attempt."""
+    return min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def prompt_key(prompt):
+    """Key of a prompt in replay recordings."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+# === Backends ===
+class GeminiBackend:
+    def __init__(self, api_key=API_KEY, model_name=MODEL_NAME, timeout=MODEL_TIMEOUT):
+        self.name = model_name
+        self.api_key = api_key
+        self.timeout = timeout
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.name)
+            return self._model
+
+    def generate(self, prompt):
+        response = self._get_model().generate_content(prompt, request_options={"timeout": self.timeout})
+        return response.text
+
+    def stream(self, prompt):
+        response = self._get_model().generate_content(prompt, stream=True,
+                                                      request_options={"timeout": self.timeout})
+        for chunk in response:
+            try:
+                yield chunk.text
+            except ValueError:
+                continue  # chunk without text parts (e.g. safety metadata)
+
+
+class FakeBackend:
+    """
+    Offline stand-in for the model. Replies come from `replay_file` (JSONL of
+    {"key": prompt_key(prompt), "text": ...}, as written by MODEL_RECORD_FILE)
+    when the prompt was recorded, otherwise from `synthetic_response`.
+    `latency` is the delay before the first token, `tokens_per_sec` (0 = instant)
+    paces the rest, at roughly 4 characters per token.
+    """
+
+    chunk_chars = 64
+
+    def __init__(self, replay_file=MODEL_REPLAY_FILE, latency=MODEL_FAKE_LATENCY,
+                 tokens_per_sec=MODEL_FAKE_TOKENS_PER_SEC, responder=None):
+        self.name = "fake"
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.responder = responder or synthetic_response
+        self.replay = {}
+        self.stats = {"replayed": 0, "synthesized": 0}
+        if replay_file and os.path.exists(replay_file):
+            with open(replay_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.replay[entry["key"]] = entry["text"]
+                    except (ValueError, KeyError):
+                        continue
+
+    def _reply(self, prompt):
+        text = self.replay.get(prompt_key(prompt))
+        if text is not None:
+            self.stats["replayed"] += 1
+            return text
+        self.stats["synthesized"] += 1
+        return self.responder(prompt)
+
+    def _chunk_delay(self):
+        return self.chunk_chars / 4 / self.tokens_per_sec if self.tokens_per_sec else 0.0
+
+    def generate(self, prompt):
+        text = self._reply(prompt)
+        time.sleep(self.latency + self._chunk_delay() * (len(text) // self.chunk_chars))
+        return text
+
+    def stream(self, prompt):
+        text = self._reply(prompt)
+        time.sleep(self.latency)
+        delay = self._chunk_delay()
+        for i in range(0, len(text), self.chunk_chars):
+            if i and delay:
+                time.sleep(delay)
+            yield text[i:i + self.chunk_chars]
+
+
+_CODE_BLOCK = re.compile(r'```[^\n]*\n(.*?)\n\s*```', re.DOTALL)
+_REQUEST_LINE = re.compile(r'Request:\s*(.*)')
+
+
+def synthetic_response(prompt):
+    """Deterministic replies shaped like what the agent expects for each of its prompts."""
+    if "Decide which ONE tool" in prompt:
+        from router import score_prompt
+        m = re.search(r'user request:\s*"(.*)"\s*\n\s*Respond in pure JSON', prompt, re.DOTALL)
+        scored = score_prompt(m.group(1) if m else "")
+        tool, args = (scored[0][1], scored[0][2]) if scored else ("project_generator", {})
+        return json.dumps({"tool": tool, "args": args})
+
+    if "expert AI code generator" in prompt:
+        task = prompt.rsplit("Task:", 1)[-1].strip()
+        digest = prompt_key(task)[:8]
+        return json.dumps({
+            "files": {
+                "app.py": f'# {task}\n\n\ndef main():\n    print("project {digest}")\n\n\n'
+                          f'if __name__ == "__main__":\n    main()\n',
+                "templates/index.html": f"<html><body><h1>{task}</h1></body></html>\n",
+                "README.md": f"# Project {digest}\n\n{task}\n",
+            },
+            "main_file": "app.py",
+        }, indent=2)
+
+    m = _REQUEST_LINE.search(prompt)
+    request = m.group(1).strip() if m else "change"
+    if "<<<<<<< SEARCH" in prompt:
+        return f"<<<<<<< SEARCH\n=======\n# {request}\n>>>>>>> REPLACE"
+    code = _CODE_BLOCK.search(prompt)
+    if code:
+        return f"{code.group(1).rstrip()}\n# {request}\n"
+    return "OK"
+
+
+# === Client ===
+class ModelClient:
+    def __init__(self, backend, max_concurrency=MODEL_MAX_CONCURRENCY, retries=MODEL_MAX_RETRIES,
+                 cache=response_cache, record_file=MODEL_RECORD_FILE):
+        self.backend = backend
+        self.retries = retries
+        self.cache = cache
+        self.record_file = record_file
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._record_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "cache_hits": 0, "retries": 0, "errors": 0, "model_seconds": 0.0}
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def _record(self, prompt, text):
+        if not self.record_file or isinstance(self.backend, FakeBackend):
+            return
+        line = json.dumps({"key": prompt_key(prompt), "text": text}, ensure_ascii=False)
+        with self._record_lock:
+            os.makedirs(os.path.dirname(self.record_file) or ".", exist_ok=True)
+            with open(self.record_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _cache_lookup(self, prompt, content, bypass):
+        use_cache = self.cache is not None and not bypass and not self.cache.bypass
+        key = ResponseCache.make_key(self.backend.name, prompt, content)
+        text = self.cache.get(key) if use_cache else None
+        if text is not None:
+            self._count(cache_hits=1)
+        return use_cache, key, text
+
+    def _retry_wait(self, attempt, exc):
+        if attempt >= self.retries or not is_retryable(exc):
+            self._count(errors=1)
+            return False
+        delay = backoff_delay(attempt)
+        print(f"⏳ Rate limited ({type(exc).__name__}); retrying in {delay:.1f}s...")
+        self._count(retries=1)
+        time.sleep(delay)
+        return True
+
+    def generate(self, prompt, content="", bypass=False, validate=None):
+        """
+        Return the model's reply to `prompt`, serving repeats from the cache.
+        `content` (e.g. the file being edited) is folded into the cache key; if
+        `validate` is given, only replies it accepts are cached.
+        """
+        with span("model.generate", backend=self.backend.name, prompt_tokens=estimate_tokens(prompt)) as s:
+            use_cache, key, text = self._cache_lookup(prompt, content, bypass)
+            if text is not None:
+                s.set(cached=True, response_tokens=estimate_tokens(text))
+                return text
+
+            for attempt in range(self.retries + 1):
+                start = time.monotonic()
+                try:
+                    with self._slots:
+                        self._count(calls=1)
+                        text = self.backend.generate(prompt)
+                    break
+                except Exception as e:
+                    if not self._retry_wait(attempt, e):
+                        raise
+                finally:
+                    self._count(model_seconds=time.monotonic() - start)
+
+            s.set(cached=False, attempts=attempt + 1, response_tokens=estimate_tokens(text))
+            self._record(prompt, text)
+            if use_cache and (validate is None or validate(text)):
+                self.cache.put(key, text)
+            return text
+
+    def stream(self, prompt, content="", bypass=False, validate=None):
+        """
+        Streaming counterpart of generate: yields text chunks as the model
+        produces them (a cache hit is yielded as a single chunk). Errors before
+        the first chunk are retried; the joined reply is cached at the end.
+        """
+        # Not made current: the consumer's own spans run between our yields
+        s = start_span("model.stream", backend=self.backend.name, prompt_tokens=estimate_tokens(prompt))
+        use_cache, key, text = self._cache_lookup(prompt, content, bypass)
+        if text is not None:
+            s.set(cached=True, response_tokens=estimate_tokens(text))
+            s.finish()
+            yield text
+            return
+
+        chunks = []
+        try:
+            for attempt in range(self.retries + 1):
+                start = time.monotonic()
+                try:
+                    with self._slots:
+                        self._count(calls=1)
+                        for text in self.backend.stream(prompt):
+                            if not chunks:
+                                s.set(first_chunk_ms=round((time.monotonic() - start) * 1000, 1))
+                            chunks.append(text)
+                            yield text
+                    break
+                except Exception as e:
+                    if chunks or not self._retry_wait(attempt, e):
+                        raise
+                finally:
+                    self._count(model_seconds=time.monotonic() - start)
+        except BaseException as e:
+            s.finish(error=e)
+            raise
+
+        full_text = "".join(chunks)
+        s.set(cached=False, attempts=attempt + 1, chunks=len(chunks), response_tokens=estimate_tokens(full_text))
+        s.finish()
+        self._record(prompt, full_text)
+        if use_cache and (validate is None or validate(full_text)):
+            self.cache.put(key, full_text)
+
+
+def make_backend(kind=MODEL_BACKEND):
+    if kind == "fake":
+        return FakeBackend()
+    if kind == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown MODEL_BACKEND: {kind!r} (expected 'gemini' or 'fake')")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client for MODEL_BACKEND, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ModelClient(make_backend())
+        return _client
+
+
+def set_client(client):
+    """Replace the shared client (e.g. with a FakeBackend one for benchmarks)."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,225 @@
+# packager.py
+"""
+Build project ZIP archives straight from the generated file map.
+
+`iter_zip` streams the archive in chunks (for HTTP responses), `build_zip`
+returns the whole archive as bytes (for Streamlit's download button). Both
+go through a small content-addressed cache, so downloading the same project
+again doesn't rebuild it. Below that, compressed entries are cached by file
+content, so re-zipping a project after a small change only compresses the
+files that changed.
+"""
+import hashlib
+import os
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+
+from config import ZIP_COMPRESSLEVEL, ZIP_CACHE_ENTRIES, ZIP_CACHE_MAX_BYTES, ZIP_ENTRY_CACHE_MAX_BYTES
+
+# Already-compressed formats: deflating them again only costs CPU
+STORE_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".zip", ".gz", ".tgz", ".bz2", ".xz",
+    ".7z", ".jar", ".whl", ".woff", ".woff2", ".mp3", ".mp4", ".ogg", ".webm", ".pdf",
+}
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object: zipfile writes, the generator drains."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _as_bytes(content):
+    return content.encode("utf-8") if isinstance(content, str) else bytes(content)
+
+
+def _compression_for(path, compresslevel):
+    if compresslevel == 0 or os.path.splitext(path)[1].lower() in STORE_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _digests(files):
+    return {path: hashlib.sha256(_as_bytes(content)).digest() for path, content in files.items()}
+
+
+def archive_key(files, compresslevel=ZIP_COMPRESSLEVEL, digests=None):
+    """Content hash identifying the archive a file map would produce."""
+    digests = digests or _digests(files)
+    h = hashlib.sha256(f"level={compresslevel}\0".encode())
+    for path in sorted(files):
+        h.update(path.encode("utf-8") + b"\0")
+        h.update(digests[path])
+    return h.hexdigest()
+
+
+class ArchiveCache:
+    """
+    LRU of built archives keyed by `archive_key`, bounded by count and total
+    size (`sizeof(value)`, the length by default).
+    """
+
+    def __init__(self, max_entries=ZIP_CACHE_ENTRIES, max_bytes=ZIP_CACHE_MAX_BYTES, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return data
+
+    def put(self, key, data):
+        size = self.sizeof(data)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self.sizeof(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._size -= self.sizeof(old)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+archive_cache = ArchiveCache()
+
+# (content sha256, method, level) -> (crc32, compressed payload); bounded by payload size only
+entry_cache = ArchiveCache(max_entries=1 << 30, max_bytes=ZIP_ENTRY_CACHE_MAX_BYTES,
+                           sizeof=lambda entry: len(entry[1]))
+
+
+# === Streaming ZIP writer (entries may come pre-compressed from entry_cache) ===
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_UTF8_NAMES = 0x800
+_MAX_PLAIN_ZIP = 0x7FFFFFFF  # well under the 4 GiB offsets/sizes that would need ZIP64
+
+
+def _dos_datetime(t):
+    year, month, day, hour, minute, second = t
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def _compressed_entry(data, digest, method, compresslevel):
+    """(crc32, payload) for one file, reusing a cached payload for identical content."""
+    key = (digest, method, compresslevel)
+    entry = entry_cache.get(key)
+    if entry is None:
+        if method == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+            payload = compressor.compress(data) + compressor.flush()
+        else:
+            payload = data
+        entry = (zlib.crc32(data), payload)
+        entry_cache.put(key, entry)
+    return entry
+
+
+def _write_entries(files, compresslevel, digests):
+    """Yield the ZIP for {path: str|bytes} one entry at a time (no ZIP64: small archives only)."""
+    dos_time, dos_date = _dos_datetime(time.localtime()[:6])
+    central, offset = [], 0
+    for path, content in files.items():
+        data = _as_bytes(content)
+        name = path.replace("\\", "/").lstrip("/").encode("utf-8")
+        method = _compression_for(path, compresslevel)
+        crc, payload = _compressed_entry(data, digests[path], method, compresslevel)
+        header = _LOCAL_HEADER.pack(0x04034b50, 20, _UTF8_NAMES, method, dos_time, dos_date,
+                                    crc, len(payload), len(data), len(name), 0)
+        central.append(_CENTRAL_HEADER.pack(0x02014b50, (3 << 8) | 20, 20, _UTF8_NAMES, method, dos_time,
+                                            dos_date, crc, len(payload), len(data), len(name), 0, 0, 0, 0,
+                                            0o644 << 16, offset) + name)
+        offset += len(header) + len(name) + len(payload)
+        yield header + name + payload
+    directory = b"".join(central)
+    yield directory + _END_RECORD.pack(0x06054b50, 0, 0, len(central), len(central), len(directory), offset, 0)
+
+
+def _write_archive(files, compresslevel):
+    """Yield the ZIP for {path: str|bytes} in chunks via zipfile (handles ZIP64 for huge archives)."""
+    sink = _ChunkSink()
+    now = time.localtime()[:6]
+    with zipfile.ZipFile(sink, "w") as zf:
+        for path, content in files.items():
+            info = zipfile.ZipInfo(path.replace("\\", "/").lstrip("/"), date_time=now)
+            info.external_attr = 0o644 << 16
+            compression = _compression_for(path, compresslevel)
+            zf.writestr(info, _as_bytes(content), compress_type=compression,
+                        compresslevel=compresslevel if compression == zipfile.ZIP_DEFLATED else None)
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()  # central directory
+    if data:
+        yield data
+
+
+def iter_zip(files, compresslevel=ZIP_COMPRESSLEVEL):
+    """
+    Stream the archive for `files` without holding it all in memory. A cached
+    archive is served as-is; otherwise the streamed archive is cached once
+    complete if it fits within the cache size limit.
+    """
+    digests = _digests(files)
+    key = archive_key(files, compresslevel, digests)
+    cached = archive_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    total = sum(len(_as_bytes(c)) for c in files.values())
+    if len(files) < 0xFFFF and total < _MAX_PLAIN_ZIP:
+        chunks = _write_entries(files, compresslevel, digests)
+    else:
+        chunks = _write_archive(files, compresslevel)
+
+    kept, size = [], 0
+    for chunk in chunks:
+        if kept is not None:
+            size += len(chunk)
+            if size <= archive_cache.max_bytes:
+                kept.append(chunk)
+            else:
+                kept = None  # too big to cache; keep streaming
+        yield chunk
+    if kept is not None:
+        archive_cache.put(key, b"".join(kept))
+
+
+def build_zip(files, compresslevel=ZIP_COMPRESSLEVEL):
+    """The whole archive for `files` as bytes (cached)."""
+    return b"".join(iter_zip(files, compresslevel))
@@ -1,56 +1,62 @@
 # project_builder.py
 
-from ai_agent import generate_project_structure
-from file_utils import create_project_from_json
-import subprocess
+from ai_agent import generate_project_structure, stream_project_structure
+from file_utils import write_project, create_project_from_stream
+from packager import build_zip
+from config import STREAM_GENERATION
+from tools.job_manager import job_manager
+from tracing import span, traced, current_span
 import json
 import sys
 import os
-import zipfile
-import io
-import base64
-import requests
 
 
+@traced("build_and_run")
 def build_and_run(prompt, auto_run=False, github_enabled=False,
-                  github_username=None, github_repo=None, github_pat=None):
+                  github_username=None, github_repo=None, github_pat=None,
+                  on_progress=None):
     """
-    Generates project, optionally auto-runs it (local only),
+    Generates project, optionally auto-runs it as a background job (local only),
     and optionally uploads to GitHub if user enables it via Streamlit UI.
+    With STREAM_GENERATION on, files are written as Gemini streams them and
+    `on_progress` receives the progress events (see file_utils).
 
     Returns: ZIP file bytes (for Streamlit's download button)
     """
 
     print("\n🧠 Generating project files using Gemini...\n")
 
-    data = generate_project_structure(prompt)
-    if not data:
-        print("❌ Failed to generate valid project data.")
-        return None
-
-    # Create project in VS Code workspace (local machine)
-    project_folder = create_project_from_json(data)
+    if STREAM_GENERATION:
+        # Create project in VS Code workspace (local machine), file by file
+        project_folder, data = create_project_from_stream(stream_project_structure(prompt),
+                                                          on_progress=on_progress)
+        if not data:
+            print("❌ Failed to generate valid project data.")
+            return None
+    else:
+        data = generate_project_structure(prompt)
+        if not data:
+            print("❌ Failed to generate valid project data.")
+            return None
+
+        # Create project in VS Code workspace (local machine)
+        project_folder, data["files"] = write_project(data.get("files", {}))
     print(f"✅ Project generated at: {project_folder}")
 
     # ----------------------------
-    # ZIP the generated project
+    # ZIP the generated project (from memory, no re-reading from disk)
     # ----------------------------
-    zip_buffer = io.BytesIO()
-
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for root, _, files in os.walk(project_folder):
-            for file in files:
-                file_path = os.path.join(root, file)
-                zipf.write(file_path, arcname=os.path.relpath(file_path, project_folder))
-
-    zip_buffer.seek(0)
+    files = data.get("files", {})
+    with span("zip", files=len(files)) as zip_span:
+        zip_bytes = build_zip(files)
+        zip_span.set(bytes=len(zip_bytes))
 
     # ----------------------------
     # Optional: Upload to GitHub
     # ----------------------------
     if github_enabled and github_username and github_repo and github_pat:
         print("📤 Uploading project to GitHub...")
-        upload_to_github(zip_buffer, github_username, github_repo, github_pat)
+        upload_to_github(files, github_username, github_repo, github_pat)
 
     # ----------------------------
     # Optional: Auto-run main file
@@ -58,38 +64,22 @@ def build_and_run(prompt, auto_run=False, github_enabled=False,
     main_file = data.get("main_file")
     if auto_run and main_file:
         main_path = os.path.join(project_folder, main_file)
-        print(f"\n🚀 Running {main_path}\n")
-        subprocess.run([sys.executable, main_path])
+        job_id = job_manager.start([sys.executable, main_file], cwd=project_folder, name=main_path)
+        current_span().set(job_id=job_id)
+        print(f"\n🚀 Running {main_path} in the background (job {job_id})\n")
 
-    return zip_buffer.getvalue()
+    return zip_bytes
 
 
-def upload_to_github(zip_buffer, username, repo_name, token):
+@traced("github.upload")
+def upload_to_github(files, username, repo_name, token):
     """
-    Uploads ZIP project contents to GitHub using GitHub REST API.
-    User must enter PAT token in Streamlit UI.
+    Uploads the generated files ({path: content}) to GitHub as a single commit
+    (see tools/github_upload). User must enter PAT token in Streamlit UI.
+    Returns the upload result with per-file failures.
     """
+    from tools.github_upload import upload_project  # pulls in requests; only needed when uploading
 
-    headers = {"Authorization": f"Bearer {token}"}
-
-    # ✅ Create repo if not exists
-    requests.post(
-        "https://api.github.com/user/repos",
-        headers=headers,
-        json={"name": repo_name, "private": False}
-    )
-
-    # ✅ Upload each file inside the zip
-    with zipfile.ZipFile(zip_buffer, "r") as zip_ref:
-        for file_path in zip_ref.namelist():
-            file_data = zip_ref.read(file_path).decode("utf-8")
-
-            url = f"https://api.github.com/repos/{username}/{repo_name}/contents/{file_path}"
-            payload = {
-                "message": f"Add {file_path}",
-                "content": base64.b64encode(file_data.encode()).decode()
-            }
-
-            requests.put(url, headers=headers, json=payload)
-
-    print("✅ Upload complete!")
+    result = upload_project(files, username, repo_name, token)
+    current_span().set(files=len(result["uploaded"]), failed=len(result["failed"]))
+    return result
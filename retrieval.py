@@ -0,0 +1,139 @@
+# retrieval.py
+import heapq
+import json
+import math
+import threading
+from collections import Counter
+
+from tools.code_chunks import tokenize
+from tools.patcher import atomic_write
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from how i in is it its me my of on or please "
+    "should so that the this to was we what when with you your".split())
+
+
+def terms(text):
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+class TurnIndex:
+    """
+    Incremental BM25 index over conversation messages (one document each).
+
+    `add` indexes a message as it is remembered; `search` scores only the
+    postings of the query's terms, so a lookup stays cheap with tens of
+    thousands of messages. Terms found in more than `max_df` of all
+    messages ("used", "tool", "result") carry almost no signal and are
+    skipped, as are hits scoring under `min_ratio` of the best one. Only a
+    clipped snippet of each message is kept in memory.
+
+    `save`/`load` persist the index together with the journal position it
+    covers, so a session only has to index what was stored after it.
+    """
+
+    def __init__(self, snippet_chars=300, k1=1.2, b=0.75, max_df=0.5, min_ratio=0.25):
+        self.snippet_chars = snippet_chars
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self.min_ratio = min_ratio
+        self._postings = {}  # term -> {doc_id: term frequency}
+        self._lengths = []   # doc_id -> token count
+        self._snippets = []  # doc_id -> (role, snippet)
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def _snippet(self, content):
+        content = " ".join(content.split())
+        if len(content) > self.snippet_chars:
+            content = content[: self.snippet_chars - 1] + "…"
+        return content
+
+    def add(self, role, content):
+        """Index one message; its doc id is its position in the conversation."""
+        counts = Counter(terms(content))
+        with self._lock:
+            doc_id = len(self._lengths)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._total_length += length
+            self._snippets.append((role, self._snippet(content)))
+            return doc_id
+
+    def search(self, query, k=5, before=None):
+        """
+        The `k` messages most relevant to `query` as [(score, doc_id, role, snippet)],
+        best first. Only doc ids below `before` are considered (e.g. to leave out
+        messages that are already in the recent window).
+        """
+        query_terms = set(terms(query))
+        with self._lock:
+            n_docs = len(self._lengths)
+            limit = n_docs if before is None else max(0, min(before, n_docs))
+            if not query_terms or not limit or k <= 0:
+                return []
+            avg_len = self._total_length / n_docs or 1.0
+            scores = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings or len(postings) > self.max_df * n_docs:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    if doc_id >= limit:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            # Ties go to the newer message
+            best = heapq.nlargest(k, scores.items(), key=lambda s: (s[1], s[0]))
+            cutoff = best[0][1] * self.min_ratio if best else 0.0
+            return [(score, doc_id) + self._snippets[doc_id] for doc_id, score in best if score >= cutoff]
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def _params(self):
+        return {"snippet_chars": self.snippet_chars}
+
+    def save(self, path, position):
+        """Atomically write the index to `path`, tagged with the journal `position` it covers."""
+        with self._lock:
+            data = {
+                "version": 1,
+                "params": self._params(),
+                "position": position,
+                # term -> [doc_id, tf, doc_id, tf, ...]
+                "postings": {term: [n for item in docs.items() for n in item] for term, docs in self._postings.items()},
+                "lengths": self._lengths,
+                "snippets": self._snippets,
+            }
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        atomic_write(path, text)
+
+    def load(self, path):
+        """
+        Replace this (empty) index with the one saved at `path` and return its journal
+        position, or None (index left empty) if there is none or it doesn't match.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != 1 or data.get("params") != self._params():
+                return None
+            postings = {term: dict(zip(flat[::2], flat[1::2])) for term, flat in data["postings"].items()}
+            snippets = [tuple(s) for s in data["snippets"]]
+            lengths = data["lengths"]
+            position = data["position"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print("⚠️ Ignoring unreadable retrieval index:", e)
+            return None
+        with self._lock:
+            self._postings, self._lengths, self._snippets = postings, lengths, snippets
+            self._total_length = sum(lengths)
+        return position
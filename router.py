@@ -0,0 +1,203 @@
+# router.py
+"""
+Deterministic fast-path router.
+
+Scores a prompt against simple rules for each tool and returns a tool choice
+only when one tool clearly wins; otherwise the caller falls back to the LLM
+(`ai_agent.choose_tool`).
+"""
+import re
+import threading
+
+from config import ROUTER_ENABLED, ROUTER_MIN_CONFIDENCE
+
+# Filenames mentioned in a prompt (e.g. "app.py", "templates/index.html")
+FILENAME_PATTERN = re.compile(
+    r'([A-Za-z0-9_\-./\\]*[A-Za-z0-9_\-]+\.(py|html|css|js|ts|jsx|tsx|json|md|txt|yml|yaml|toml|cfg|ini|sh))\b'
+)
+
+BACKTICK_CMD = re.compile(r'`([^`\n]+)`')
+RUN_VERB = re.compile(r'^\s*(?:please\s+)?(?:run|execute|exec)\s+(.+)$', re.IGNORECASE)
+SHELL_PREFIX = re.compile(r'^\s*\$\s+(.+)$')
+KNOWN_COMMANDS = {
+    "pytest", "python", "python3", "pip", "pip3", "npm", "npx", "node", "yarn", "ls", "dir",
+    "cat", "type", "echo", "make", "docker", "flask", "uvicorn", "streamlit", "tree", "pwd",
+    "mkdir", "cd", "go", "cargo", "java", "javac", "mvn", "gradle",
+}
+
+JOB_ID = re.compile(r'\bjob\s+#?([0-9a-f]{8})\b', re.IGNORECASE)
+JOB_ACTIONS = (
+    ("cancel", re.compile(r'\b(cancel|stop|kill|terminate)\b', re.IGNORECASE)),
+    ("logs", re.compile(r'\b(logs?|output|tail)\b', re.IGNORECASE)),
+    ("status", re.compile(r'\b(status|state|progress|done|finished|running)\b', re.IGNORECASE)),
+)
+LIST_JOBS = re.compile(r'\b(list|show)\s+(?:all\s+|the\s+|background\s+)*jobs\b', re.IGNORECASE)
+BACKGROUND = re.compile(r'\s+(?:in\s+the\s+background|as\s+a\s+(?:background\s+)?job)\s*$', re.IGNORECASE)
+
+GIT_WORDS = re.compile(r'\b(commit|push|git\s*hub|git\s+repo(?:sitory)?|upload\b.*\brepo)', re.IGNORECASE)
+# git_manager creates and pushes to a GitHub repo, so it is only routed locally for an
+# explicit instruction ("commit ...", "please push ...") that isn't phrased as a question
+GIT_IMPERATIVE = re.compile(r'^\s*(?:please\s+)?(commit|push|upload)\b', re.IGNORECASE)
+QUESTION = re.compile(r'\?|\b(what|how|why|explain|describe|show)\b', re.IGNORECASE)
+COMMIT_MESSAGE = re.compile(r'(?:message|msg|-m)\s*[:=]?\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+EDIT_VERBS = re.compile(r'\b(edit|modify|change|update|fix|refactor|rename|rewrite|replace|remove|delete)\b', re.IGNORECASE)
+WEAK_EDIT_VERBS = re.compile(r'\b(make|add|set|put|insert|turn|convert|improve)\b', re.IGNORECASE)
+
+# "create a ...", "build me a new ..." -- a definite article ("make the ...") usually means an edit
+GEN_VERBS = re.compile(
+    r'\b(create|generate|build|scaffold|make|write|develop)\s+(?:me\s+)?(?:a|an|new|simple|basic|small)\b',
+    re.IGNORECASE,
+)
+GEN_NOUNS = re.compile(
+    r'\b(app|application|project|website|site|web\s*app|api|game|dashboard|bot|cli|tool|script|calculator|page)\b',
+    re.IGNORECASE,
+)
+
+# A tool only wins if every other candidate scores below this
+AMBIGUITY_LEVEL = 0.5
+
+router_stats = {"routed_locally": 0, "sent_to_llm": 0}
+_stats_lock = threading.Lock()  # prompts are routed from several request threads
+
+
+def _count(name):
+    with _stats_lock:
+        router_stats[name] += 1
+
+
+def _command_candidate(prompt):
+    if BACKGROUND.search(prompt):
+        return 0.0, {}  # a background job, see _job_candidate
+    m = BACKTICK_CMD.search(prompt)
+    if m and (RUN_VERB.match(prompt) or prompt.strip().startswith("`")):
+        return 0.95, {"cmd": m.group(1).strip()}
+    m = SHELL_PREFIX.match(prompt)
+    if m:
+        return 0.95, {"cmd": m.group(1).strip()}
+    m = RUN_VERB.match(prompt)
+    if m:
+        cmd = m.group(1).strip().strip("`")
+        first = cmd.split()[0].lower() if cmd.split() else ""
+        if first in KNOWN_COMMANDS:
+            return 0.9, {"cmd": cmd}
+        return 0.4, {"cmd": cmd}
+    return 0.0, {}
+
+
+def _job_candidate(prompt):
+    if LIST_JOBS.search(prompt):
+        return 0.9, {"action": "list"}
+    m = JOB_ID.search(prompt)
+    if m:
+        for action, pattern in JOB_ACTIONS:
+            if pattern.search(prompt):
+                return 0.95, {"action": action, "job_id": m.group(1).lower()}
+        return 0.85, {"action": "status", "job_id": m.group(1).lower()}
+    if BACKGROUND.search(prompt):
+        confidence, args = _command_candidate(BACKGROUND.sub("", prompt))
+        if args:
+            return confidence, {"action": "start", "cmd": args["cmd"]}
+    return 0.0, {}
+
+
+def _git_candidate(prompt):
+    if not GIT_WORDS.search(prompt):
+        return 0.0, {}
+    if not GIT_IMPERATIVE.match(prompt) or QUESTION.search(prompt):
+        return AMBIGUITY_LEVEL, {}  # mentions git, but let the LLM decide
+    args = {}
+    m = COMMIT_MESSAGE.search(prompt)
+    if m:
+        args["message"] = m.group(1)
+    return 0.9, args
+
+
+def _file_editor_candidate(prompt):
+    m = FILENAME_PATTERN.search(prompt)
+    if not m:
+        return 0.0, {}
+    args = {"modification_prompt": prompt.strip()}
+    # Bare names ("app.py") are resolved inside generated_projects by the agent,
+    # so only pass explicit paths through
+    if "/" in m.group(1) or "\\" in m.group(1):
+        args["file_path"] = m.group(1)
+    if EDIT_VERBS.search(prompt):
+        return 0.9, args
+    if WEAK_EDIT_VERBS.search(prompt):
+        return 0.8, args
+    return 0.3, args
+
+
+def _project_candidate(prompt):
+    # Ignore filenames so "app.py" doesn't count as the noun "app"
+    text = FILENAME_PATTERN.sub(" ", prompt)
+    if not (GEN_VERBS.search(text) and GEN_NOUNS.search(text)):
+        return 0.0, {}
+    if text != prompt:
+        return AMBIGUITY_LEVEL, {}  # could just as well be an edit of that file
+    return 0.85, {}
+
+
+RULES = {
+    "command_runner": _command_candidate,
+    "job_manager": _job_candidate,
+    "git_manager": _git_candidate,
+    "file_editor": _file_editor_candidate,
+    "project_generator": _project_candidate,
+}
+
+
+def score_prompt(prompt):
+    """Return [(confidence, tool, args), ...] sorted best first."""
+    scored = []
+    for tool, rule in RULES.items():
+        confidence, args = rule(prompt)
+        if confidence > 0:
+            scored.append((confidence, tool, args))
+    scored.sort(key=lambda s: s[0], reverse=True)
+    return scored
+
+
+def route_prompt(prompt, min_confidence=None):
+    """
+    Return {"tool", "args", "confidence"} when the prompt unambiguously maps to
+    one tool, else None (meaning: ask the LLM).
+    """
+    min_confidence = ROUTER_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    scored = score_prompt(prompt or "") if ROUTER_ENABLED else []
+
+    if scored:
+        confidence, tool, args = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if confidence >= min_confidence and runner_up < AMBIGUITY_LEVEL:
+            _count("routed_locally")
+            return {"tool": tool, "args": args, "confidence": confidence}
+
+    _count("sent_to_llm")
+    return None
+
+
+def generation_likelihood(prompt):
+    """
+    How likely `prompt` is to end up with project_generator (0-1), used to decide
+    on speculative generation: the project rule's confidence when it leads, or
+    AMBIGUITY_LEVEL when the prompt names something to build ("an app that ...")
+    and no other tool claims it.
+    """
+    scored = score_prompt(prompt or "")
+    if scored:
+        confidence, tool, _ = scored[0]
+        return confidence if tool == "project_generator" else 0.0
+    if GEN_NOUNS.search(FILENAME_PATTERN.sub(" ", prompt or "")):
+        return AMBIGUITY_LEVEL
+    return 0.0
+
+
+def router_report():
+    """Summary of how many tool-selection LLM calls the fast path saved."""
+    with _stats_lock:
+        local = router_stats["routed_locally"]
+        total = local + router_stats["sent_to_llm"]
+    rate = (local / total * 100) if total else 0.0
+    return f"⚡ Router: {local}/{total} prompts routed locally ({rate:.0f}% LLM calls saved)"
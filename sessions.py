@@ -0,0 +1,308 @@
+# sessions.py
+"""
+Per-session agent memory.
+
+Every conversation (a Streamlit browser session, an API caller, the CLI) is a
+`Session` with its own messages, prompt context window and JSONL journal.
+`SessionManager` keeps the active ones in a bounded LRU:
+
+- a session's history is read from its journal on first use;
+- new messages are appended to the journal by a background flusher
+  (write-behind) rather than on every turn;
+- sessions idle for `idle_seconds`, or pushed out of the LRU, are flushed
+  and dropped from memory (never while a turn is still running on them);
+- each session has its own lock, so users never wait on each other.
+
+Besides the recent window, every message in the journal (not just the
+loaded tail) is indexed (retrieval.TurnIndex) so `history()` can add the
+earlier messages most relevant to a prompt. The index is saved next to the
+journal and only the messages stored since are indexed on the next load.
+
+    with sessions.use(session_id) as session:
+        session.remember("user", prompt)
+        history = session.history(prompt)
+"""
+import atexit
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import (CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_TOKENS, MEMORY_LOAD_LIMIT, MEMORY_COMPACT_AFTER,
+                    SESSION_MAX_ACTIVE, SESSION_IDLE_SECONDS, SESSION_FLUSH_INTERVAL, SESSIONS_DIR,
+                    RETRIEVAL_TOP_K, RETRIEVAL_SNIPPET_CHARS, RETRIEVAL_INDEX_SAVE_EVERY)
+from context_window import ContextWindow, render_message
+from retrieval import TurnIndex
+from memory_store import MemoryStore
+from tracing import span
+
+DEFAULT_SESSION = "default"
+
+# The default session keeps the original single-conversation journal
+DEFAULT_JOURNAL = os.path.join("memory", "agent_memory.jsonl")
+LEGACY_JOURNAL = os.path.join("memory", "agent_memory.json")
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def journal_path(session_id, sessions_dir=SESSIONS_DIR):
+    if session_id == DEFAULT_SESSION:
+        return DEFAULT_JOURNAL
+    if not _SESSION_ID.match(session_id or ""):
+        raise ValueError(f"Invalid session id: {session_id!r}")
+    return os.path.join(sessions_dir, session_id + ".jsonl")
+
+
+def _role(message):
+    return "user" if message.get("role") == "user" else "ai"
+
+
+class Session:
+    def __init__(self, session_id, store):
+        self.id = session_id
+        self.store = store
+        self.messages = None  # [{"role": "user"/"ai", "content": ...}], loaded on first use
+        self.context = ContextWindow(CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_TOKENS)
+        self.index = TurnIndex(RETRIEVAL_SNIPPET_CHARS)  # every message, doc id = position in the journal
+        self.index_path = os.path.splitext(store.path)[0] + ".index.json"
+        self.last_used = time.monotonic()
+        self.active = 0  # turns in progress (guarded by the manager's lock)
+        self._persisted = 0
+        self._index_saved = 0  # messages covered by the saved index
+        self._lock = threading.RLock()
+
+    def _add(self, role, content):
+        self.messages.append({"role": role, "content": content})
+        self.context.add(role, content)
+        self.index.add(role, content)
+
+    def _load_index(self):
+        """Load the saved retrieval index and index what the journal stored after it. Returns how many."""
+        position = self.index.load(self.index_path)
+        self._index_saved = len(self.index)
+        try:
+            for m in self.store.iter_messages(since=position):
+                self.index.add(_role(m), m.get("content", ""))
+        except ValueError:
+            # The journal no longer extends the saved index: rebuild it from scratch
+            self.index, self._index_saved = TurnIndex(RETRIEVAL_SNIPPET_CHARS), 0
+            for m in self.store.iter_messages():
+                self.index.add(_role(m), m.get("content", ""))
+        return len(self.index) - self._index_saved
+
+    def load(self):
+        """Load the tail of the session's journal (once) and return its messages."""
+        with self._lock:
+            if self.messages is not None:
+                return self.messages
+            self.messages = []
+            try:
+                with span("memory.load", session=self.id) as load_span:
+                    for m in self.store.load_tail():
+                        role, content = _role(m), m.get("content", "")
+                        self.messages.append({"role": role, "content": content})
+                        self.context.add(role, content)
+                    indexed = self._load_index()
+                    load_span.set(messages=len(self.messages), indexed=indexed, index_size=len(self.index))
+                if self.messages:
+                    print(f"✅ Loaded {len(self.messages)} messages from memory ({self.id}).")
+            except Exception as e:
+                print("⚠️ Failed to load memory:", e)
+            self._persisted = len(self.messages)
+            self.save_index()
+            return self.messages
+
+    def remember(self, role, content):
+        """Record a message in both the conversation and the prompt context window."""
+        with self._lock:
+            self.load()
+            self._add("user" if role == "user" else "ai", content)
+            self.last_used = time.monotonic()
+
+    def relevant(self, query, k=RETRIEVAL_TOP_K):
+        """Earlier messages most relevant to `query` that are no longer in the recent window."""
+        with self._lock:
+            self.load()
+            hits = self.index.search(query, k, before=len(self.index) - len(self.context))
+        return sorted(hits, key=lambda hit: hit[1])  # conversation order
+
+    def history(self, query, k=RETRIEVAL_TOP_K):
+        """Conversation context for a prompt: relevant earlier snippets, then the recent window."""
+        hits = self.relevant(query, k)
+        with self._lock:
+            recent = self.context.render()
+        if not hits:
+            return recent
+        lines = ["Relevant earlier conversation:"]
+        lines.extend(f"- {render_message(role, snippet)}" for _, _, role, snippet in hits)
+        return "\n".join(lines) + ("\n" + recent if recent else "")
+
+    @property
+    def dirty(self):
+        return self.messages is not None and len(self.messages) > self._persisted
+
+    def flush(self):
+        """Append messages added since the last flush to the journal. Returns how many."""
+        with self._lock:
+            if not self.dirty:
+                return 0
+            new_messages = self.messages[self._persisted:]
+            try:
+                self.store.append(new_messages)
+            except Exception as e:
+                print("⚠️ Failed to save memory:", e)
+                return 0
+            self._persisted += len(new_messages)
+            self.save_index()
+            return len(new_messages)
+
+    def save_index(self, force=False):
+        """
+        Save the retrieval index once RETRIEVAL_INDEX_SAVE_EVERY messages are unsaved
+        (any, with `force`). Only while everything indexed is also in the journal.
+        """
+        with self._lock:
+            unsaved = len(self.index) - self._index_saved
+            if self.messages is None or self.dirty or unsaved <= 0:
+                return
+            if unsaved < RETRIEVAL_INDEX_SAVE_EVERY and not force:
+                return
+            try:
+                self.index.save(self.index_path, self.store.position())
+            except OSError as e:
+                print("⚠️ Failed to save retrieval index:", e)
+                return
+            self._index_saved = len(self.index)
+
+
+class SessionManager:
+    def __init__(self, max_active=SESSION_MAX_ACTIVE, idle_seconds=SESSION_IDLE_SECONDS,
+                 flush_interval=SESSION_FLUSH_INTERVAL, sessions_dir=SESSIONS_DIR,
+                 load_limit=MEMORY_LOAD_LIMIT, compact_after=MEMORY_COMPACT_AFTER):
+        self.max_active = max(1, max_active)
+        self.idle_seconds = idle_seconds
+        self.flush_interval = flush_interval
+        self.sessions_dir = sessions_dir
+        self.load_limit = load_limit
+        self.compact_after = compact_after
+        self._sessions = OrderedDict()  # session_id -> Session, least recently used first
+        self._closing = {}              # evicted sessions whose final flush is still running
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+        self.stats = {"opened": 0, "evicted": 0, "flushed_messages": 0}
+
+    def _open(self, session_id):
+        # Absolute paths: the flusher and the exit flush must not depend on a later chdir
+        legacy = os.path.abspath(LEGACY_JOURNAL) if session_id == DEFAULT_SESSION else None
+        store = MemoryStore(os.path.abspath(journal_path(session_id, self.sessions_dir)), legacy_path=legacy,
+                            keep=self.load_limit, compact_after=self.compact_after)
+        self.stats["opened"] += 1
+        return Session(session_id, store)
+
+    def _acquire(self, session_id, pin):
+        with self._lock:
+            session = self._sessions.get(session_id) or self._closing.get(session_id)
+            if session is None:
+                session = self._open(session_id)
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            if pin:
+                session.active += 1
+            evicted = self._evict(lambda s: s is not session and len(self._sessions) > self.max_active)
+        self._close(evicted)
+        self._start_flusher()
+        return session
+
+    def get(self, session_id=DEFAULT_SESSION):
+        """The session for `session_id`, opened (not yet loaded) if it is not in memory."""
+        return self._acquire(session_id, pin=False)
+
+    @contextmanager
+    def use(self, session_id=DEFAULT_SESSION):
+        """Hold a session for one turn: it is not evicted until the block exits."""
+        session = self._acquire(session_id, pin=True)
+        try:
+            yield session
+        finally:
+            with self._lock:
+                session.active -= 1
+                session.last_used = time.monotonic()
+            if self.flush_interval <= 0:
+                self._count_flush(session.flush())
+
+    def _evict(self, should_evict):
+        """Drop idle sessions (LRU first) while should_evict(session) holds. Caller holds the lock."""
+        evicted = []
+        for session_id, session in list(self._sessions.items()):
+            if session.active or not should_evict(session):
+                continue
+            del self._sessions[session_id]
+            self._closing[session_id] = session
+            evicted.append(session)
+        return evicted
+
+    def _close(self, evicted):
+        for session in evicted:
+            self._count_flush(session.flush())
+            session.save_index(force=True)
+            with self._lock:
+                if self._closing.get(session.id) is session:
+                    del self._closing[session.id]
+                self.stats["evicted"] += 1
+
+    def _count_flush(self, count):
+        if count:
+            with self._lock:
+                self.stats["flushed_messages"] += count
+
+    def flush_all(self):
+        """Write every session's pending messages to disk."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            self._count_flush(session.flush())
+
+    def evict_idle(self):
+        """Flush and drop sessions unused for longer than idle_seconds."""
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            evicted = self._evict(lambda s: s.last_used < cutoff)
+        self._close(evicted)
+
+    def active_sessions(self):
+        with self._lock:
+            return list(self._sessions)
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        interval = self.flush_interval if self.flush_interval > 0 else min(self.idle_seconds, 30.0)
+        while not self._stop.wait(interval):
+            try:
+                self.flush_all()
+                self.evict_idle()
+            except Exception as e:
+                print("⚠️ Session flush failed:", e)
+
+    def close(self):
+        """Stop the background flusher and write everything out."""
+        self._stop.set()
+        self.flush_all()
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.save_index(force=True)
+
+
+sessions = SessionManager()
+atexit.register(sessions.close)
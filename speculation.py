@@ -0,0 +1,93 @@
+# speculation.py
+"""
+Speculative execution of expensive model calls.
+
+    spec = speculator.launch(generate, prompt)   # starts in the background
+    ...                                           # decide meanwhile (e.g. tool selection)
+    data = speculator.take(spec)                  # hit: use the result
+    speculator.discard(spec)                      # miss: cancel it or drop the result
+
+`fn` is called as fn(*args, cancelled=event) and should stop early once the
+event is set. `stats` counts launches, hits, misses, wasted calls (misses
+that had already started, i.e. paid for a model call) and the time hits
+saved by overlapping with the decision.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import SPECULATION_WORKERS
+
+
+class Speculation:
+    def __init__(self, cancelled):
+        self.cancelled = cancelled
+        self.future = None
+        self.launched_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+
+
+class Speculator:
+    def __init__(self, max_workers=SPECULATION_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.stats = {"launched": 0, "hits": 0, "misses": 0, "wasted": 0, "failed": 0, "saved_seconds": 0.0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def launch(self, fn, *args):
+        """Start fn(*args, cancelled=...) in the background, in a copy of the caller's context."""
+        spec = Speculation(threading.Event())
+
+        def run():
+            spec.started_at = time.monotonic()
+            try:
+                return fn(*args, cancelled=spec.cancelled)
+            finally:
+                spec.finished_at = time.monotonic()
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="speculate")
+            self.stats["launched"] += 1
+        spec.future = self._pool.submit(contextvars.copy_context().run, run)
+        return spec
+
+    def take(self, spec):
+        """The speculative result (waiting for it if needed), or None if the call failed."""
+        decided_at = time.monotonic()
+        try:
+            result = spec.future.result()
+        except Exception as e:
+            print(f"⚠️ Speculative call failed ({type(e).__name__}: {e}); running it again.")
+            self._count(failed=1)
+            return None
+        if result is None:
+            self._count(failed=1)
+            return None
+        # Time the call ran while the decision was being made
+        self._count(hits=1, saved_seconds=max(0.0, min(decided_at, spec.finished_at) - spec.started_at))
+        return result
+
+    def discard(self, spec):
+        """Cancel the call if it hasn't started, otherwise tell it to stop and drop its result."""
+        spec.cancelled.set()
+        self._count(misses=1, wasted=0 if spec.future.cancel() else 1)
+
+    def hit_rate(self):
+        decided = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / decided if decided else 0.0
+
+    def report(self):
+        s = self.stats
+        return (f"🔮 Speculation: {s['hits']}/{s['hits'] + s['misses']} hits ({self.hit_rate():.0%}), "
+                f"{s['wasted']} wasted call(s), {s['saved_seconds']:.1f}s saved")
+
+
+speculator = Speculator()
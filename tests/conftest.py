@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Offline by default: the fake model backend and no trace files
+os.environ.setdefault("MODEL_BACKEND", "fake")
+os.environ.setdefault("TRACE_ENABLED", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,108 @@
+# HTTP API against a fake model: job submission, progress, streamed download, backpressure.
+import io
+import threading
+import time
+import zipfile
+
+import pytest
+
+from api.index import app
+from generation_queue import GenerationQueue
+
+FILES = {"app.py": "print('hello')\n", "templates/index.html": "<h1>hi</h1>\n"}
+
+
+class FakeModel:
+    """generate_fn that reports one file, then waits for `release` before finishing."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def __call__(self, prompt, on_progress):
+        self.started.set()
+        on_progress({"event": "start"})
+        on_progress({"event": "file", "path": "app.py", "bytes": 15, "files_written": 1})
+        if not self.release.wait(10):
+            raise TimeoutError("test never released the fake model")
+        return "generated_projects/project_test", {"files": dict(FILES), "main_file": "app.py"}
+
+
+@pytest.fixture
+def fake():
+    model = FakeModel()
+    yield model
+    model.release.set()
+
+
+@pytest.fixture
+def client(fake):
+    queue = GenerationQueue(generate_fn=fake, workers=1, max_pending=1)
+    app.config["GENERATION_QUEUE"] = queue
+    yield app.test_client()
+    fake.release.set()
+    queue.shutdown()
+
+
+def wait_for(client, job_id, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/jobs/{job_id}").get_json()
+        if condition(status):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached the expected state: {status}")
+
+
+def test_generate_returns_202_with_job_id(client):
+    response = client.post("/generate", json={"prompt": "a todo app"})
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["job_id"]
+    assert body["status_url"] == f"/jobs/{body['job_id']}"
+    assert body["download_url"] == f"/jobs/{body['job_id']}/download"
+
+
+def test_generate_requires_prompt(client):
+    assert client.post("/generate", json={}).status_code == 400
+
+
+def test_status_reports_progress_and_download_waits_for_completion(client, fake):
+    job_id = client.post("/generate", json={"prompt": "a todo app"}).get_json()["job_id"]
+
+    status = wait_for(client, job_id, lambda s: s["files_written"] == 1)
+    assert status["state"] == "running"
+    assert status["current_file"] == "app.py"
+
+    response = client.get(f"/jobs/{job_id}/download")
+    assert response.status_code == 409
+    assert response.get_json()["state"] == "running"
+
+    fake.release.set()
+    status = wait_for(client, job_id, lambda s: s["state"] == "done")
+    assert status["file_count"] == len(FILES)
+    assert status["main_file"] == "app.py"
+
+    response = client.get(f"/jobs/{job_id}/download")
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    assert response.is_streamed
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as zf:
+        assert zf.testzip() is None
+        assert {name: zf.read(name).decode() for name in zf.namelist()} == FILES
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/jobs/nope").status_code == 404
+    assert client.get("/jobs/nope/download").status_code == 404
+
+
+def test_full_queue_answers_429_with_retry_after(client, fake):
+    # One worker plus one pending slot
+    assert client.post("/generate", json={"prompt": "first"}).status_code == 202
+    assert fake.started.wait(5)
+    assert client.post("/generate", json={"prompt": "second"}).status_code == 202
+
+    response = client.post("/generate", json={"prompt": "third"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
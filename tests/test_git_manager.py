@@ -0,0 +1,71 @@
+# Commit-and-push workflow against a local bare repository (no GitHub involved).
+import pytest
+
+git = pytest.importorskip("git")
+
+from manifest import MANIFEST_NAME
+from tools.git_manager import commit_and_push
+
+
+@pytest.fixture(autouse=True)
+def git_identity(monkeypatch):
+    for var in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+        monkeypatch.setenv(var, "Test")
+    for var in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.setenv(var, "test@example.com")
+
+
+@pytest.fixture
+def project(tmp_path):
+    folder = tmp_path / "project_1"
+    folder.mkdir()
+    (folder / "app.py").write_text("print('v1')\n")
+    (folder / "util.py").write_text("X = 1\n")
+    (folder / MANIFEST_NAME).write_text("{}")
+    return folder
+
+
+@pytest.fixture
+def remote(tmp_path):
+    path = tmp_path / "remote.git"
+    git.Repo.init(path, bare=True)
+    return path
+
+
+def remote_tree(remote):
+    """{path: content} at the tip of the remote's main branch."""
+    commit = git.Repo(remote).commit("main")
+    return {blob.path: blob.data_stream.read().decode() for blob in commit.tree.traverse() if blob.type == "blob"}
+
+
+def test_initial_commit_pushes_all_files_except_manifest(project, remote):
+    outcome = commit_and_push(str(project), str(remote), "initial")
+
+    assert outcome["pushed"]
+    assert outcome["files"] == ["app.py", "util.py"]
+    assert git.Repo(remote).commit("main").hexsha == outcome["commit"]
+    assert remote_tree(remote) == {"app.py": "print('v1')\n", "util.py": "X = 1\n"}
+
+
+def test_incremental_commit_with_modification_and_deletion(project, remote):
+    first = commit_and_push(str(project), str(remote), "initial")["commit"]
+
+    (project / "app.py").write_text("print('v2')\n")
+    (project / "util.py").unlink()
+    outcome = commit_and_push(str(project), str(remote), "update")
+
+    assert outcome["files"] == ["app.py", "util.py"]
+    head = git.Repo(remote).commit("main")
+    assert head.hexsha == outcome["commit"]
+    assert [p.hexsha for p in head.parents] == [first]
+    assert head.message == "update"
+    assert remote_tree(remote) == {"app.py": "print('v2')\n"}
+
+
+def test_no_changes_makes_no_commit(project, remote):
+    first = commit_and_push(str(project), str(remote), "initial")["commit"]
+
+    outcome = commit_and_push(str(project), str(remote), "nothing to do")
+
+    assert outcome == {"commit": None, "files": [], "pushed": True}
+    assert git.Repo(remote).commit("main").hexsha == first
@@ -0,0 +1,192 @@
+# GitHubUploader against a local stub of the GitHub REST / Git Data API.
+import base64
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+from manifest import git_blob_sha
+from tools.github_upload import GitHubUploader, GitHubUploadError
+
+REPO = "/repos/octo/demo"
+
+
+class FakeGitHub:
+    """Just enough of one repository's API, with failures that can be injected per (method, path)."""
+
+    def __init__(self):
+        self.exists = False
+        self.ref = None
+        self.blobs, self.trees, self.commits = {}, {}, {}
+        self.requests = []  # (method, path)
+        self.fail = {}      # (method, path) -> [status, ...] returned before handling normally
+        self.lock = threading.Lock()
+
+    def count(self, method, path):
+        return self.requests.count((method, path))
+
+    def files(self):
+        """{path: content} at the tip of main."""
+        tree = self.trees[self.commits[self.ref]]
+        return {path: self.blobs[sha].decode() for path, (sha, _) in tree.items()}
+
+    def _tree(self, entries):
+        sha = hashlib.sha1(json.dumps(sorted(entries.items())).encode()).hexdigest()
+        self.trees[sha] = entries
+        return sha
+
+    def _commit(self, tree_sha, payload):
+        sha = hashlib.sha1(json.dumps([tree_sha, payload]).encode()).hexdigest()
+        self.commits[sha] = tree_sha
+        return sha
+
+    def handle(self, method, path, body):
+        with self.lock:
+            self.requests.append((method, path))
+            failures = self.fail.get((method, path))
+            if failures:
+                return failures.pop(0), {"message": "injected failure"}
+            return self._route(method, path, body)
+
+    def _route(self, method, path, body):
+        if (method, path) == ("POST", "/user/repos"):
+            if self.exists:
+                return 422, {"message": "name already exists on this account"}
+            self.exists = True
+            return 201, {"name": body["name"], "html_url": "https://github.test/octo/demo"}
+        if not self.exists:
+            return 404, {"message": "Not Found"}
+        if (method, path) == ("GET", REPO):
+            return 200, {"default_branch": "main", "html_url": "https://github.test/octo/demo"}
+        if (method, path) == ("GET", REPO + "/git/ref/heads/main"):
+            if self.ref is None:
+                return 409, {"message": "Git Repository is empty."}
+            return 200, {"object": {"sha": self.ref}}
+        if method == "GET" and path.startswith(REPO + "/git/commits/"):
+            return 200, {"tree": {"sha": self.commits[path.rsplit("/", 1)[1]]}}
+        if method == "GET" and path.startswith(REPO + "/git/trees/"):
+            tree = self.trees[path.rsplit("/", 1)[1]]
+            return 200, {"tree": [{"path": p, "sha": sha, "mode": mode, "type": "blob"}
+                                  for p, (sha, mode) in tree.items()], "truncated": False}
+        if method == "PUT" and path.startswith(REPO + "/contents/"):
+            data = base64.b64decode(body["content"])
+            self.blobs[git_blob_sha(data)] = data
+            tree = self._tree({path.split("/contents/", 1)[1]: (git_blob_sha(data), "100644")})
+            self.ref = self._commit(tree, body)
+            return 201, {}
+        if (method, path) == ("POST", REPO + "/git/blobs"):
+            data = base64.b64decode(body["content"])
+            self.blobs[git_blob_sha(data)] = data
+            return 201, {"sha": git_blob_sha(data)}
+        if (method, path) == ("POST", REPO + "/git/trees"):
+            entries = dict(self.trees.get(body.get("base_tree"), {}))
+            entries.update({e["path"]: (e["sha"], e["mode"]) for e in body["tree"]})
+            return 201, {"sha": self._tree(entries)}
+        if (method, path) == ("POST", REPO + "/git/commits"):
+            return 201, {"sha": self._commit(body["tree"], body)}
+        if (method, path) == ("PATCH", REPO + "/git/refs/heads/main"):
+            self.ref = body["sha"]
+            return 200, {"object": {"sha": self.ref}}
+        return 404, {"message": "Not Found"}
+
+
+@pytest.fixture
+def github():
+    fake = FakeGitHub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _serve(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            status, payload = fake.handle(self.command, urlparse(self.path).path, body)
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PUT = do_PATCH = _serve
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True).start()
+    fake.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+def upload(github, files):
+    uploader = GitHubUploader("test-token", "octo", "demo", api_url=github.url, max_workers=4, backoff=0)
+    try:
+        return uploader.upload(files)
+    finally:
+        uploader.session.close()
+
+
+FILES = {"app.py": "print('v1')\n", "templates/index.html": "<h1>hi</h1>\n", "README.md": "# demo\n"}
+
+
+def test_first_upload_creates_repo_and_commits_everything(github):
+    result = upload(github, FILES)
+
+    assert result["ok"]
+    assert result["commit_sha"] == github.ref
+    assert github.files() == FILES
+    assert github.count("POST", "/user/repos") == 1
+
+
+def test_only_changed_files_are_uploaded(github):
+    upload(github, FILES)
+    blob_posts = github.count("POST", REPO + "/git/blobs")
+
+    result = upload(github, dict(FILES, **{"app.py": "print('v2')\n"}))
+
+    assert result["ok"]
+    assert result["uploaded"] == ["app.py"]
+    assert result["unchanged"] == ["README.md", "templates/index.html"]
+    assert github.count("POST", REPO + "/git/blobs") == blob_posts + 1
+    assert github.files()["app.py"] == "print('v2')\n"
+
+
+def test_identical_upload_makes_no_commit(github):
+    first = upload(github, FILES)["commit_sha"]
+
+    result = upload(github, FILES)
+
+    assert result["ok"] and result["commit_sha"] is None
+    assert github.ref == first
+    assert github.count("POST", REPO + "/git/commits") == 1
+
+
+def test_blob_upload_is_retried_on_transient_errors(github):
+    github.fail[("POST", REPO + "/git/blobs")] = [503, 502]
+
+    result = upload(github, FILES)
+
+    assert result["ok"] and not result["failed"]
+    assert github.files() == FILES
+
+
+def test_repo_creation_is_not_retried(github):
+    github.fail[("POST", "/user/repos")] = [502]
+
+    with pytest.raises(GitHubUploadError):
+        upload(github, FILES)
+    assert github.count("POST", "/user/repos") == 1
+
+
+def test_commit_and_ref_update_are_not_retried(github):
+    upload(github, FILES)
+    github.fail[("POST", REPO + "/git/commits")] = [503]
+
+    with pytest.raises(GitHubUploadError):
+        upload(github, dict(FILES, **{"app.py": "print('v2')\n"}))
+    assert github.count("POST", REPO + "/git/commits") == 2  # one per upload
+    assert github.count("PATCH", REPO + "/git/refs/heads/main") == 1
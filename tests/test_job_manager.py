@@ -0,0 +1,49 @@
+# Background job pool: running to completion and forgetting old finished jobs.
+import sys
+import time
+
+from tools.job_manager import JobManager
+
+
+def _wait(manager, job_ids, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        states = [(manager.status(j) or {"state": "gone"})["state"] for j in job_ids]
+        if all(s not in ("queued", "running") for s in states):
+            return
+        time.sleep(0.02)
+    raise AssertionError("jobs did not finish")
+
+
+def test_job_runs_and_keeps_its_output():
+    manager = JobManager(max_concurrent=2)
+    job_id = manager.start([sys.executable, "-c", "print('hello'); raise SystemExit(3)"])
+    _wait(manager, [job_id])
+    info = manager.status(job_id)
+    assert info["state"] == "failed" and info["exit_code"] == 3
+    assert manager.tail(job_id) == "hello\n"
+
+
+def test_only_the_latest_finished_jobs_are_kept():
+    manager = JobManager(max_concurrent=1, keep_finished=3)
+    ids = []
+    for i in range(6):
+        ids.append(manager.start([sys.executable, "-c", f"print({i})"]))
+        _wait(manager, ids[-1:])
+    # Eviction happens on the next start/finish, so one more job settles the table
+    last = manager.start([sys.executable, "-c", "print('last')"])
+    _wait(manager, [last])
+    kept = [j["id"] for j in manager.list_jobs()]
+    assert len(kept) <= 4 and last in kept
+    assert all(manager.status(j) is None for j in ids[:3])
+
+
+def test_running_jobs_are_never_evicted():
+    manager = JobManager(max_concurrent=2, keep_finished=0)
+    slow = manager.start([sys.executable, "-c", "import time; time.sleep(30)"])
+    quick = manager.start([sys.executable, "-c", "pass"])
+    _wait(manager, [quick])
+    manager.start([sys.executable, "-c", "pass"])
+    assert manager.status(slow)["state"] == "running"
+    assert manager.cancel(slow)
+    _wait(manager, [slow])
@@ -0,0 +1,75 @@
+# extract_json / the single-pass object scanner and the streamed project parser.
+import json
+
+import pytest
+
+from ai_agent import extract_json
+from json_stream import JsonObjectScanner, ProjectStreamParser
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('{"code": "def f() { return \'}\'; }"}', {"code": "def f() { return '}'; }"}),  # braces in strings
+    ('{"s": "{{{", "t": "}}}"}', {"s": "{{{", "t": "}}}"}),
+    (r'{"q": "she said \"hi {\" then left"}', {"q": 'she said "hi {" then left'}),  # escaped quotes
+    (r'{"path": "C:\\dir\\", "n": 2}', {"path": "C:\\dir\\", "n": 2}),  # escaped backslash before a quote
+    ('Sure! Here is the project:\n```json\n{"files": {"a.py": "x = 1"}}\n```\nLet me know if you need more.',
+     {"files": {"a.py": "x = 1"}}),  # prose and fences around the object
+    ('{"outer": {"inner": {"deep": [1, {"x": "}"}]}}}', {"outer": {"inner": {"deep": [1, {"x": "}"}]}}}),
+])
+def test_extracts_the_object(text, expected):
+    assert extract_json(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    '{"files": {"a.py": "x = 1"}',      # unclosed object
+    '{"a": "unterminated string}',
+    "no json here at all",
+    "",
+    None,
+])
+def test_incomplete_or_missing_object_gives_none(text):
+    assert extract_json(text) is None
+
+
+def test_first_valid_object_wins_when_there_are_several():
+    text = 'First {"a": 1} then {"b": 2} and {"c": 3}'
+    assert extract_json(text) == {"a": 1}
+
+
+def test_invalid_objects_are_skipped():
+    text = 'Example: {not json} -- actual: {"ok": true}'
+    assert extract_json(text) == {"ok": True}
+
+
+def test_scanner_returns_every_top_level_object():
+    text = 'a {"x": {"y": 1}} b {"z": "}"} c {"open": 1'
+    assert JsonObjectScanner().feed(text) == ['{"x": {"y": 1}}', '{"z": "}"}']
+
+
+REPLY = 'Here you go:\n```json\n' + json.dumps({
+    "files": {"app.py": 'print("{hi}")\n', 'static/a "b".js': "var s = '\\';\n"},
+    "main_file": "app.py",
+}, indent=2) + '\n```\nDone {not json}'
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, len(REPLY)])
+def test_chunked_feed_matches_whole_feed(chunk_size):
+    scanner = JsonObjectScanner()
+    objects = []
+    for i in range(0, len(REPLY), chunk_size):
+        objects.extend(scanner.feed(REPLY[i:i + chunk_size]))
+    assert objects == JsonObjectScanner().feed(REPLY)
+    assert json.loads(objects[0])["main_file"] == "app.py"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64, len(REPLY)])
+def test_project_stream_parser_reports_each_file(chunk_size):
+    parser = ProjectStreamParser()
+    events = []
+    for i in range(0, len(REPLY), chunk_size):
+        events.extend(parser.feed(REPLY[i:i + chunk_size]))
+    expected = extract_json(REPLY)
+    assert [e for e in events if e[0] == "file"] == [("file", p, c) for p, c in expected["files"].items()]
+    assert ("main_file", "app.py") in events
+    assert events[-1] == ("done",)
@@ -0,0 +1,110 @@
+# Round trips through the streaming ZIP writer (and its zipfile fallback).
+import io
+import zipfile
+
+import pytest
+
+import packager
+from packager import build_zip, iter_zip
+
+FILES = {
+    "app.py": "print('hello')\n" * 50,
+    "templates/index.html": "<h1>hi</h1>\n",
+    "empty.txt": "",
+    "logo.png": b"\x89PNG\r\n\x1a\n" + bytes(range(256)),
+    "données/résumé.md": "# Résumé — ünïcode ✓\n",
+    "中文/说明.txt": "你好\n",
+}
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    packager.archive_cache.clear()
+    packager.entry_cache.clear()
+    yield
+    packager.archive_cache.clear()
+    packager.entry_cache.clear()
+
+
+def read_back(data):
+    """{name: bytes} of an archive, after checking every entry's CRC."""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        return {info.filename: zf.read(info) for info in zf.infolist()}
+
+
+def as_bytes(files):
+    return {path: c.encode("utf-8") if isinstance(c, str) else c for path, c in files.items()}
+
+
+def test_round_trip_with_empty_file_binary_and_non_ascii_names():
+    assert read_back(build_zip(FILES)) == as_bytes(FILES)
+
+
+def test_compression_methods():
+    with zipfile.ZipFile(io.BytesIO(build_zip(FILES))) as zf:
+        methods = {info.filename: info.compress_type for info in zf.infolist()}
+    assert methods["app.py"] == zipfile.ZIP_DEFLATED
+    assert methods["logo.png"] == zipfile.ZIP_STORED  # already compressed format
+
+
+def test_store_only_level():
+    data = build_zip(FILES, compresslevel=0)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert {info.compress_type for info in zf.infolist()} == {zipfile.ZIP_STORED}
+    assert read_back(data) == as_bytes(FILES)
+
+
+def test_unchanged_files_come_from_the_entry_cache():
+    build_zip(FILES)
+    misses = packager.entry_cache.stats["misses"]
+    hits = packager.entry_cache.stats["hits"]
+
+    changed = dict(FILES, **{"app.py": "print('changed')\n"})
+    data = build_zip(changed)
+
+    assert packager.entry_cache.stats["misses"] == misses + 1  # only app.py compressed again
+    assert packager.entry_cache.stats["hits"] == hits + len(FILES) - 1
+    assert read_back(data) == as_bytes(changed)
+
+
+def test_same_content_under_another_name_reuses_the_cached_entry():
+    build_zip({"a.py": "x = 1\n" * 100})
+    hits = packager.entry_cache.stats["hits"]
+    data = build_zip({"b.py": "x = 1\n" * 100})
+    assert packager.entry_cache.stats["hits"] == hits + 1
+    assert read_back(data) == {"b.py": b"x = 1\n" * 100}
+
+
+def test_repeated_archive_is_served_from_the_archive_cache():
+    first = build_zip(FILES)
+    hits = packager.archive_cache.stats["hits"]
+    assert build_zip(FILES) == first
+    assert packager.archive_cache.stats["hits"] == hits + 1
+
+
+def test_streams_in_several_chunks():
+    chunks = list(iter_zip(FILES))
+    assert len(chunks) == len(FILES) + 1  # one per entry, then the central directory
+    assert read_back(b"".join(chunks)) == as_bytes(FILES)
+
+
+def test_large_archives_fall_back_to_zipfile(monkeypatch):
+    calls = []
+    write_archive = packager._write_archive
+
+    def spy(files, compresslevel):
+        calls.append(len(files))
+        return write_archive(files, compresslevel)
+
+    monkeypatch.setattr(packager, "_write_archive", spy)
+    monkeypatch.setattr(packager, "_MAX_PLAIN_ZIP", 100)  # stand-in for the 2 GiB threshold
+
+    data = build_zip(FILES)
+
+    assert calls == [len(FILES)]
+    assert read_back(data) == as_bytes(FILES)
+
+
+def test_empty_project():
+    assert read_back(build_zip({})) == {}
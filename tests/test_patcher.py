@@ -0,0 +1,163 @@
+# SEARCH/REPLACE parsing and application, the rewrite fallback, and atomic writes.
+import os
+
+import pytest
+
+import tools.file_editor as file_editor
+from tools.patcher import PatchError, apply_hunks, atomic_write, parse_hunks
+
+SOURCE = '''def greet(name):
+    return "Hello " + name
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def increment(self):
+        self.count += 1
+'''
+
+
+def hunk(search, replace):
+    return f"<<<<<<< SEARCH\n{search}=======\n{replace}>>>>>>> REPLACE\n"
+
+
+def test_parse_hunks_ignores_prose_around_blocks():
+    reply = ("Here is the change:\n" + hunk("a = 1\n", "a = 2\n") + "and another\n" +
+             hunk("b = 1\n", "b = 2\n") + "Done.")
+    assert parse_hunks(reply) == [("a = 1\n", "a = 2\n"), ("b = 1\n", "b = 2\n")]
+    assert parse_hunks("no blocks here") == []
+    assert parse_hunks(None) == []
+
+
+def test_exact_match():
+    hunks = parse_hunks(hunk('    return "Hello " + name\n', '    return f"Hi {name}"\n'))
+    assert apply_hunks(SOURCE, hunks) == SOURCE.replace('"Hello " + name', 'f"Hi {name}"')
+
+
+def test_whitespace_drift_is_matched_and_reindented():
+    # The model dropped the method's indentation
+    search = "def increment(self):\n    self.count += 1\n"
+    replace = "def increment(self, step=1):\n    self.count += step\n"
+    patched = apply_hunks(SOURCE, [(search, replace)])
+    assert "    def increment(self, step=1):\n        self.count += step\n" in patched
+    assert patched.startswith('def greet(name):\n    return "Hello " + name\n')
+
+
+def test_near_miss_is_matched_fuzzily():
+    search = '    return "Helo " + name\n'  # typo in the copied line
+    patched = apply_hunks(SOURCE, [(search, '    return "Hi " + name\n')])
+    assert '    return "Hi " + name\n' in patched
+    assert '"Hello "' not in patched
+
+
+def test_ambiguous_match_is_rejected():
+    source = "x = 1\nprint(x)\nx = 1\n"
+    with pytest.raises(PatchError, match="ambiguous"):
+        apply_hunks(source, [("x = 1\n", "x = 2\n")])
+
+
+def test_ambiguous_after_whitespace_normalisation_is_rejected():
+    source = "if a:\n    go()\nif b:\n  go()\n"
+    with pytest.raises(PatchError, match="ambiguous"):
+        apply_hunks(source, [("go()\n", "stop()\n")])
+
+
+def test_unmatched_search_is_rejected():
+    with pytest.raises(PatchError, match="not found"):
+        apply_hunks(SOURCE, [("def something_else():\n    pass\n", "")])
+
+
+def test_empty_search_appends():
+    assert apply_hunks("a = 1", [("", "b = 2\n")]) == "a = 1\nb = 2\n"
+
+
+def test_hunks_apply_in_order():
+    hunks = [("x = 1\n", "x = 2\n"), ("x = 2\n", "x = 3\n")]
+    assert apply_hunks("x = 1\n", hunks) == "x = 3\n"
+
+
+class ScriptedClient:
+    """Model client returning canned replies in order, recording the prompts."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def generate(self, prompt, content=None, validate=None):
+        self.prompts.append(prompt)
+        return self.replies.pop(0)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(*replies):
+        scripted = ScriptedClient(*replies)
+        monkeypatch.setattr(file_editor, "get_client", lambda: scripted)
+        monkeypatch.setattr(file_editor, "EDIT_MODE", "diff")
+        return scripted
+    return install
+
+
+def test_propose_edit_applies_a_patch(client):
+    scripted = client(hunk("        self.count += 1\n", "        self.count += 2\n"))
+    new_code, mode = file_editor.propose_edit("counter.py", "step by two", SOURCE)
+    assert mode == "patch"
+    assert "self.count += 2" in new_code
+    assert len(scripted.prompts) == 1
+
+
+@pytest.mark.parametrize("patch_reply", [
+    "Sure! I updated the counter.",                     # no SEARCH/REPLACE block at all
+    hunk("def missing():\n    pass\n", "def x(): pass\n"),  # SEARCH that isn't in the file
+    hunk("        self.count += 1\n", "        self.count +=\n"),  # patch that breaks the syntax
+])
+def test_unusable_patch_falls_back_to_a_full_rewrite(client, patch_reply):
+    rewritten = SOURCE.replace("self.count += 1", "self.count += 2")
+    scripted = client(patch_reply, f"```python\n{rewritten}```")
+    new_code, mode = file_editor.propose_edit("counter.py", "step by two", SOURCE)
+    assert mode == "rewrite"
+    assert new_code.strip() == rewritten.strip()
+    assert len(scripted.prompts) == 2
+
+
+def test_invalid_rewrite_is_refused(client):
+    client("no blocks", "def broken(:\n")
+    with pytest.raises(file_editor.EditError):
+        file_editor.propose_edit("counter.py", "step by two", SOURCE)
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    target = tmp_path / "app.py"
+    target.write_text("old\n")
+    os.chmod(target, 0o640)
+    atomic_write(str(target), "new\n")
+    assert target.read_text() == "new\n"
+    assert os.stat(target).st_mode & 0o777 == 0o640  # keeps the file's mode
+    assert os.listdir(tmp_path) == ["app.py"]
+
+
+def test_failed_atomic_write_leaves_the_original_intact(tmp_path, monkeypatch):
+    target = tmp_path / "app.py"
+    target.write_text("old\n")
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError, match="disk full"):
+        atomic_write(str(target), "new\n")
+    monkeypatch.undo()
+
+    assert target.read_text() == "old\n"
+    assert os.listdir(tmp_path) == ["app.py"]  # no temp file left behind
+
+
+def test_unencodable_content_leaves_the_original_intact(tmp_path):
+    target = tmp_path / "app.py"
+    target.write_text("old\n")
+    with pytest.raises(UnicodeEncodeError):
+        atomic_write(str(target), "bad \ud800 surrogate")
+    assert target.read_text() == "old\n"
+    assert os.listdir(tmp_path) == ["app.py"]
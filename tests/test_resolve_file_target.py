@@ -0,0 +1,41 @@
+# Resolving the file an edit refers to inside generated_projects/.
+import os
+import time
+
+import pytest
+
+import ai_agent
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Two projects that both have app.py; project_2's is the most recently modified."""
+    monkeypatch.chdir(tmp_path)
+    for project in ("project_1", "project_2"):
+        folder = tmp_path / "generated_projects" / project
+        folder.mkdir(parents=True)
+        (folder / "app.py").write_text(f"# {project}\n")
+    (tmp_path / "generated_projects" / "project_1" / "api.py").write_text("# api\n")
+    now = time.time()
+    os.utime(tmp_path / "generated_projects" / "project_1" / "app.py", (now - 60, now - 60))
+    return tmp_path
+
+
+def resolved(path):
+    return path.replace(os.sep, "/") if path else path
+
+
+@pytest.mark.parametrize("file_path_arg, expected", [
+    ("project_1/app.py", "generated_projects/project_1/app.py"),
+    ("project_2/app.py", "generated_projects/project_2/app.py"),
+    ("generated_projects/project_1/app.py", "generated_projects/project_1/app.py"),
+    ("app.py", "generated_projects/project_2/app.py"),  # bare name: most recently modified
+    ("project_2/api.py", "generated_projects/project_1/api.py"),  # no such path: same name elsewhere
+])
+def test_partial_paths_resolve_to_that_project(workspace, file_path_arg, expected):
+    assert resolved(ai_agent.resolve_file_target(file_path_arg, "edit it")) == expected
+
+
+def test_similar_name_is_not_resolved(workspace):
+    assert ai_agent.resolve_file_target("apx.py", "edit apx.py") is None
+    assert "api.py" in ai_agent.did_you_mean("apx.py", "edit apx.py")
@@ -0,0 +1,56 @@
+# The rule router's fast path, which decides when the LLM tool choice is skipped.
+import threading
+
+import pytest
+
+import router
+
+
+@pytest.mark.parametrize("prompt, tool", [
+    ("push to github", "git_manager"),
+    ("please commit my changes", "git_manager"),
+    ("update app.py to add a login page", "file_editor"),
+    ("run `pytest -q`", "command_runner"),
+    ("create a new flask todo app", "project_generator"),
+])
+def test_clear_prompts_are_routed_locally(prompt, tool):
+    route = router.route_prompt(prompt)
+    assert route is not None and route["tool"] == tool
+    assert route["confidence"] >= router.ROUTER_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("prompt", [
+    "what does git push do?",
+    "how do I push my changes?",
+    "explain the commit in app.py",
+    "why did the upload to my repo fail",
+])
+def test_questions_about_git_are_not_fast_pathed(prompt):
+    assert router.route_prompt(prompt) is None
+
+
+@pytest.mark.parametrize("prompt, min_confidence", [
+    ("make the button blue in index.html", 0.85),  # 0.8: routed only at the default threshold
+    ("create a new flask todo app", 0.9),
+    ("make it nicer", None),                        # no rule matches at all
+    ("hello there", None),
+])
+def test_below_threshold_goes_to_the_llm(prompt, min_confidence):
+    assert router.route_prompt(prompt, min_confidence=min_confidence) is None
+
+
+def test_stats_count_every_prompt_across_threads():
+    before = dict(router.router_stats)
+
+    def worker():
+        for _ in range(200):
+            router.route_prompt("push to github")
+            router.route_prompt("hello there")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert router.router_stats["routed_locally"] - before["routed_locally"] == 1600
+    assert router.router_stats["sent_to_llm"] - before["sent_to_llm"] == 1600
@@ -0,0 +1,194 @@
+# tools/code_chunks.py
+# Split source files into chunks (AST symbols for Python, fixed windows otherwise),
+# rank them against an edit request, and render a bounded "focused view" of the file.
+import ast
+import math
+import re
+from collections import Counter, namedtuple
+
+# Lines are 0-based, `end` is exclusive
+Chunk = namedtuple("Chunk", "start end name kind")
+
+TOKEN_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+')
+
+
+def tokenize(text):
+    """Identifier-aware tokens: 'get_user_name' -> get_user_name, get, user, name."""
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text):
+        word = word.lower()
+        tokens.append(word)
+        parts = [p for p in re.split(r'_+', word) if p]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def _window_chunks(lines, window, max_chars=None):
+    """Consecutive windows of at most `window` lines and `max_chars` characters (but at least one line)."""
+    chunks, start, size = [], 0, 0
+    for i, line in enumerate(lines):
+        if i > start and (i - start >= window or (max_chars and size + len(line) > max_chars)):
+            chunks.append(Chunk(start, i, f"lines {start + 1}-{i}", "window"))
+            start, size = i, 0
+        size += len(line)
+    if start < len(lines):
+        chunks.append(Chunk(start, len(lines), f"lines {start + 1}-{len(lines)}", "window"))
+    return chunks
+
+
+def _node_start(node):
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators]) - 1
+
+
+def _python_chunks(source, lines, window):
+    tree = ast.parse(source)
+    chunks = []
+    cursor = 0
+
+    def add_gap(upto):
+        # Module-level code between definitions, windowed
+        nonlocal cursor
+        for i in range(cursor, upto, window):
+            end = min(i + window, upto)
+            if any(l.strip() for l in lines[i:end]):
+                chunks.append(Chunk(i, end, f"module code {i + 1}-{end}", "module"))
+        cursor = max(cursor, upto)
+
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start, end = _node_start(node), node.end_lineno
+        add_gap(start)
+        if isinstance(node, ast.ClassDef) and end - start > 2 * window:
+            # Big class: header + one chunk per method
+            inner = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            pos = start
+            for method in inner:
+                m_start = _node_start(method)
+                if m_start > pos:
+                    chunks.append(Chunk(pos, m_start, f"class {node.name}", "class"))
+                chunks.append(Chunk(m_start, method.end_lineno, f"{node.name}.{method.name}", "function"))
+                pos = method.end_lineno
+            if pos < end:
+                chunks.append(Chunk(pos, end, f"class {node.name} (rest)", "class"))
+        else:
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            chunks.append(Chunk(start, end, node.name, kind))
+        cursor = end
+    add_gap(len(lines))
+    return chunks
+
+
+def split_chunks(file_path, source, window=60):
+    """Chunk a file: functions/classes for Python (windows if it doesn't parse), windows otherwise."""
+    lines = source.splitlines(keepends=True)
+    if file_path.endswith(".py"):
+        try:
+            return _python_chunks(source, lines, window)
+        except SyntaxError:
+            pass
+    return _window_chunks(lines, window)
+
+
+def rank_chunks(chunks, lines, query, k1=1.5, b=0.75):
+    """BM25 scores of each chunk against `query`; returns [(score, chunk), ...] best first."""
+    docs = [Counter(tokenize(c.name + " " + "".join(lines[c.start:c.end]))) for c in chunks]
+    if not docs:
+        return []
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1.0
+    query_terms = set(tokenize(query))
+    df = {t: sum(1 for d in docs if t in d) for t in query_terms}
+
+    scored = []
+    for chunk, doc in zip(chunks, docs):
+        length = sum(doc.values())
+        score = 0.0
+        for t in query_terms:
+            tf = doc.get(t, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - df[t] + 0.5) / (df[t] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        scored.append((score, chunk))
+    scored.sort(key=lambda s: s[0], reverse=True)
+    return scored
+
+
+def _skeleton(chunk, lines):
+    """One-line stand-in for an omitted chunk."""
+    if chunk.kind in ("function", "class"):
+        header = lines[chunk.start].rstrip("\n")
+        # Skip decorators so the signature is shown
+        for line in lines[chunk.start:chunk.end]:
+            if line.lstrip().startswith(("def ", "async def ", "class ")):
+                header = line.rstrip("\n")
+                break
+        indent = header[: len(header) - len(header.lstrip())]
+        return f"{header}\n{indent}    ...  # lines {chunk.start + 1}-{chunk.end} omitted\n"
+    return f"# ... lines {chunk.start + 1}-{chunk.end} omitted ...\n"
+
+
+def focus_file(file_path, source, query, budget_chars=12000, window=60):
+    """
+    Build a bounded view of `source` for an edit request.
+
+    Returns (view_text, selected_chunks) with the chunks best first. The most
+    relevant chunks are shown verbatim (up to ~80% of `budget_chars`),
+    everything else is reduced to signatures / "omitted" markers; long runs of
+    omitted code collapse into a single marker so the view stays within budget
+    for any file size. A chunk that is still too big on its own (a single huge
+    line, e.g. minified code) is clipped.
+    """
+    lines = source.splitlines(keepends=True)
+    shown_chars = int(budget_chars * 0.8)
+    chunks = []
+    for chunk in split_chunks(file_path, source, window):
+        # A single symbol bigger than the budget is split into windows (by lines and characters)
+        if sum(len(l) for l in lines[chunk.start:chunk.end]) > budget_chars * 0.5:
+            chunks.extend(Chunk(c.start + chunk.start, c.end + chunk.start, f"{chunk.name} ({c.name})", "window")
+                          for c in _window_chunks(lines[chunk.start:chunk.end], window, int(budget_chars * 0.5)))
+        else:
+            chunks.append(chunk)
+    ranked = rank_chunks(chunks, lines, query)
+
+    selected, used = [], 0
+    for score, chunk in ranked:
+        size = min(sum(len(l) for l in lines[chunk.start:chunk.end]), shown_chars)
+        if selected and (score <= 0 or used + size > shown_chars):
+            continue
+        selected.append(chunk)
+        used += size
+    chosen = set(selected)
+
+    skeletons = {c: _skeleton(c, lines) for c in chunks if c not in chosen}
+    collapse = sum(len(s) for s in skeletons.values()) > budget_chars - used
+
+    parts, omitted_from = [], None
+    for chunk in chunks:
+        if chunk in chosen:
+            if omitted_from is not None:
+                parts.append(f"# ... lines {omitted_from + 1}-{chunk.start} omitted ...\n")
+                omitted_from = None
+            text = "".join(lines[chunk.start:chunk.end])
+            if len(text) > shown_chars:
+                text = (text[:shown_chars] + f"\n# ... {len(text) - shown_chars} more chars of "
+                        f"lines {chunk.start + 1}-{chunk.end} clipped ...\n")
+            parts.append(text if text.endswith("\n") else text + "\n")
+        elif collapse:
+            if omitted_from is None:
+                omitted_from = chunk.start
+        else:
+            parts.append(skeletons[chunk])
+    if omitted_from is not None:
+        parts.append(f"# ... lines {omitted_from + 1}-{len(lines)} omitted ...\n")
+    return "".join(parts), selected
+
+
+def splice(source, start, end, replacement):
+    """Replace lines [start, end) of `source` with `replacement`."""
+    lines = source.splitlines(keepends=True)
+    if replacement and not replacement.endswith("\n") and end < len(lines):
+        replacement += "\n"
+    return "".join(lines[:start]) + replacement + "".join(lines[end:])
@@ -1,14 +1,224 @@
+import os
+import queue
+import signal
 import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 
-def run_command(cmd):
+from tracing import traced, current_span
+from config import (COMMAND_TIMEOUT, COMMAND_MAX_OUTPUT_BYTES, COMMAND_HEAD_LINES, COMMAND_TAIL_LINES,
+                    COMMAND_MAX_LINE_CHARS)
+
+
+class OutputBuffer:
     """
-    Run a shell command and show its output and errors.
+    Bounded capture of a line stream: the first `head_lines` lines and a ring
+    buffer of the last `tail_lines`; everything in between is only counted.
     """
+
+    def __init__(self, head_lines=COMMAND_HEAD_LINES, tail_lines=COMMAND_TAIL_LINES):
+        self.head_lines = head_lines
+        self.head = []
+        self.tail = deque(maxlen=tail_lines)
+        self.lines = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, line):
+        with self._lock:
+            self.lines += 1
+            self.bytes += len(line)
+            if len(self.head) < self.head_lines:
+                self.head.append(line)
+            else:
+                self.tail.append(line)
+
+    @property
+    def truncated(self):
+        return self.lines > len(self.head) + len(self.tail)
+
+    def text(self):
+        with self._lock:
+            omitted = self.lines - len(self.head) - len(self.tail)
+            parts = list(self.head)
+            if omitted > 0:
+                parts.append(f"... [{omitted} lines omitted] ...\n")
+            parts.extend(self.tail)
+        return "".join(parts)
+
+
+@dataclass
+class CommandResult:
+    cmd: str
+    exit_code: int
+    duration: float
+    stdout: str
+    stderr: str
+    truncated: bool = False
+    timed_out: bool = False
+    output_limited: bool = False
+
+    @property
+    def ok(self):
+        return self.exit_code == 0 and not self.timed_out and not self.output_limited
+
+    def __str__(self):
+        status = f"exit code {self.exit_code}"
+        if self.timed_out:
+            status = "killed after timeout"
+        elif self.output_limited:
+            status = "killed after exceeding the output limit"
+        text = f"`{self.cmd}` → {status} in {self.duration:.1f}s"
+        if self.stdout.strip():
+            text += f"\nstdout:\n{self.stdout.rstrip()}"
+        if self.stderr.strip():
+            text += f"\nstderr:\n{self.stderr.rstrip()}"
+        if self.truncated:
+            text += "\n(output truncated)"
+        return text
+
+
+def _print_output(stream, line):
+    print(("🔴 " if stream == "stderr" else "") + line, end="" if line.endswith("\n") else "\n")
+
+
+def kill_process_tree(proc):
+    """Kill a process started with start_new_session (its whole group on POSIX)."""
     try:
-        print(f"\n⚙️ Running command: {cmd}\n")
-        result = subprocess.run(cmd, shell=True, text=True, capture_output=True)
-        print("🟢 Output:\n", result.stdout)
-        if result.stderr:
-            print("🔴 Errors:\n", result.stderr)
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+def read_lines(pipe, max_line_chars=COMMAND_MAX_LINE_CHARS):
+    """
+    Yield (line, size) from a text pipe without ever buffering more than
+    `max_line_chars`: a longer line is yielded once, clipped, and its remainder
+    as (None, size) pieces that are only counted.
+    """
+    clipping = False
+    for piece in iter(lambda: pipe.readline(max_line_chars), ""):
+        complete = piece.endswith("\n")
+        if clipping:
+            clipping = not complete
+            yield None, len(piece)
+        elif not complete and len(piece) >= max_line_chars:
+            clipping = True
+            yield piece + " ... [line clipped]\n", len(piece)
+        else:
+            yield piece, len(piece)
+
+
+class OutputLimit:
+    """Output byte budget shared by a command's reader threads; `on_exceeded` runs once."""
+
+    def __init__(self, max_bytes, on_exceeded):
+        self.max_bytes = max_bytes
+        self.on_exceeded = on_exceeded
+        self.used = 0
+        self.exceeded = False
+        self._lock = threading.Lock()
+
+    def consume(self, size):
+        """Count `size` bytes; False once the budget is used up."""
+        with self._lock:
+            self.used += size
+            if self.exceeded or self.used <= self.max_bytes:
+                return not self.exceeded
+            self.exceeded = True
+        self.on_exceeded()
+        return False
+
+
+def pump_stream(pipe, stream, lines, limit=None):
+    """
+    Reader thread: push (stream, line) from `pipe` onto the `lines` queue, then (stream, None).
+    Once `limit` is exceeded the rest of the output is read and discarded.
+    """
+    try:
+        for line, size in read_lines(pipe):
+            if limit is not None and not limit.consume(size):
+                while pipe.read(65536):
+                    pass  # drain until the killed process closes the pipe
+                break
+            if line is not None:
+                lines.put((stream, line))
+    except ValueError:
+        pass  # pipe closed while killing
+    finally:
+        pipe.close()
+        lines.put((stream, None))
+
+
+@traced("run_command")
+def run_command(cmd, timeout=COMMAND_TIMEOUT, max_output_bytes=COMMAND_MAX_OUTPUT_BYTES,
+                on_output=None, cwd=None):
+    """
+    Run a shell command, streaming its output line by line to `on_output(stream, line)`
+    (printed by default). Only the head and tail of each stream are kept in memory.
+    The command is killed after `timeout` seconds or once it has produced more than
+    `max_output_bytes`. Returns a CommandResult.
+    """
+    on_output = on_output or _print_output
+    print(f"\n⚙️ Running command: {cmd}\n")
+    start = time.monotonic()
+    try:
+        proc = subprocess.Popen(
+            cmd, shell=True, cwd=cwd, text=True, encoding="utf-8", errors="replace", bufsize=1,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=(os.name == "posix"),
+        )
     except Exception as e:
         print("❌ Command execution failed:", str(e))
+        return CommandResult(cmd, -1, 0.0, "", str(e))
+
+    buffers = {"stdout": OutputBuffer(), "stderr": OutputBuffer()}
+    lines = queue.Queue(maxsize=10000)  # backpressure on very chatty commands
+    # The byte limit is enforced by the readers, so nothing past it is ever buffered
+    limit = OutputLimit(max_output_bytes, lambda: kill_process_tree(proc))
+    for stream in buffers:
+        pipe = proc.stdout if stream == "stdout" else proc.stderr
+        threading.Thread(target=pump_stream, args=(pipe, stream, lines, limit), daemon=True).start()
+
+    # Output is handled on the calling thread so UI callbacks (e.g. Streamlit) are safe
+    deadline = start + timeout if timeout else None
+    open_streams = len(buffers)
+    timed_out = False
+    while open_streams:
+        wait = 0.1 if deadline is None else max(0.0, min(0.1, deadline - time.monotonic()))
+        try:
+            stream, line = lines.get(timeout=wait)
+        except queue.Empty:
+            if deadline is not None and time.monotonic() >= deadline and not timed_out:
+                timed_out = True
+                kill_process_tree(proc)
+            continue
+        if line is None:
+            open_streams -= 1
+            continue
+        buffers[stream].add(line)
+        on_output(stream, line)
+    proc.wait()
+    output_limited = limit.exceeded
+    stdout, stderr = buffers["stdout"], buffers["stderr"]
+
+    result = CommandResult(
+        cmd=cmd,
+        exit_code=proc.returncode,
+        duration=time.monotonic() - start,
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+        truncated=stdout.truncated or stderr.truncated,
+        timed_out=timed_out,
+        output_limited=output_limited,
+    )
+    current_span().set(cmd=cmd, exit_code=result.exit_code, output_bytes=limit.used,
+                       timed_out=timed_out, output_limited=output_limited)
+    icon = "🟢" if result.ok else "🔴"
+    print(f"\n{icon} {str(result).splitlines()[0]}")
+    return result
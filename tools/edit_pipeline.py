@@ -0,0 +1,82 @@
+# tools/edit_pipeline.py
+# Concurrent multi-file edits with all-or-nothing writes (retries happen in model_client).
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from config import EDIT_CONCURRENCY
+from tools.file_editor import EditError, propose_edit
+from manifest import write_if_changed
+from tracing import traced, current_span
+
+
+def _propose(edit):
+    file_path, prompt = edit["file_path"], edit["modification_prompt"]
+    with open(file_path, "r", encoding="utf-8") as f:
+        original = f.read()
+    new_code, mode = propose_edit(file_path, prompt, original)
+    return original, new_code, mode
+
+
+@traced("run_edits")
+def run_edits(edits, max_workers=EDIT_CONCURRENCY):
+    """
+    Apply several file edits as one unit.
+
+    `edits` is a list of {"file_path", "modification_prompt"} with existing
+    paths. All Gemini calls run concurrently (at most `max_workers` at once);
+    nothing is written unless every edit produced valid code, and if a write
+    fails part-way the files already written are restored.
+
+    Returns {"ok": bool, "results": [{"file_path", "ok", "mode" | "error"}, ...]}.
+    """
+    # Several instructions for the same file become one edit
+    merged = {}
+    for edit in edits:
+        merged.setdefault(edit["file_path"], []).append(edit["modification_prompt"])
+    edits = [{"file_path": path, "modification_prompt": "\n".join(prompts)} for path, prompts in merged.items()]
+
+    results = [{"file_path": e["file_path"], "ok": False} for e in edits]
+    proposals = [None] * len(edits)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        # Each worker runs in a copy of this context so its spans join the current trace
+        futures = [pool.submit(contextvars.copy_context().run, _propose, edit) for edit in edits]
+        for i, future in enumerate(futures):
+            try:
+                proposals[i] = future.result()
+                results[i].update(ok=True, mode=proposals[i][2])
+            except (EditError, OSError) as e:
+                results[i]["error"] = str(e)
+            except Exception as e:
+                results[i]["error"] = f"{type(e).__name__}: {e}"
+
+    current_span().set(files=len(edits))
+    if not all(r["ok"] for r in results):
+        for r in results:
+            if r["ok"]:
+                r.update(ok=False, error="not applied (another edit failed)")
+        return {"ok": False, "results": results}
+
+    written = []
+    try:
+        for edit, (original, new_code, _) in zip(edits, proposals):
+            write_if_changed(edit["file_path"], new_code)
+            written.append((edit["file_path"], original))
+    except OSError as e:
+        for file_path, original in reversed(written):
+            write_if_changed(file_path, original)
+        for r in results:
+            r.update(ok=False, error=f"rolled back: {e}")
+        return {"ok": False, "results": results}
+
+    return {"ok": True, "results": results}
+
+
+def format_results(outcome):
+    """Human-readable summary for the agent memory / UI."""
+    head = "✅ All edits applied." if outcome["ok"] else "❌ Edits rolled back; no files changed."
+    lines = [head]
+    for r in outcome["results"]:
+        status = f"updated ({r['mode']})" if r["ok"] else r.get("error", "failed")
+        lines.append(f"- {r['file_path']}: {status}")
+    return "\n".join(lines)
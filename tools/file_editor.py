@@ -1,25 +1,58 @@
 import os
-import google.generativeai as genai
-from config import API_KEY, MODEL_NAME
+import re
+from config import EDIT_MODE, EDIT_CONTEXT_CHARS
+from model_client import get_client
+from manifest import write_if_changed
+from tools.patcher import (PatchError, parse_hunks, apply_hunks, validate_code,
+                           reindent, first_indent)
+from tools.code_chunks import focus_file, splice
+from tracing import span, traced, current_span
 
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel(MODEL_NAME)
 
-def modify_file(file_path, modification_prompt):
-    """
-    Modify an existing file based on a natural language instruction using Gemini.
+class EditError(Exception):
+    """The model's edit could not be turned into valid file contents."""
+
+
+def _strip_fences(text, keep_indent=False):
+    text = text.strip("\n") if keep_indent else text.strip()
+    text = re.sub(r'^\s*```[\w+-]*[ \t]*\n?', "", text)
+    text = re.sub(r'\n?```\s*$', "", text)
+    return text.replace("```python", "").replace("```", "")
+
+
+FOCUSED_NOTE = """
+    The file is large, so only the parts relevant to the request are shown;
+    lines marked "omitted" are hidden. Only copy SEARCH lines from code that is shown.
+"""
+
+
+def _patch_instruction(modification_prompt, original_code, focused=False):
+    return f"""
+    Modify the following code according to the user's request.{FOCUSED_NOTE if focused else ""}
+    Do NOT return the whole file. Return only search/replace blocks in exactly this format:
+
+    <<<<<<< SEARCH
+    (lines copied exactly from the original code, with enough context to be unique)
+    =======
+    (the lines that should replace them)
+    >>>>>>> REPLACE
+
+    Use as many blocks as needed, in file order. No explanations, no markdown.
+
+    Request: {modification_prompt}
+
+    Original Code:
+    ```
+    {original_code}
+    ```
     """
-    if not os.path.exists(file_path):
-        print(f"❌ File not found: {file_path}")
-        return
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        original_code = f.read()
 
-    instruction = f"""
+def _rewrite_instruction(modification_prompt, original_code):
+    return f"""
     Modify the following code according to the user's request.
     Keep the same structure and language.
-    
+
     Request: {modification_prompt}
 
     Original Code:
@@ -29,10 +62,108 @@ def modify_file(file_path, modification_prompt):
     Return only the modified code (no explanations, no markdown).
     """
 
-    response = model.generate_content(instruction)
-    new_code = response.text.strip().replace("```python", "").replace("```", "")
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(new_code)
+def _section_instruction(modification_prompt, section, start, end):
+    return f"""
+    Below is lines {start + 1}-{end} of a larger file. Modify this section according to
+    the user's request. Keep the same structure, language and indentation.
+
+    Request: {modification_prompt}
+
+    Section:
+    ```
+    {section}
+    ```
+    Return only the modified section (no explanations, no markdown).
+    """
+
+
+def _rewrite_section(file_path, modification_prompt, original_code, selected):
+    """Regenerate only the relevant part of a large file and splice it back in."""
+    lines = original_code.splitlines(keepends=True)
+    start, end = min(c.start for c in selected), max(c.end for c in selected)
+    if sum(len(l) for l in lines[start:end]) > EDIT_CONTEXT_CHARS:
+        start, end = selected[0].start, selected[0].end  # just the best match
+    if sum(len(l) for l in lines[start:end]) > EDIT_CONTEXT_CHARS:
+        raise EditError(f"lines {start + 1}-{end} are too long to regenerate ({EDIT_CONTEXT_CHARS} chars max)")
+    section = "".join(lines[start:end])
+    text = get_client().generate(_section_instruction(modification_prompt, section, start, end),
+                                 content=original_code)
+    new_lines = _strip_fences(text, keep_indent=True).splitlines(keepends=True)
+    section_lines = lines[start:end]
+    new_lines = reindent(new_lines, first_indent(new_lines), first_indent(section_lines))
+    return splice(original_code, start, end, "".join(new_lines) + "\n")
+
+
+def propose_edit(file_path, modification_prompt, original_code=None):
+    """
+    Ask Gemini for an edit and return (new_code, mode) without writing anything.
+
+    In "diff" mode the model returns search/replace hunks that are applied
+    locally and validated; only if that fails does it fall back to asking for
+    the whole file ("rewrite"). Files over EDIT_CONTEXT_CHARS are sent as a
+    focused view (relevant chunks + skeleton) and a rewrite only regenerates
+    the relevant section. Raises EditError if the result is unusable.
+    """
+    if original_code is None:
+        with open(file_path, "r", encoding="utf-8") as f:
+            original_code = f.read()
+
+    # Large files: only send the chunks relevant to the request plus a skeleton
+    view, selected = original_code, None
+    if len(original_code) > EDIT_CONTEXT_CHARS:
+        view, selected = focus_file(file_path, original_code, modification_prompt, EDIT_CONTEXT_CHARS)
+        print(f"ℹ️ Large file: sending {len(selected)} relevant chunk(s), {len(view)} of {len(original_code)} chars.")
+
+    if EDIT_MODE == "diff":
+        try:
+            text = get_client().generate(_patch_instruction(modification_prompt, view, focused=bool(selected)),
+                                         content=original_code, validate=parse_hunks)
+            hunks = parse_hunks(text)
+            if not hunks:
+                raise PatchError("no SEARCH/REPLACE blocks in the reply")
+            with span("patch.apply", hunks=len(hunks)):
+                new_code = apply_hunks(original_code, hunks)
+                error = validate_code(file_path, new_code)
+            if error:
+                raise PatchError(f"patched file does not validate: {error}")
+            return new_code, "patch"
+        except PatchError as e:
+            print(f"⚠️ Patch failed ({e}); falling back to full-file regeneration.")
+
+    if selected:
+        new_code = _rewrite_section(file_path, modification_prompt, original_code, selected)
+    else:
+        text = get_client().generate(_rewrite_instruction(modification_prompt, original_code),
+                                     content=original_code)
+        new_code = _strip_fences(text)
+    error = validate_code(file_path, new_code)
+    if error and validate_code(file_path, original_code) is None:
+        raise EditError(f"regenerated file does not validate: {error}")
+    return new_code, "rewrite"
+
+
+@traced("modify_file")
+def modify_file(file_path, modification_prompt):
+    """
+    Modify an existing file based on a natural language instruction using Gemini.
+    Returns a short result message.
+    """
+    if not os.path.exists(file_path):
+        print(f"❌ File not found: {file_path}")
+        return f"❌ File not found: {file_path}"
+
+    try:
+        new_code, mode = propose_edit(file_path, modification_prompt)
+    except EditError as e:
+        print(f"❌ Edit rejected for '{file_path}': {e}")
+        return f"❌ Edit rejected for '{file_path}': {e}"
+
+    if not write_if_changed(file_path, new_code):
+        print(f"ℹ️ File '{file_path}' already matches the requested change; nothing written.")
+        current_span().set(file=file_path, mode=mode, unchanged=True)
+        return f"✅ File '{file_path}' unchanged ({mode})."
+    current_span().set(file=file_path, mode=mode, bytes_out=len(new_code.encode("utf-8")))
 
-    print(f"✅ File '{file_path}' updated successfully.")
+    print(f"✅ File '{file_path}' updated successfully ({mode}).")
+    return f"✅ File '{file_path}' updated ({mode})."
@@ -1,17 +1,31 @@
 # tools/git_manager.py
 import os
-import subprocess
-import requests
+import threading
+
 from dotenv import load_dotenv
 
+from manifest import MANIFEST_NAME
+from tracing import span, traced, current_span
+
 load_dotenv()
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_USERNAME = os.getenv("GITHUB_USERNAME")
 
+DEFAULT_BRANCH = "main"
+
+# GitPython and requests are imported inside the functions that use them, so
+# importing this module (and the agent) does not pay for them up front.
+
+# One Repo handle (and lock) per project folder; no os.chdir anywhere
+_repos = {}
+_repos_lock = threading.Lock()
+
 
 def create_github_repo(repo_name, description="Repo created by AI Coding Agent"):
     """Create a GitHub repo using GitHub API."""
+    import requests
+
     api_url = "https://api.github.com/user/repos"
     headers = {
         "Authorization": f"Bearer {GITHUB_TOKEN}",
@@ -34,43 +48,136 @@ def create_github_repo(repo_name, description="Repo created by AI Coding Agent")
     return None, None
 
 
+def _exclude_manifest(repo):
+    """Keep the project's content manifest out of commits (it is local bookkeeping)."""
+    exclude_path = os.path.join(repo.git_dir, "info", "exclude")
+    try:
+        with open(exclude_path, "r", encoding="utf-8") as f:
+            if MANIFEST_NAME in f.read().split():
+                return
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(exclude_path), exist_ok=True)
+    with open(exclude_path, "a", encoding="utf-8") as f:
+        f.write(f"\n{MANIFEST_NAME}\n")
+
+
+def get_repo(folder_path, branch=DEFAULT_BRANCH):
+    """Return (repo, lock) for a project folder, initialising a repository on first use."""
+    from git import Repo, InvalidGitRepositoryError, NoSuchPathError
+
+    key = os.path.abspath(folder_path)
+    with _repos_lock:
+        if key not in _repos:
+            try:
+                repo = Repo(key)
+            except (InvalidGitRepositoryError, NoSuchPathError):
+                repo = Repo.init(key)
+                repo.git.symbolic_ref("HEAD", f"refs/heads/{branch}")
+            _exclude_manifest(repo)
+            _repos[key] = (repo, threading.Lock())
+        return _repos[key]
+
+
+def stage_changes(repo):
+    """Stage only new, modified and deleted files. Returns the changed paths."""
+    added = list(repo.untracked_files)
+    modified, deleted = [], []
+    for diff in repo.index.diff(None):
+        (deleted if diff.deleted_file else modified).append(diff.a_path)
+    if added or modified:
+        repo.index.add(added + modified)
+    if deleted:
+        repo.index.remove(deleted, working_tree=False)
+    return sorted(added + modified + deleted)
+
+
+def commit_changes(folder_path, message="Auto commit by AI Agent"):
+    """
+    Commit whatever changed in `folder_path` since the last commit.
+    Returns (commit_sha, changed_paths); commit_sha is None when nothing changed.
+    """
+    repo, lock = get_repo(folder_path)
+    with lock, span("git.commit") as commit_span:
+        changed = stage_changes(repo)
+        commit_span.set(files=len(changed))
+        has_head = repo.head.is_valid()
+        if has_head and not repo.index.diff("HEAD"):
+            return None, []
+        if not has_head and not changed:
+            return None, []
+        commit = repo.index.commit(message)
+        return commit.hexsha, changed
+
+
+def push(folder_path, remote_url, branch=DEFAULT_BRANCH, force=False):
+    """Push `branch` to `remote_url` (a URL or a local bare repo path) as origin."""
+    from git import GitCommandError
+    from git.remote import PushInfo
+
+    repo, lock = get_repo(folder_path)
+    with lock, span("git.push", branch=branch):
+        if "origin" in [r.name for r in repo.remotes]:
+            origin = repo.remote("origin")
+            if origin.url != remote_url:
+                origin.set_url(remote_url)
+        else:
+            origin = repo.create_remote("origin", remote_url)
+
+        results = origin.push(refspec=f"{branch}:{branch}", force=force)
+        errors = [info.summary.strip() for info in results
+                  if info.flags & (PushInfo.ERROR | PushInfo.REJECTED | PushInfo.REMOTE_REJECTED)]
+        if errors:
+            raise GitCommandError("push", 1, stderr="; ".join(errors))
+        if not repo.active_branch.tracking_branch():
+            repo.active_branch.set_tracking_branch(origin.refs[branch])
+
+
+def commit_and_push(folder_path, remote_url, message="Auto commit by AI Agent", branch=DEFAULT_BRANCH):
+    """Commit changed files and push them. Returns {"commit", "files", "pushed"}."""
+    sha, changed = commit_changes(folder_path, message)
+    if sha:
+        print(f"📝 Committed {len(changed)} changed file(s): {sha[:7]}")
+    else:
+        print("ℹ️ No changes to commit.")
+    push(folder_path, remote_url, branch)
+    return {"commit": sha, "files": changed, "pushed": True}
+
+
+@traced("git_commit_and_push")
 def git_commit_and_push(folder_path, message="Auto commit by AI Agent"):
     """Push project to GitHub + return repo links (ZIP + Codespaces)."""
-    repo_name = os.path.basename(folder_path)
+    from git import GitCommandError
+
+    repo_name = os.path.basename(os.path.normpath(folder_path))
 
-    # ✅ Create GitHub repo
-    clone_url, html_url = create_github_repo(repo_name)
+    # ✅ Reuse the project's GitHub remote, or create the GitHub repo on first push
+    repo, _ = get_repo(folder_path)
+    if "origin" in [r.name for r in repo.remotes]:
+        clone_url = repo.remote("origin").url
+        html_url = clone_url[:-len(".git")] if clone_url.endswith(".git") else clone_url
+    else:
+        clone_url, html_url = create_github_repo(repo_name)
 
     if not clone_url:
         return "❌ Failed to create GitHub repo."
 
     # ZIP download + Codespaces
-    zip_url = f"https://github.com/{GITHUB_USERNAME}/{repo_name}/archive/refs/heads/main.zip"
+    zip_url = f"https://github.com/{GITHUB_USERNAME}/{repo_name}/archive/refs/heads/{DEFAULT_BRANCH}.zip"
     codespaces_url = f"https://github.com/codespaces/new?repo={GITHUB_USERNAME}/{repo_name}"
 
-    os.chdir(folder_path)
     try:
-        subprocess.run("git init", shell=True, check=False)
-        subprocess.run("git add .", shell=True, check=True)
-        subprocess.run(f'git commit -m "{message}"', shell=True, check=True)
-        subprocess.run("git branch -M main", shell=True, check=False)
-
-        # ✅ Force replace origin
-        subprocess.run("git remote remove origin", shell=True, check=False)
-        subprocess.run(f"git remote add origin {clone_url}", shell=True, check=True)
-
-        subprocess.run("git push -u origin main --force", shell=True, check=True)
-
-        print(f"✅ Code pushed to GitHub: {html_url}")
-
-        return {
-            "repo_url": html_url,
-            "zip_url": zip_url,
-            "codespaces_url": codespaces_url
-        }
-
-    except subprocess.CalledProcessError as e:
+        outcome = commit_and_push(folder_path, clone_url, message)
+    except GitCommandError as e:
         return f"❌ Git push failed: {e}"
 
-    finally:
-        os.chdir("../..")
+    current_span().set(files=len(outcome["files"]), committed=bool(outcome["commit"]))
+    print(f"✅ Code pushed to GitHub: {html_url}")
+
+    return {
+        "repo_url": html_url,
+        "zip_url": zip_url,
+        "codespaces_url": codespaces_url,
+        "commit": outcome["commit"],
+        "files": outcome["files"],
+    }
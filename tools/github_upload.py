@@ -0,0 +1,223 @@
+# tools/github_upload.py
+# Upload a generated project to GitHub as a single commit via the Git Data API:
+# blobs in parallel over one pooled session, then one tree, one commit and a ref update.
+# Files whose git blob id already matches the branch's tree are not uploaded again.
+import base64
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from manifest import git_blob_sha
+from tracing import span
+from config import GITHUB_API_URL, GITHUB_UPLOAD_CONCURRENCY, GITHUB_TIMEOUT
+
+EXECUTABLE_EXTENSIONS = {".sh", ".bash"}
+RETRY_STATUSES = (502, 503, 504)
+
+
+class GitHubUploadError(Exception):
+    """A repository-level step (repo, ref, tree, commit) failed; nothing was committed."""
+
+
+def _as_bytes(content):
+    return content.encode("utf-8") if isinstance(content, str) else bytes(content)
+
+
+def _mode(path):
+    return "100755" if os.path.splitext(path)[1] in EXECUTABLE_EXTENSIONS else "100644"
+
+
+def _error_text(response):
+    try:
+        message = response.json().get("message", "")
+    except ValueError:
+        message = response.text[:200]
+    return f"HTTP {response.status_code}: {message}"
+
+
+class GitHubUploader:
+    def __init__(self, token, owner, repo, api_url=GITHUB_API_URL,
+                 max_workers=GITHUB_UPLOAD_CONCURRENCY, timeout=GITHUB_TIMEOUT, blob_retries=3, backoff=0.5):
+        self.owner = owner
+        self.repo = repo
+        self.api_url = api_url.rstrip("/")
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.blob_retries = blob_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+        })
+        # Reads are retried here; of the writes only blob creation (content-addressed, see
+        # _create_blob) is. Creating the repo, a commit or moving the ref must not be repeated.
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # === HTTP helpers ===
+    def _url(self, path):
+        return f"{self.api_url}/repos/{self.owner}/{self.repo}{path}"
+
+    def _request(self, method, url, **kwargs):
+        return self.session.request(method, url, timeout=self.timeout, **kwargs)
+
+    def _expect(self, response, step, ok=(200, 201)):
+        if response.status_code not in ok:
+            raise GitHubUploadError(f"{step} failed: {_error_text(response)}")
+        return response.json()
+
+    # === Steps ===
+    def ensure_repo(self):
+        """Return the repo JSON, creating a public repo if it doesn't exist yet."""
+        response = self._request("GET", self._url(""))
+        if response.status_code == 404:
+            response = self._request("POST", f"{self.api_url}/user/repos",
+                                     json={"name": self.repo, "private": False, "auto_init": True})
+            repo = self._expect(response, "create repo")
+            print(f"📦 Created GitHub repo {self.owner}/{self.repo}")
+            return repo
+        return self._expect(response, "get repo")
+
+    def _head(self, branch):
+        """(commit_sha, tree_sha) of the branch head, or (None, None) for an empty repo."""
+        response = self._request("GET", self._url(f"/git/ref/heads/{branch}"))
+        if response.status_code in (404, 409):
+            return None, None
+        commit_sha = self._expect(response, "get ref")["object"]["sha"]
+        commit = self._expect(self._request("GET", self._url(f"/git/commits/{commit_sha}")), "get commit")
+        return commit_sha, commit["tree"]["sha"]
+
+    def _bootstrap(self, branch, path, content):
+        """The Git Data API refuses empty repos, so create the first commit via the contents API."""
+        response = self._request("PUT", self._url(f"/contents/{path}"), json={
+            "message": f"Add {path}",
+            "content": base64.b64encode(_as_bytes(content)).decode(),
+            "branch": branch,
+        })
+        self._expect(response, "initial commit")
+        return self._head(branch)
+
+    def _remote_blobs(self, tree_sha):
+        """{path: (blob sha, mode)} of the files in a tree; empty if it can't be listed in full."""
+        response = self._request("GET", self._url(f"/git/trees/{tree_sha}"), params={"recursive": "1"})
+        if response.status_code != 200:
+            return {}
+        tree = response.json()
+        if tree.get("truncated"):
+            return {}
+        return {e["path"]: (e["sha"], e["mode"]) for e in tree.get("tree", []) if e.get("type") == "blob"}
+
+    def _create_blob(self, content):
+        """Upload one blob, retrying transient failures (safe: the same content yields the same blob)."""
+        payload = {"content": base64.b64encode(_as_bytes(content)).decode(), "encoding": "base64"}
+        for attempt in range(self.blob_retries + 1):
+            last_attempt = attempt == self.blob_retries
+            try:
+                response = self._request("POST", self._url("/git/blobs"), json=payload)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    break
+            time.sleep(self.backoff * 2 ** attempt)
+        if response.status_code != 201:
+            raise GitHubUploadError(_error_text(response))
+        return response.json()["sha"]
+
+    def upload(self, files, message="Add generated project", branch=None):
+        """
+        Commit `files` ({path: str | bytes}) on top of `branch` (the repo's
+        default branch if omitted) as one commit.
+
+        Only files that differ from the branch's tree (by git blob id and
+        mode) are uploaded; if none do, no commit is made.
+
+        Returns {"ok", "commit_sha", "html_url", "uploaded": [paths],
+        "unchanged": [paths], "failed": {path: error}}. Files whose blob
+        upload fails are left out of the commit and reported in "failed";
+        repository-level failures raise GitHubUploadError.
+        """
+        files = {path.replace("\\", "/").lstrip("/"): content for path, content in files.items()}
+        repo = self.ensure_repo()
+        branch = branch or repo.get("default_branch") or "main"
+
+        parent_sha, base_tree = self._head(branch)
+        if parent_sha is None and files:
+            first = next(iter(files))
+            parent_sha, base_tree = self._bootstrap(branch, first, files[first])
+
+        remote = self._remote_blobs(base_tree) if base_tree else {}
+        changed = {path: content for path, content in files.items()
+                   if remote.get(path) != (git_blob_sha(content), _mode(path))}
+        unchanged = sorted(set(files) - set(changed))
+
+        blobs, failed = {}, {}
+        with span("github.blobs", files=len(changed), unchanged=len(unchanged),
+                  bytes=sum(len(_as_bytes(c)) for c in changed.values())) as blob_span, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {path: pool.submit(self._create_blob, content) for path, content in changed.items()}
+            for path, future in futures.items():
+                try:
+                    blobs[path] = future.result()
+                except (GitHubUploadError, requests.RequestException) as e:
+                    failed[path] = str(e)
+            blob_span.set(failed=len(failed))
+
+        result = {"ok": False, "commit_sha": None, "html_url": repo.get("html_url"),
+                  "uploaded": [], "unchanged": unchanged, "failed": failed}
+        if not changed:
+            result["ok"] = True  # the branch already has every file
+            return result
+        if not blobs:
+            return result
+
+        tree_entries = [{
+            "path": path,
+            "mode": _mode(path),
+            "type": "blob",
+            "sha": sha,
+        } for path, sha in blobs.items()]
+        with span("github.commit", branch=branch):
+            tree = self._expect(self._request("POST", self._url("/git/trees"),
+                                              json={"base_tree": base_tree, "tree": tree_entries}), "create tree")
+            commit = self._expect(self._request("POST", self._url("/git/commits"), json={
+                "message": message, "tree": tree["sha"], "parents": [parent_sha] if parent_sha else [],
+            }), "create commit")
+            # Fast-forward only: fails instead of clobbering commits pushed meanwhile
+            self._expect(self._request("PATCH", self._url(f"/git/refs/heads/{branch}"),
+                                       json={"sha": commit["sha"], "force": False}), "update ref")
+
+        result.update(ok=not failed, commit_sha=commit["sha"], uploaded=sorted(blobs))
+        return result
+
+
+def upload_project(files, owner, repo, token, message="Add generated project", **kwargs):
+    """Convenience wrapper: upload `files` as one commit and print a summary."""
+    uploader = GitHubUploader(token, owner, repo, **kwargs)
+    try:
+        result = uploader.upload(files, message=message)
+    except (GitHubUploadError, requests.RequestException) as e:
+        print(f"❌ GitHub upload failed: {e}")
+        return {"ok": False, "commit_sha": None, "html_url": None, "uploaded": [], "unchanged": [],
+                "failed": {path: str(e) for path in files}}
+    finally:
+        uploader.session.close()
+
+    for path, error in result["failed"].items():
+        print(f"  ❌ {path}: {error}")
+    if result["commit_sha"]:
+        print(f"✅ Uploaded {len(result['uploaded'])} file(s) in commit {result['commit_sha'][:7]}"
+              f" ({len(result['unchanged'])} unchanged): {result['html_url']}")
+    elif result["ok"]:
+        print(f"✅ GitHub already up to date ({len(result['unchanged'])} file(s) unchanged): {result['html_url']}")
+    return result
@@ -0,0 +1,212 @@
+# tools/job_manager.py
+# Background jobs: run commands / generated apps without blocking the agent.
+import atexit
+import os
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+
+from config import JOB_MAX_CONCURRENT, JOB_CPU_SECONDS, JOB_MEMORY_MB, JOB_LOG_LINES, JOB_KEEP_FINISHED
+from tools.command_runner import OutputBuffer, kill_process_tree, read_lines
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+
+def _limit_resources(cmd, cpu_seconds, memory_mb):
+    """
+    Wrap `cmd` so the shell applies rlimits with `ulimit` before exec'ing it
+    (unchanged where unsupported). Unlike a preexec_fn this is safe to spawn from
+    a multi-threaded process, and unlike a prlimit after spawn nothing can start
+    before the limits are in place. Returns (cmd, shell) for Popen.
+    """
+    shell = isinstance(cmd, str)
+    if resource is None or not (cpu_seconds or memory_mb):
+        return cmd, shell
+    limits = []
+    if cpu_seconds:
+        limits.append(f"ulimit -t {int(cpu_seconds)}")
+    if memory_mb:
+        limits.append(f"ulimit -v {int(memory_mb) * 1024}")  # KiB of address space
+    prefix = " && ".join(limits)
+    if shell:
+        return ["/bin/sh", "-c", f"{prefix} && exec /bin/sh -c {shlex.quote(cmd)}"], False
+    return ["/bin/sh", "-c", f'{prefix} && exec "$@"', "sh", *cmd], False
+
+
+class Job:
+    def __init__(self, job_id, cmd, cwd, name, cpu_seconds, memory_mb):
+        self.id = job_id
+        self.cmd = cmd
+        self.cwd = cwd
+        self.name = name or (cmd if isinstance(cmd, str) else " ".join(cmd))
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.state = "queued"
+        self.exit_code = None
+        self.proc = None
+        self.output = OutputBuffer(head_lines=0, tail_lines=JOB_LOG_LINES)
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "pid": self.proc.pid if self.proc else None,
+            "exit_code": self.exit_code,
+            "cwd": self.cwd,
+            "duration": round(end - self.started_at, 2) if self.started_at else 0.0,
+            "output_lines": self.output.lines,
+        }
+
+
+class JobManager:
+    """
+    Pool of background processes. At most `max_concurrent` jobs run at once;
+    later ones wait in a FIFO queue. Each job's combined stdout/stderr is kept
+    in a ring buffer for `tail()`, and optional per-job CPU-time / address-space
+    rlimits are applied on POSIX. Only the `keep_finished` most recently
+    finished jobs are remembered.
+    """
+
+    def __init__(self, max_concurrent=JOB_MAX_CONCURRENT, keep_finished=JOB_KEEP_FINISHED):
+        self.max_concurrent = max_concurrent
+        self.keep_finished = keep_finished
+        self._jobs = {}
+        self._queue = []
+        self._lock = threading.Lock()
+
+    # === Public API ===
+    def start(self, cmd, cwd=None, name=None, cpu_seconds=JOB_CPU_SECONDS, memory_mb=JOB_MEMORY_MB):
+        """Queue `cmd` (shell string or argv list) and return its job id."""
+        job = Job(uuid.uuid4().hex[:8], cmd, cwd, name, cpu_seconds, memory_mb)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._queue.append(job)
+        self._schedule()
+        return job.id
+
+    def status(self, job_id):
+        job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def tail(self, job_id, lines=50):
+        job = self._jobs.get(job_id)
+        if not job:
+            return None
+        return "".join(list(job.output.tail)[-lines:])
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job.state not in ("queued", "running"):
+                return False
+            if job.state == "queued":
+                self._queue.remove(job)
+                job.state, job.finished_at = "cancelled", time.time()
+                return True
+            job.state = "cancelled"
+        kill_process_tree(job.proc)
+        return True
+
+    def list_jobs(self):
+        return [job.to_dict() for job in self._jobs.values()]
+
+    def cancel_all(self):
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+
+    # === Scheduling ===
+    def _evict_finished(self):
+        finished = sorted((j for j in self._jobs.values() if j.finished_at is not None),
+                          key=lambda j: j.finished_at)
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
+
+    def _schedule(self):
+        with self._lock:
+            self._evict_finished()
+            running = sum(1 for j in self._jobs.values() if j.state == "running")
+            to_start = []
+            while self._queue and running < self.max_concurrent:
+                job = self._queue.pop(0)
+                job.state = "running"
+                to_start.append(job)
+                running += 1
+        for job in to_start:
+            self._launch(job)
+
+    def _launch(self, job):
+        cmd, shell = _limit_resources(job.cmd, job.cpu_seconds, job.memory_mb)
+        try:
+            job.proc = subprocess.Popen(
+                cmd, shell=shell, cwd=job.cwd,
+                text=True, encoding="utf-8", errors="replace", bufsize=1,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                start_new_session=(os.name == "posix"),
+            )
+        except Exception as e:
+            job.output.add(f"❌ Failed to start: {e}\n")
+            job.state, job.finished_at = "failed", time.time()
+            self._schedule()
+            return
+        job.started_at = time.time()
+        threading.Thread(target=self._watch, args=(job,), daemon=True).start()
+
+    def _watch(self, job):
+        try:
+            for line, _ in read_lines(job.proc.stdout):
+                if line is not None:
+                    job.output.add(line)
+        except ValueError:
+            pass
+        finally:
+            job.proc.stdout.close()
+        job.exit_code = job.proc.wait()
+        job.finished_at = time.time()
+        with self._lock:
+            if job.state == "running":
+                job.state = "finished" if job.exit_code == 0 else "failed"
+        self._schedule()
+
+
+job_manager = JobManager()
+atexit.register(job_manager.cancel_all)
+
+
+def handle_job_action(args):
+    """Agent tool entry point: args = {"action": start|status|logs|cancel|list, "job_id", "cmd"}."""
+    action = str(args.get("action", "list")).lower()
+    job_id = str(args.get("job_id", "")).strip()
+
+    if action == "start":
+        cmd = args.get("cmd", "")
+        if not cmd:
+            return "❌ No command given for the background job."
+        new_id = job_manager.start(cmd, cwd=args.get("cwd") or None)
+        return f"🚀 Started background job {new_id}: {cmd}"
+    if action == "list":
+        jobs = job_manager.list_jobs()
+        if not jobs:
+            return "No background jobs."
+        return "\n".join(f"- {j['id']} [{j['state']}] {j['name']}" for j in jobs)
+    if not job_id:
+        return f"❌ '{action}' needs a job_id."
+
+    if action == "status":
+        info = job_manager.status(job_id)
+        return str(info) if info else f"❌ No job {job_id}."
+    if action in ("logs", "tail"):
+        logs = job_manager.tail(job_id, int(args.get("lines", 50)))
+        return logs if logs is not None else f"❌ No job {job_id}."
+    if action in ("cancel", "stop", "kill"):
+        return f"🛑 Job {job_id} cancelled." if job_manager.cancel(job_id) else f"❌ Job {job_id} is not running."
+    return f"❌ Unknown job action: {action}"
@@ -0,0 +1,152 @@
+# tools/patcher.py
+# Search/replace patch parsing, fuzzy application, validation and atomic writes
+# used by the file editor's diff mode.
+import ast
+import difflib
+import json
+import os
+import re
+import tempfile
+
+HUNK_PATTERN = re.compile(
+    r'<{5,}\s*SEARCH[^\n]*\n(.*?)^={5,}[^\n]*\n(.*?)^>{5,}\s*REPLACE[^\n]*$',
+    re.DOTALL | re.MULTILINE,
+)
+
+# Minimum similarity for a fuzzy (non-exact) match of a SEARCH block
+FUZZY_THRESHOLD = 0.9
+
+
+class PatchError(Exception):
+    """A patch could not be parsed, applied or validated."""
+
+
+def parse_hunks(text):
+    """Extract [(search, replace), ...] from a SEARCH/REPLACE formatted reply."""
+    hunks = []
+    for m in HUNK_PATTERN.finditer(text or ""):
+        hunks.append((m.group(1), m.group(2)))
+    return hunks
+
+
+def _indent_of(line):
+    return line[: len(line) - len(line.lstrip())]
+
+
+def reindent(lines, old_indent, new_indent):
+    """Shift replacement lines from the model's indentation to the file's."""
+    if old_indent == new_indent:
+        return lines
+    out = []
+    for line in lines:
+        if line.strip() and line.startswith(old_indent):
+            out.append(new_indent + line[len(old_indent):])
+        else:
+            out.append(line)
+    return out
+
+
+def first_indent(lines):
+    """Indentation of the first non-blank line."""
+    for line in lines:
+        if line.strip():
+            return _indent_of(line)
+    return ""
+
+
+def _apply_one(source, search, replace):
+    # 1) Exact, unique match
+    if search and source.count(search) == 1:
+        return source.replace(search, replace, 1)
+    if not search.strip():
+        # Empty SEARCH means "append"
+        sep = "" if source.endswith("\n") or not source else "\n"
+        return source + sep + replace
+
+    src_lines = source.splitlines(keepends=True)
+    search_lines = search.splitlines(keepends=True)
+    replace_lines = replace.splitlines(keepends=True)
+    n = len(search_lines)
+
+    # 2) Same lines modulo surrounding whitespace
+    stripped_search = [l.strip() for l in search_lines]
+    stripped_src = [l.strip() for l in src_lines]
+    matches = [i for i in range(len(src_lines) - n + 1) if stripped_src[i:i + n] == stripped_search]
+
+    # 3) Fuzzy: best window above FUZZY_THRESHOLD
+    if not matches:
+        target = "".join(stripped_search)
+        best, best_ratio = None, 0.0
+        for i in range(len(src_lines) - n + 1):
+            window = "".join(stripped_src[i:i + n])
+            matcher = difflib.SequenceMatcher(None, target, window, autojunk=False)
+            if matcher.real_quick_ratio() < FUZZY_THRESHOLD or matcher.quick_ratio() < FUZZY_THRESHOLD:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best_ratio:
+                best, best_ratio = i, ratio
+        if best is not None and best_ratio >= FUZZY_THRESHOLD:
+            matches = [best]
+
+    if len(matches) != 1:
+        reason = "not found" if not matches else f"ambiguous ({len(matches)} matches)"
+        preview = search.strip().splitlines()[0][:60] if search.strip() else ""
+        raise PatchError(f"SEARCH block {reason}: {preview!r}")
+
+    i = matches[0]
+    new_lines = reindent(replace_lines, first_indent(search_lines), first_indent(src_lines[i:i + n]))
+    if new_lines and not new_lines[-1].endswith("\n") and i + n < len(src_lines):
+        new_lines[-1] += "\n"
+    return "".join(src_lines[:i] + new_lines + src_lines[i + n:])
+
+
+def apply_hunks(source, hunks):
+    """Apply hunks in order; raises PatchError if any of them can't be placed."""
+    for search, replace in hunks:
+        source = _apply_one(source, search, replace)
+    return source
+
+
+def validate_code(file_path, code):
+    """Return an error message if `code` is clearly broken for its file type, else None."""
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext == ".py":
+            ast.parse(code, filename=file_path)
+        elif ext == ".json":
+            json.loads(code)
+    except (SyntaxError, ValueError) as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def _read_umask():
+    # os.umask can only be read by setting it; done once, at import
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+UMASK = _read_umask()
+
+
+def atomic_write(file_path, text):
+    """
+    Write via a temp file in the same directory and os.replace it into place.
+    The file keeps its mode, or gets the usual umask-based one if it is new
+    (mkstemp alone would leave it 0600).
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        if os.path.exists(file_path):
+            os.chmod(tmp_path, os.stat(file_path).st_mode & 0o777)
+        else:
+            os.chmod(tmp_path, 0o666 & ~UMASK)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
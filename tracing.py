@@ -0,0 +1,257 @@
+# tracing.py
+"""
+Lightweight tracing for the agent.
+
+    with span("zip", files=len(files)) as s:
+        data = build_zip(files)
+        s.set(bytes=len(data))
+
+    @traced("modify_file")
+    def modify_file(...):
+        current_span().set(mode=mode)
+
+Spans nest through a context variable (one trace per request). When the
+root span of a trace ends, the trace is appended to TRACE_FILE as JSONL
+(one span per line), kept in memory for `breakdown()` (the Streamlit
+timing table) and, if TRACE_OTLP_ENDPOINT is set, posted there as
+OTLP/JSON in the background. `to_otlp()` converts spans for any
+OpenTelemetry collector; `python tracing.py traces.jsonl` does the same
+for a saved file.
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import TRACE_ENABLED, TRACE_FILE, TRACE_FILE_MAX_BYTES, TRACE_KEEP, TRACE_OTLP_ENDPOINT
+
+SERVICE_NAME = "ai-coding-agent"
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "status", "error", "_t0")
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.error = None
+        self._t0 = time.perf_counter_ns()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def finish(self, error=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._t0)
+        if error is not None:
+            self.status, self.error = "error", f"{type(error).__name__}: {error}"
+        tracer.finished(self)
+
+    @property
+    def duration_ms(self):
+        end = self.end_ns if self.end_ns is not None else self.start_ns + (time.perf_counter_ns() - self._t0)
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled; accepts and ignores everything."""
+    trace_id = span_id = None
+
+    def set(self, **attributes):
+        return self
+
+    def finish(self, error=None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    def __init__(self, path=TRACE_FILE, max_bytes=TRACE_FILE_MAX_BYTES, keep=TRACE_KEEP,
+                 otlp_endpoint=TRACE_OTLP_ENDPOINT, enabled=TRACE_ENABLED):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.otlp_endpoint = otlp_endpoint
+        self.enabled = enabled
+        self._open = {}               # trace_id -> finished spans of a running trace
+        self._recent = OrderedDict()  # trace_id -> span dicts of completed traces
+        self._lock = threading.Lock()
+
+    def finished(self, span):
+        with self._lock:
+            spans = self._open.setdefault(span.trace_id, [])
+            spans.append(span.to_dict())
+            if span.parent_id is not None and span.trace_id not in self._recent:
+                return
+            # Root ended (or a straggler after it): publish
+            self._open.pop(span.trace_id, None)
+            self._recent.setdefault(span.trace_id, []).extend(spans)
+            self._recent.move_to_end(span.trace_id)
+            while len(self._recent) > self.keep:
+                self._recent.popitem(last=False)
+        self._write(spans)
+        if self.otlp_endpoint:
+            threading.Thread(target=self._post_otlp, args=(spans,), daemon=True).start()
+
+    def _write(self, spans):
+        if not self.path:
+            return
+        lines = "".join(json.dumps(s, ensure_ascii=False, default=str) + "\n" for s in spans)
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+        except OSError as e:
+            print("⚠️ Failed to write trace:", e)
+
+    def _post_otlp(self, spans):
+        try:
+            import requests
+            requests.post(self.otlp_endpoint.rstrip("/") + "/v1/traces", json=to_otlp(spans), timeout=5)
+        except Exception as e:
+            print("⚠️ Failed to export trace:", e)
+
+    def get_trace(self, trace_id):
+        with self._lock:
+            return list(self._recent.get(trace_id, []))
+
+
+tracer = Tracer()
+
+
+def start_span(name, **attributes):
+    """Start a span under the current one without making it current; call .finish() yourself."""
+    if not tracer.enabled:
+        return NOOP_SPAN
+    return Span(name, _current.get(), attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time the enclosed block as a child of the current span (or as a new trace)."""
+    if not tracer.enabled:
+        yield NOOP_SPAN
+        return
+    s = Span(name, _current.get(), attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        _current.reset(token)
+        s.finish(error=e)
+        raise
+    _current.reset(token)
+    s.finish()
+
+
+def traced(name, **attributes):
+    """Decorator form of `span`; the function can add attributes via current_span().set(...)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    return _current.get() or NOOP_SPAN
+
+
+def breakdown(trace_id):
+    """Rows for a per-stage timing table: [{"stage", "ms", "share", "details"}], tree order."""
+    spans = tracer.get_trace(trace_id)
+    children = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+    roots = children.get(None, [])
+    total = sum(s["duration_ms"] for s in roots) or 1.0
+    rows = []
+
+    def walk(s, depth):
+        details = ", ".join(f"{k}={v}" for k, v in s["attributes"].items())
+        if s["error"]:
+            details = f"{details}, error={s['error']}" if details else f"error={s['error']}"
+        rows.append({"stage": "  " * depth + s["name"], "ms": round(s["duration_ms"], 1),
+                     "share": f"{s['duration_ms'] / total:.0%}", "details": details})
+        for child in sorted(children.get(s["span_id"], []), key=lambda c: c["start_ns"]):
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+    return rows
+
+
+# === OpenTelemetry (OTLP/JSON) ===
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans):
+    """Convert span dicts to an OTLP/JSON ExportTraceServiceRequest."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "tracing"},
+            "spans": [{
+                "traceId": s["trace_id"],
+                "spanId": s["span_id"],
+                "parentSpanId": s["parent_id"] or "",
+                "name": s["name"],
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s["start_ns"]),
+                "endTimeUnixNano": str(s["end_ns"]),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items()],
+                "status": {"code": 2, "message": s["error"]} if s["status"] == "error" else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+if __name__ == "__main__":
+    # Convert a JSONL trace file to OTLP/JSON on stdout
+    with open(sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE, "r", encoding="utf-8") as f:
+        saved = [json.loads(line) for line in f if line.strip()]
+    json.dump(to_otlp(saved), sys.stdout, indent=2)
@@ -0,0 +1,243 @@
+# workspace_index.py
+import difflib
+import json
+import os
+import threading
+import time
+
+from config import WORKSPACE_INDEX_FILE
+
+SKIP_DIRS = {"__pycache__", "node_modules", "venv", ".venv", ".git"}
+
+
+def _normalize(name):
+    name = str(name).strip().strip("'\"").replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name
+
+
+class WorkspaceIndex:
+    """
+    Filename/path index over a workspace folder (e.g. generated_projects/).
+
+    Every directory is recorded with its mtime; `refresh()` only re-lists
+    directories whose mtime changed (a file being added, removed or renamed
+    changes its parent directory's mtime), so keeping the index current costs
+    one stat per directory instead of a full os.walk. The index is persisted
+    to `index_file` so a new process starts warm.
+
+    Lookups are O(1) by basename, with path-suffix matching for partial paths
+    ("templates/index.html") and a fuzzy fallback for near misses. Candidates
+    are ranked by exactness, then by most recently modified.
+    """
+
+    def __init__(self, base="generated_projects", index_file=None, refresh_interval=1.0):
+        self.base = base
+        self.index_file = index_file
+        self.refresh_interval = refresh_interval
+
+        self._dirs = {}      # rel_dir -> {"mtime": float, "files": {rel_path: mtime}, "subdirs": set()}
+        self._by_name = {}   # basename -> set(rel_path)
+        self._last_refresh = 0.0
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.RLock()
+        self.stats = {"lookups": 0, "hits": 0, "fuzzy_hits": 0, "misses": 0, "dirs_rescanned": 0}
+
+    # === Index maintenance ===
+    def refresh(self, force=False):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = now
+
+            if not os.path.isdir(self.base):
+                if self._dirs:
+                    self._drop_dir("")
+                    self._dirty = True
+                return
+            if "" not in self._dirs:
+                self._scan_dir("")
+            for rel in list(self._dirs):
+                entry = self._dirs.get(rel)
+                if entry is None:
+                    continue  # dropped while rescanning a parent
+                try:
+                    mtime = os.stat(self._full(rel)).st_mtime
+                except OSError:
+                    self._drop_dir(rel)
+                    continue
+                if mtime != entry["mtime"]:
+                    self._scan_dir(rel)
+            if self._dirty:
+                self._save()
+
+    def _full(self, rel):
+        return os.path.join(self.base, *rel.split("/")) if rel else self.base
+
+    def _scan_dir(self, rel):
+        full = self._full(rel)
+        try:
+            mtime = os.stat(full).st_mtime
+            entries = list(os.scandir(full))
+        except OSError:
+            self._drop_dir(rel)
+            return
+        self.stats["dirs_rescanned"] += 1
+        self._dirty = True
+
+        old = self._dirs.get(rel, {"files": {}, "subdirs": set()})
+        files, subdirs = {}, set()
+        for e in entries:
+            if e.name.startswith(".") or e.name in SKIP_DIRS:
+                continue
+            rel_path = f"{rel}/{e.name}" if rel else e.name
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    subdirs.add(rel_path)
+                elif e.is_file():
+                    files[rel_path] = e.stat().st_mtime
+            except OSError:
+                continue
+        self._dirs[rel] = {"mtime": mtime, "files": files, "subdirs": subdirs}
+
+        for rel_path in old["files"].keys() - files.keys():
+            self._by_name.get(rel_path.rsplit("/", 1)[-1], set()).discard(rel_path)
+        for rel_path in files:
+            self._by_name.setdefault(rel_path.rsplit("/", 1)[-1], set()).add(rel_path)
+        for gone in old["subdirs"] - subdirs:
+            self._drop_dir(gone)
+        for new in subdirs - old["subdirs"]:
+            if new not in self._dirs:
+                self._scan_dir(new)
+
+    def _drop_dir(self, rel):
+        entry = self._dirs.pop(rel, None)
+        if entry is None:
+            return
+        self._dirty = True
+        for rel_path in entry["files"]:
+            self._by_name.get(rel_path.rsplit("/", 1)[-1], set()).discard(rel_path)
+        for sub in entry["subdirs"]:
+            self._drop_dir(sub)
+
+    # === Persistence ===
+    def _load(self):
+        self._loaded = True
+        if not self.index_file or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("base") != os.path.abspath(self.base):
+                return
+            for rel, entry in data.get("dirs", {}).items():
+                self._dirs[rel] = {"mtime": entry["mtime"], "files": entry["files"],
+                                   "subdirs": set(entry["subdirs"])}
+                for rel_path in entry["files"]:
+                    self._by_name.setdefault(rel_path.rsplit("/", 1)[-1], set()).add(rel_path)
+        except Exception as e:
+            print("⚠️ Ignoring unreadable workspace index:", e)
+            self._dirs, self._by_name = {}, {}
+
+    def _save(self):
+        self._dirty = False
+        if not self.index_file:
+            return
+        data = {
+            "base": os.path.abspath(self.base),
+            "dirs": {rel: {"mtime": e["mtime"], "files": e["files"], "subdirs": sorted(e["subdirs"])}
+                     for rel, e in self._dirs.items()},
+        }
+        try:
+            os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+            tmp_path = self.index_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            print("⚠️ Failed to save workspace index:", e)
+
+    # === Lookup ===
+    def _candidates(self, name):
+        basename = name.rsplit("/", 1)[-1]
+        paths = self._by_name.get(basename, set())
+        if "/" in name:
+            return [p for p in paths if p == name or p.endswith("/" + name)]
+        return list(paths)
+
+    def _rank(self, paths):
+        def recency(rel_path):
+            try:
+                return os.path.getmtime(self._full(rel_path))
+            except OSError:
+                return 0.0
+        return sorted(paths, key=recency, reverse=True)
+
+    def _close_matches(self, name):
+        basename = name.rsplit("/", 1)[-1]
+        names = [n for n, paths in self._by_name.items() if paths]
+        close = difflib.get_close_matches(basename, names, n=3, cutoff=0.8)
+        return [p for n in close for p in self._by_name[n]]
+
+    def lookup(self, name, fuzzy=True):
+        """Return full paths matching `name`, best candidate first."""
+        name = _normalize(name)
+        base_prefix = _normalize(self.base).rstrip("/") + "/"
+        if name.startswith(base_prefix):
+            name = name[len(base_prefix):]
+        if not name:
+            return []
+
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.refresh()
+            matches = self._candidates(name)
+            if not matches:
+                self.refresh(force=True)  # something may have just been created
+                matches = self._candidates(name)
+            if matches:
+                self.stats["hits"] += 1
+                return [self._full(p) for p in self._rank(matches)]
+
+            if fuzzy:
+                matches = self._close_matches(name)
+                if matches:
+                    self.stats["fuzzy_hits"] += 1
+                    return [self._full(p) for p in self._rank(matches)]
+
+            self.stats["misses"] += 1
+            return []
+
+    def best(self, name, fuzzy=True):
+        matches = self.lookup(name, fuzzy=fuzzy)
+        return matches[0] if matches else None
+
+    def suggest(self, name):
+        """Near-miss paths for `name` (e.g. "api.py" for "app.py"), best first; not counted as lookups."""
+        name = _normalize(name).rsplit("/", 1)[-1]
+        if not name:
+            return []
+        with self._lock:
+            self.refresh()
+            return [self._full(p) for p in self._rank(self._close_matches(name))]
+
+    def hit_rate(self):
+        lookups = self.stats["lookups"]
+        return (self.stats["hits"] + self.stats["fuzzy_hits"]) / lookups if lookups else 0.0
+
+
+_indexes = {}
+
+
+def get_workspace_index(base="generated_projects"):
+    """Shared index per workspace folder (persisted only for the default workspace)."""
+    key = os.path.abspath(base)
+    if key not in _indexes:
+        index_file = WORKSPACE_INDEX_FILE if base == "generated_projects" else None
+        _indexes[key] = WorkspaceIndex(base, index_file=index_file)
+    return _indexes[key]